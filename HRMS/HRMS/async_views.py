@@ -0,0 +1,41 @@
+"""
+Async read-only views for the high-traffic self-service endpoints.
+
+DRF's APIView is sync-only, so under ASGI every request to it holds a worker
+thread while it waits on the database. AsyncAPIView is a plain Django async
+view with the parts of APIView these endpoints need: JWT authentication
+(AsyncJWTAuthentication), DRF exception handling and DRF's JSON renderer, so
+payloads are byte-for-byte the ones of the sync endpoints. Handlers must only
+touch the database through the async ORM.
+"""
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated
+from rest_framework.renderers import JSONRenderer
+from auth_app.authentication import AsyncJWTAuthentication
+
+
+class AsyncAPIView(View):
+    http_method_names = ["get", "head", "options"]
+    authentication_class = AsyncJWTAuthentication
+
+    async def dispatch(self, request, *args, **kwargs):
+        authenticator = self.authentication_class()
+        try:
+            result = await authenticator.authenticate(request)
+            if result is None:
+                raise NotAuthenticated()
+            request.user, request.auth = result
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            response = self.render(
+                exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail},
+                status=exc.status_code,
+            )
+            if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+                response["WWW-Authenticate"] = authenticator.authenticate_header(request)
+            return response
+
+    def render(self, data, status=status.HTTP_200_OK):
+        return HttpResponse(JSONRenderer().render(data), content_type="application/json", status=status)
@@ -0,0 +1,230 @@
+"""
+In-process API benchmark behind the benchmark_api command.
+
+Replays the requests of the Postman collection shipped with the repository
+against the current database (typically one filled by seed_hrms) through
+Django's request handler, without a server. Each request runs in a
+transaction that is rolled back, so writes and deletes can be replayed any
+number of times without changing the dataset.
+
+Collection variables ({{org_id}}, {{policy_id}}, ...) are bound to rows of one
+seeded organization, and every request is sent as the role its folder is
+meant for. Per endpoint the report has the latency percentiles of the timed
+iterations and, from one extra instrumented request, the number of queries
+and the peak memory allocated while serving it.
+"""
+import json
+import re
+import time
+import tracemalloc
+import uuid
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from auth_app.models import User
+from auth_app.tokens import HRMSRefreshToken
+from employee.models import Employee
+from leave.models import Leave
+from organization.models import Organization
+from policy.models import LeavePolicy
+
+
+DEFAULT_COLLECTION = settings.BASE_DIR.parent / "HRMS Leave Management API.postman_collection.json"
+
+# Role a request is sent as, by collection folder; (folder, method) overrides the folder
+FOLDER_ROLES = {
+    "01-Organization": "SUPERADMIN",
+    "02-Employees": "HR",
+    "03-Policies": "HR",
+    "04-Leaves": "HR",
+    ("04-Leaves", "POST"): "EMPLOYEE",
+    ("04-Leaves", "GET"): "EMPLOYEE",
+}
+
+VARIABLE = re.compile(r"{{\s*(\w+)\s*}}")
+
+
+def client_settings():
+    """Settings for driving the app with in-process test clients outside the test runner."""
+    return override_settings(DEBUG=False, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"])
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def summarize(latencies, elapsed=None, errors=0):
+    """Latency percentiles in milliseconds (and throughput when the wall time is given)."""
+    latencies = sorted(latencies)
+    summary = {"requests": len(latencies), "errors": errors}
+    if elapsed:
+        summary["requests_per_second"] = round(len(latencies) / elapsed, 1)
+    for name, fraction in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+        summary[name] = round(percentile(latencies, fraction) * 1000, 2)
+    return summary
+
+
+def load_collection(path=DEFAULT_COLLECTION):
+    """The collection's requests as dicts of folder, name, method, url and raw body."""
+    with open(path, encoding="utf-8") as collection_file:
+        collection = json.load(collection_file)
+
+    requests = []
+
+    def walk(items, folder):
+        for item in items:
+            if "item" in item:
+                walk(item["item"], item["name"])
+                continue
+            request = item["request"]
+            url = request["url"]["raw"] if isinstance(request["url"], dict) else request["url"]
+            requests.append({
+                "folder": folder,
+                "name": item["name"],
+                "method": request["method"],
+                "url": url,
+                "body": (request.get("body") or {}).get("raw", ""),
+            })
+
+    walk(collection["item"], None)
+    return requests
+
+
+class CollectionBenchmark:
+    def __init__(self, organization, requests, iterations=20, warmup=2, password="password123"):
+        self.organization = organization
+        self.requests = requests
+        self.iterations = iterations
+        self.warmup = warmup
+        self.password = password
+        self.actors = self.load_actors()
+        self.variables = self.load_variables()
+
+    def load_actors(self):
+        hr = User.objects.filter(organization=self.organization, role="HR").first()
+        employee = (
+            Employee.objects.filter(organization=self.organization, is_active=True, leaves__status="Pending")
+            .select_related("user").first()
+        )
+        superadmin = User.objects.filter(role="SUPERADMIN", is_active=True).first()
+        if not (hr and employee and superadmin):
+            raise ValueError(
+                "The organization needs an HR manager and an employee with a pending leave, "
+                "and a SUPERADMIN must exist (seed_hrms creates all of them)."
+            )
+        return {"SUPERADMIN": superadmin, "HR": hr, "EMPLOYEE": employee.user}
+
+    def load_variables(self):
+        employee_user = self.actors["EMPLOYEE"]
+        employee = Employee.objects.get(user=employee_user)
+        policy = LeavePolicy.objects.filter(organization=self.organization, policy_type="ANNUAL").first()
+        leave = Leave.objects.filter(employee=employee, status="Pending").order_by("start_date").first()
+        return {
+            "base_url": "",
+            "org_id": str(self.organization.pk),
+            "employee_user_id": str(employee.pk),
+            # A user without an employee profile, as the collection creates one for it
+            "Auth_user_id": str(self.actors["HR"].pk),
+            "policy_id": str(policy.pk if policy else uuid.uuid4()),
+            "leave_id": str(leave.pk),
+        }
+
+    def role_for(self, request):
+        """None → anonymous (the auth endpoints)."""
+        return FOLDER_ROLES.get((request["folder"], request["method"]), FOLDER_ROLES.get(request["folder"]))
+
+    def substitute(self, text):
+        return VARIABLE.sub(lambda match: self.variables.get(match.group(1), match.group(0)), text)
+
+    def body_for(self, request, iteration):
+        raw = self.substitute(request["body"]).strip()
+        if not raw:
+            return None
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            return raw
+        if isinstance(body, dict) and request["url"].endswith("/login/"):
+            body.update(email=self.actors["EMPLOYEE"].email, password=self.password)
+        elif isinstance(body, dict) and request["url"].endswith("/register/"):
+            # Rolled back after every request, but must not clash with seeded users
+            body.update(email=f"bench{iteration}@bench.example", username=f"bench{iteration}")
+        return body
+
+    def client_for(self, role):
+        client = Client(raise_request_exception=False)
+        if role is not None:
+            token = HRMSRefreshToken.for_user(self.actors[role]).access_token
+            client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+        return client
+
+    def send(self, client, request, iteration):
+        body = self.body_for(request, iteration)
+        path = self.substitute(request["url"])
+        kwargs = {}
+        if body is not None:
+            kwargs = {"data": json.dumps(body), "content_type": "application/json"}
+        with transaction.atomic():
+            response = client.generic(request["method"], path, **kwargs)
+            transaction.set_rollback(True)
+        return response
+
+    def run_request(self, request):
+        client = self.client_for(self.role_for(request))
+        for iteration in range(self.warmup):
+            self.send(client, request, iteration)
+
+        latencies = []
+        statuses = {}
+        started = time.perf_counter()
+        for iteration in range(self.iterations):
+            begin = time.perf_counter()
+            response = self.send(client, request, iteration)
+            latencies.append(time.perf_counter() - begin)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        elapsed = time.perf_counter() - started
+
+        # One instrumented request: tracing allocations slows it down, so it is not timed
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            with CaptureQueriesContext(connection) as queries:
+                self.send(client, request, self.iterations)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        result = {
+            "folder": request["folder"],
+            "name": request["name"],
+            "method": request["method"],
+            "path": self.substitute(request["url"]),
+            "role": self.role_for(request) or "ANONYMOUS",
+            "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        }
+        result.update(summarize(latencies, elapsed, errors=sum(
+            count for code, count in statuses.items() if code >= 500
+        )))
+        # The transaction's SAVEPOINT/ROLLBACK statements are the harness's, not the endpoint's
+        result["queries"] = sum(
+            1 for query in queries.captured_queries
+            if not query["sql"].upper().startswith(("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK", "BEGIN"))
+        )
+        result["peak_memory_kb"] = round(peak / 1024, 1)
+        return result
+
+    def run(self):
+        return {
+            "organization": self.organization.code,
+            "database": connection.vendor,
+            "iterations": self.iterations,
+            "dataset": {
+                "organizations": Organization.objects.count(),
+                "employees": Employee.objects.count(),
+                "policies": LeavePolicy.objects.count(),
+                "leaves": Leave.objects.count(),
+            },
+            "endpoints": [self.run_request(request) for request in self.requests],
+        }
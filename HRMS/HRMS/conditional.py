@@ -0,0 +1,162 @@
+"""
+Conditional requests (ETag / Last-Modified) for the polled read endpoints.
+
+Every collection ("policies", "employees", "organizations") has a version
+counter per organization, plus a "generation" one that moves every
+organization at once, kept in the database (CollectionVersion) like the
+leave calendar versions, so every worker sees a bump at once: signals bump
+it on save/delete and bulk writers call bump_collection_version themselves.
+
+- Lists: the ETag hashes the version of the user's scope (the sum of the
+  counters, which moves whenever one of them does; every organization's for
+  SUPERADMIN lists), the user and the full URL (cursor and ?fields= included),
+  so answering 304 costs one query. Last-Modified is the latest bump.
+- Details: the ETag hashes the row's updated_at (and version, when the model
+  has one) with the organization's version, which also moves when related
+  rows rendered in the object change (user names, organization name). 304
+  still loads the row but skips the serializer.
+
+If-Match on PUT/PATCH (check_if_match) compares against the row as re-read
+under select_for_update, so concurrent writers holding the same ETag cannot
+both win: the second answers 412.
+"""
+import hashlib
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Q, Sum
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+from organization.models import CollectionVersion
+
+
+ALL_ORGANIZATIONS = "*"
+GENERATION = "generation"
+
+
+def collection_version(collection, scope=ALL_ORGANIZATIONS):
+    """(version, changed_at as a timestamp) of the scope: an organization id or ALL_ORGANIZATIONS."""
+    versions = CollectionVersion.objects.filter(collection=collection)
+    if scope != ALL_ORGANIZATIONS:
+        versions = versions.filter(Q(scope=GENERATION) | Q(scope=str(scope)))
+    state = versions.aggregate(version=Sum("version"), changed_at=Max("changed_at"))
+    changed_at = state["changed_at"]
+    return state["version"] or 0, int(changed_at.timestamp()) if changed_at else 0
+
+
+def bump_collection_version(collection, organization_id=None):
+    """
+    Invalidate the ETags of the organization's rows of the collection (and of
+    the all-organizations lists). Without an organization, every scope.
+    """
+    scope = GENERATION if organization_id is None else str(organization_id)
+    now = timezone.now()
+    versions = CollectionVersion.objects.filter(collection=collection, scope=scope)
+    if versions.update(version=F("version") + 1, changed_at=now):
+        return
+    try:
+        with transaction.atomic():
+            CollectionVersion.objects.create(collection=collection, scope=scope, version=1, changed_at=now)
+    except IntegrityError:
+        # A concurrent writer created the counter first
+        versions.update(version=F("version") + 1, changed_at=now)
+
+
+def make_etag(*parts):
+    return '"%s"' % hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The resource has changed since it was fetched (If-Match does not match)."
+    default_code = "precondition_failed"
+
+
+class ConditionalGetMixin:
+    """
+    ETag/Last-Modified for GenericAPIView list and retrieve, 304 on a match.
+
+    conditional_collection: the collection whose version tokens cover the view.
+    Detail views must load updated_at (and version), plus organization when
+    the model has one.
+    """
+    conditional_collection = None
+    conditional_instance = None
+
+    def get_collection_scope(self):
+        user = self.request.user
+        if user.role == "SUPERADMIN" or user.organization_id is None:
+            return ALL_ORGANIZATIONS
+        return user.organization_id
+
+    def list_validators(self):
+        request = self.request
+        scope = self.get_collection_scope()
+        version, changed_at = collection_version(self.conditional_collection, scope)
+        etag = make_etag(
+            self.conditional_collection, scope, version, request.user.pk,
+            request.get_full_path(), request.accepted_renderer.format,
+        )
+        return etag, changed_at
+
+    def object_validators(self, instance, state=None):
+        """state: {"updated_at", "version"} to use instead of the instance's."""
+        if state is None:
+            state = {"updated_at": instance.updated_at, "version": getattr(instance, "version", None)}
+        scope = getattr(instance, "organization_id", None) or instance.pk
+        version, changed_at = collection_version(self.conditional_collection, scope)
+        etag = make_etag(
+            type(instance)._meta.label, instance.pk, state["updated_at"].isoformat(), state.get("version"),
+            version, self.request.accepted_renderer.format,
+        )
+        return etag, max(int(state["updated_at"].timestamp()), changed_at)
+
+    def set_validators(self, response, validators):
+        etag, last_modified = validators
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        validators = self.list_validators()
+        not_modified = get_conditional_response(request, etag=validators[0], last_modified=validators[1])
+        if not_modified is not None:
+            return self.set_validators(not_modified, validators)
+        return self.set_validators(super().list(request, *args, **kwargs), validators)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        validators = self.object_validators(instance)
+        not_modified = get_conditional_response(request, etag=validators[0], last_modified=validators[1])
+        if not_modified is not None:
+            return self.set_validators(not_modified, validators)
+        serializer = self.get_serializer(instance)
+        return self.set_validators(Response(serializer.data), validators)
+
+    def check_if_match(self, instance):
+        """
+        Honour If-Match on a write: call inside the transaction that saves the
+        instance, before saving. The response then carries the new ETag.
+        """
+        self.conditional_instance = instance
+        header = self.request.headers.get("If-Match")
+        if not header:
+            return
+        # The row as committed, not as the serializer is about to change it
+        columns = ["updated_at", "version"] if hasattr(instance, "version") else ["updated_at"]
+        state = type(instance).objects.select_for_update().filter(pk=instance.pk).values(*columns).first()
+        if state is None:
+            raise PreconditionFailed()
+        tags = parse_etags(header)
+        if "*" not in tags and self.object_validators(instance, state)[0] not in tags:
+            raise PreconditionFailed()
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        if self.conditional_instance is not None:
+            self.set_validators(response, self.object_validators(self.conditional_instance))
+        return response
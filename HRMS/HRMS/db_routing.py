@@ -0,0 +1,139 @@
+"""
+Read replica routing.
+
+ReplicaRoutingMiddleware marks every request; the views of READ_REPLICA_APPS
+it sees for a safe method (GET/HEAD/OPTIONS) may read from the
+READ_REPLICA_ALIAS database. ReplicaRouter sends those reads to the replica
+unless one of these holds, in which case the primary answers:
+
+- the request has not been authenticated yet (the user lookup itself, so
+  revoked or deactivated users are seen immediately),
+- the user wrote something less than READ_YOUR_WRITES_SECONDS ago, from any
+  process sharing the cache (read-your-writes),
+- the request itself already wrote, or the read runs inside a transaction.
+
+Writes always go to the primary, including saves of rows that were read
+from the replica.
+"""
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import SimpleLazyObject
+from rest_framework.permissions import SAFE_METHODS
+
+
+_current_routing = ContextVar("db_routing", default=None)
+
+
+def replica_alias():
+    """The configured replica alias, or None when there is none."""
+    alias = getattr(settings, "READ_REPLICA_ALIAS", None)
+    return alias if alias in settings.DATABASES else None
+
+
+def pin_key(user_id):
+    return f"db-primary-pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    """Serve the user's reads from the primary for the next READ_YOUR_WRITES_SECONDS."""
+    cache.set(pin_key(user_id), True, getattr(settings, "READ_YOUR_WRITES_SECONDS", 5))
+
+
+class RequestRouting:
+    """Routing state of one request, shared with the threads serving it."""
+
+    def __init__(self, request):
+        self.request = request
+        self.replica_allowed = False
+        self.wrote = False
+        self._pinned = None
+
+    def authenticated_user(self):
+        """The user DRF authenticated (possibly anonymous), or None before authentication."""
+        # DRF stores the user on the HttpRequest; until then it is
+        # AuthenticationMiddleware's lazy session user
+        user = vars(self.request).get("user")
+        return None if isinstance(user, SimpleLazyObject) else user
+
+    def use_replica(self):
+        if not self.replica_allowed or self.wrote or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return False
+        if self._pinned is None:
+            user = self.authenticated_user()
+            if user is None:
+                return False
+            self._pinned = user.pk is not None and bool(cache.get(pin_key(user.pk)))
+        return not self._pinned
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _current_routing.get()
+        if routing is not None and routing.use_replica():
+            return replica_alias()
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        routing = _current_routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives its schema from the primary
+        if db == replica_alias():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = RequestRouting(request)
+        token = _current_routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_routing.reset(token)
+        self.finish(routing)
+        return response
+
+    async def __acall__(self, request):
+        routing = RequestRouting(request)
+        token = _current_routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_routing.reset(token)
+        self.finish(routing)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = _current_routing.get()
+        if routing is not None and replica_alias() and request.method in SAFE_METHODS:
+            app_label = view_func.__module__.split(".")[0]
+            routing.replica_allowed = app_label in getattr(settings, "READ_REPLICA_APPS", ())
+
+    def finish(self, routing):
+        user = routing.authenticated_user()
+        if routing.wrote and user is not None and user.pk is not None:
+            pin_to_primary(user.pk)
@@ -0,0 +1,155 @@
+"""
+Sparse fieldsets for the read endpoints.
+
+?fields=id,status,policy_name keeps only the listed serializer fields and
+?exclude=reason,remarks drops fields from the default set. List endpoints
+default to a compact serializer; ?fields= can still ask for any field of the
+full one.
+
+The fields left in the response decide what is fetched: each one is mapped
+through its source (policy_name → policy.name) to the columns it reads, so the
+queryset gets only() those columns and select_related() only the relations
+they traverse. A relation whose fields nobody asked for is never joined.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+FIELDS_PARAM = "fields"
+EXCLUDE_PARAM = "exclude"
+
+
+def _query_params(request):
+    # DRF requests expose query_params, plain Django requests (async views) GET
+    return getattr(request, "query_params", request.GET)
+
+
+def _parse(params, name, available):
+    names = [value.strip() for value in params[name].split(",") if value.strip()]
+    unknown = [value for value in names if value not in available]
+    if unknown:
+        raise ValidationError({name: f"Unknown field(s): {', '.join(unknown)}. "
+                                     f"Available: {', '.join(available)}."})
+    return names
+
+
+def sparse_serializer_class(request, serializer_class, compact_serializer_class=None):
+    """The compact serializer unless ?fields= asks for specific fields."""
+    if compact_serializer_class is not None and FIELDS_PARAM not in _query_params(request):
+        return compact_serializer_class
+    return serializer_class
+
+
+def apply_fieldset(serializer, request):
+    """Drop the serializer fields ?fields= / ?exclude= leave out (in place)."""
+    params = _query_params(request)
+    if FIELDS_PARAM not in params and EXCLUDE_PARAM not in params:
+        return serializer
+    target = serializer.child if isinstance(serializer, serializers.ListSerializer) else serializer
+    available = list(target.fields)
+    keep = _parse(params, FIELDS_PARAM, available) if FIELDS_PARAM in params else available
+    if EXCLUDE_PARAM in params:
+        excluded = set(_parse(params, EXCLUDE_PARAM, available))
+        keep = [name for name in keep if name not in excluded]
+    for name in set(available) - set(keep):
+        target.fields.pop(name)
+    return serializer
+
+
+def sparse_serializer(request, serializer_class, compact_serializer_class=None, *args, **kwargs):
+    """Instantiate the serializer a safe request asks for, for views outside GenericAPIView."""
+    serializer_class = sparse_serializer_class(request, serializer_class, compact_serializer_class)
+    return apply_fieldset(serializer_class(*args, **kwargs), request)
+
+
+def ordering_columns(pagination_class):
+    """The columns a keyset paginator orders (and builds cursors) by."""
+    return [field.lstrip("-") for field in getattr(pagination_class, "ordering", None) or ()]
+
+
+def field_paths(model, serializer):
+    """
+    (columns for only(), relations for select_related()) read by the serializer's
+    fields, or None when some field can't be mapped to model columns.
+    """
+    target = serializer.child if isinstance(serializer, serializers.ListSerializer) else serializer
+    columns = {model._meta.pk.name}
+    relations = set()
+    for field in target.fields.values():
+        if field.source == "*" or not field.source_attrs:
+            return None
+        current = model
+        path = []
+        for position, attr in enumerate(field.source_attrs):
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                return None
+            path.append(attr)
+            columns.add("__".join(path))
+            last = position == len(field.source_attrs) - 1
+            if not model_field.is_relation:
+                if not last:
+                    return None
+                continue
+            if not model_field.concrete or not (model_field.many_to_one or model_field.one_to_one):
+                return None
+            if not last:
+                # Traversed: join it. A relation read as a primary key only needs its column
+                relations.add("__".join(path))
+                current = model_field.related_model
+    return columns, relations
+
+
+def restrict_queryset(queryset, serializer, always_load=()):
+    """Fetch and join only what the serializer renders (plus always_load columns)."""
+    paths = field_paths(queryset.model, serializer)
+    if paths is None:
+        return queryset
+    columns, relations = paths
+    queryset = queryset.select_related(None)
+    if relations:
+        # select_related() without arguments would follow every foreign key
+        queryset = queryset.select_related(*relations)
+    return queryset.only(*columns, *always_load)
+
+
+class SparseFieldsetMixin:
+    """
+    ?fields= / ?exclude= for GenericAPIView subclasses, on safe methods only
+    (writes always validate and answer with the full serializer).
+
+    compact_serializer_class: default serializer of the view's GET responses.
+    sparse_always_load: model columns the view itself reads besides the
+    serializer, e.g. for permission checks. Pagination ordering columns are
+    added automatically.
+    """
+    compact_serializer_class = None
+    sparse_always_load = ()
+
+    def is_sparse_request(self):
+        return self.request.method in SAFE_METHODS
+
+    def get_serializer_class(self):
+        serializer_class = super().get_serializer_class()
+        if self.is_sparse_request():
+            return sparse_serializer_class(self.request, serializer_class, self.compact_serializer_class)
+        return serializer_class
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.is_sparse_request():
+            apply_fieldset(serializer, self.request)
+        return serializer
+
+    def sparse_queryset(self, queryset):
+        if not self.is_sparse_request() or not isinstance(queryset, QuerySet):
+            return queryset
+        always_load = [*self.sparse_always_load, *ordering_columns(self.pagination_class)]
+        return restrict_queryset(queryset, self.get_serializer(), always_load)
+
+    def filter_queryset(self, queryset):
+        return self.sparse_queryset(super().filter_queryset(queryset))
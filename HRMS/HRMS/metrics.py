@@ -0,0 +1,236 @@
+"""
+Per-request performance metrics.
+
+MetricsMiddleware times every request to a class-based (DRF or async) view
+and records, labeled by route name, HTTP method and user role:
+
+- wall time,
+- number of SQL queries and time spent in them (connection.execute_wrapper
+  on every database alias),
+- time spent building serializer.data,
+- response size.
+
+The values go into in-process histograms (fixed buckets, one lock, a few
+list increments per request) that /metrics serves in the Prometheus text
+format. Each worker process keeps its own histograms; Prometheus sums them
+across the scraped targets.
+
+Requests slower than SLOW_REQUEST_THRESHOLD_MS are logged on the
+"hrms.slow_requests" logger with their SQL statements and timings.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework import serializers
+
+
+logger = logging.getLogger("hrms.slow_requests")
+
+_current_metrics = ContextVar("request_metrics", default=None)
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name → (help text, buckets)
+HISTOGRAMS = {
+    "hrms_request_duration_seconds": ("Wall time of the request.", SECONDS_BUCKETS),
+    "hrms_db_queries": ("SQL queries issued by the request.", QUERY_BUCKETS),
+    "hrms_db_duration_seconds": ("Time spent executing SQL.", SECONDS_BUCKETS),
+    "hrms_serializer_duration_seconds": ("Time spent building serializer data.", SECONDS_BUCKETS),
+    "hrms_response_size_bytes": ("Size of the response body (streamed bodies excluded).", SIZE_BUCKETS),
+}
+LABELS = ("route", "method", "role")
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (histogram name, label values) → [count per bucket..., +Inf count, sum]
+        self._series = {}
+
+    def observe(self, labels, values):
+        """values: {histogram name: observed value} for one request."""
+        with self._lock:
+            for name, value in values.items():
+                buckets = HISTOGRAMS[name][1]
+                series = self._series.get((name, labels))
+                if series is None:
+                    series = self._series[(name, labels)] = [0] * (len(buckets) + 2)
+                series[bisect_left(buckets, value)] += 1
+                series[-1] += value
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        """The histograms in the Prometheus text exposition format."""
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        lines = []
+        for name, (help_text, buckets) in HISTOGRAMS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (series_name, labels), values in series:
+                if series_name != name:
+                    continue
+                label_text = ",".join(
+                    f'{label}="{_escape(value)}"' for label, value in zip(LABELS, labels)
+                )
+                cumulative = 0
+                for bound, count in zip((*buckets, "+Inf"), values):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{label_text}}} {values[-1]}")
+                lines.append(f"{name}_count{{{label_text}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetrics:
+    """Measurements of one request, shared with the threads serving it."""
+
+    def __init__(self, max_statements):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.query_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+        self.max_statements = max_statements
+        self.statements = []  # (seconds, sql) of the first max_statements queries
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.query_count += 1
+            self.query_time += duration
+            if len(self.statements) < self.max_statements:
+                self.statements.append((duration, sql))
+
+    def install(self):
+        """Wrap this thread's connections; returns the ExitStack that removes the wrappers."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self.record_query))
+        return stack
+
+
+def _timed_data(data_property):
+    def data(serializer):
+        metrics = _current_metrics.get()
+        if metrics is None or metrics.serializing:
+            return data_property.fget(serializer)
+        metrics.serializing = True
+        started = time.perf_counter()
+        try:
+            return data_property.fget(serializer)
+        finally:
+            metrics.serializer_time += time.perf_counter() - started
+            metrics.serializing = False
+    data.instrumented = True
+    return property(data)
+
+
+def instrument_serializers():
+    """Time serializer.data: the top-level call covers every nested serializer."""
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(serializer_class.data.fget, "instrumented", False):
+            serializer_class.data = _timed_data(serializer_class.data)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument_serializers()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics(getattr(settings, "SLOW_REQUEST_MAX_STATEMENTS", 100))
+        token = _current_metrics.set(metrics)
+        try:
+            with metrics.install():
+                response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        self.finish(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics(getattr(settings, "SLOW_REQUEST_MAX_STATEMENTS", 100))
+        token = _current_metrics.set(metrics)
+        # Sync code of the request (ORM calls included) runs in one thread
+        # per request; wrap that thread's connections
+        wrappers = await sync_to_async(metrics.install)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(wrappers.close)()
+            _current_metrics.reset(token)
+        self.finish(request, response, metrics)
+        return response
+
+    def finish(self, request, response, metrics):
+        match = request.resolver_match
+        if match is None or getattr(match.func, "view_class", None) is None:
+            return
+        elapsed = time.perf_counter() - metrics.started
+
+        user = vars(request).get("user")
+        role = getattr(user, "role", None) if getattr(user, "is_authenticated", False) else None
+        labels = (match.url_name or match.route, request.method, role or "anonymous")
+        values = {
+            "hrms_request_duration_seconds": elapsed,
+            "hrms_db_queries": metrics.query_count,
+            "hrms_db_duration_seconds": metrics.query_time,
+            "hrms_serializer_duration_seconds": metrics.serializer_time,
+        }
+        if not response.streaming:
+            values["hrms_response_size_bytes"] = len(response.content)
+        registry.observe(labels, values)
+
+        if elapsed * 1000 >= getattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 500):
+            statements = "\n".join(
+                f"  {duration * 1000:8.2f} ms  {sql}" for duration, sql in metrics.statements
+            )
+            logger.warning(
+                "Slow request %s %s (%s, %s): %.0f ms, %d queries in %.0f ms, serializer %.0f ms\n%s",
+                request.method, request.get_full_path(), labels[0], labels[2], elapsed * 1000,
+                metrics.query_count, metrics.query_time * 1000, metrics.serializer_time * 1000, statements,
+            )
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. With METRICS_TOKEN set, requires "Authorization: Bearer <token>";
+    without one it only answers while DEBUG is on.
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if not token and not settings.DEBUG:
+        return HttpResponseForbidden("Set METRICS_TOKEN to expose /metrics.")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,194 @@
+"""
+Keyset (cursor) pagination shared by the list endpoints.
+
+Pages are addressed by an opaque cursor holding the ordering values of the
+last (or first) row of the current page, so fetching page N is an indexed
+range scan rather than an OFFSET, and no COUNT(*) is ever issued.
+"""
+import base64
+import binascii
+import datetime
+import json
+import uuid
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _query_params(request):
+    # DRF requests expose query_params, plain Django requests (async views) GET
+    return getattr(request, "query_params", request.GET)
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a unique, composite ordering such as ("-created_at", "-id").
+    The last field must be unique so that ties on the leading fields are broken.
+    """
+    ordering = ("-created_at", "-id")
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self):
+        self.page_size = getattr(settings, "PAGINATION_PAGE_SIZE", 50)
+        self.max_page_size = getattr(settings, "PAGINATION_MAX_PAGE_SIZE", 500)
+
+    # Cursor encoding
+    def encode_cursor(self, reverse, values):
+        payload = json.dumps({"r": int(reverse), "v": [_encode_value(v) for v in values]})
+        token = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = _query_params(request).get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            values = payload["v"]
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return bool(payload["r"]), values
+        except (TypeError, ValueError, KeyError, binascii.Error, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_page_size(self, request):
+        try:
+            size = int(_query_params(request)[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    # Keyset filtering
+    def get_ordering(self, reverse):
+        if not reverse:
+            return list(self.ordering)
+        return [field[1:] if field.startswith("-") else f"-{field}" for field in self.ordering]
+
+    def get_keyset_filter(self, ordering, values):
+        """
+        Rows strictly after `values` in `ordering`, i.e. the lexicographic
+        comparison (a, b) > (x, y) spelled as a OR-chain. The redundant bound on
+        the leading column lets the database range-scan the index.
+        """
+        def lookup(field, strict):
+            name = field.lstrip("-")
+            op = "lt" if field.startswith("-") else "gt"
+            return name, op if strict else f"{op}e"
+
+        name, op = lookup(ordering[0], strict=False)
+        bound = Q(**{f"{name}__{op}": values[0]})
+
+        branches = []
+        for index, field in enumerate(ordering):
+            equal = {f.lstrip("-"): v for f, v in zip(ordering[:index], values[:index])}
+            name, op = lookup(field, strict=True)
+            branches.append(Q(**equal, **{f"{name}__{op}": values[index]}))
+        return bound & reduce(or_, branches)
+
+    def get_row_values(self, row):
+        return [getattr(row, field.lstrip("-")) for field in self.ordering]
+
+    def get_page_queryset(self, queryset, request):
+        """The ordered, filtered and sliced queryset of the requested page (plus one look-ahead row)."""
+        self.request = request
+        self.base_url = remove_query_param(request.build_absolute_uri(), self.cursor_query_param)
+        self.limit = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+        values = self.cursor[1] if self.cursor else None
+
+        ordering = self.get_ordering(self.reverse)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            try:
+                queryset = queryset.filter(self.get_keyset_filter(ordering, values))
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+        return queryset[:self.limit + 1]
+
+    @property
+    def reverse(self):
+        return bool(self.cursor and self.cursor[0])
+
+    def set_page(self, rows):
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        self.page = rows
+        return rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        """paginate_queryset() for async views, fetching the page with the async ORM."""
+        return self.set_page([row async for row in self.get_page_queryset(queryset, request)])
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.get_row_values(self.page[-1]))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(True, self.get_row_values(self.page[0]))
+
+    def get_paginated_data(self, data):
+        return {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class CreatedAtCursorPagination(KeysetPagination):
+    """Newest first, ties broken by primary key (Leave, Employee)."""
+    ordering = ("-created_at", "-id")
+
+
+class ChangedAtCursorPagination(KeysetPagination):
+    """Newest change first (LeavePolicyHistory)."""
+    ordering = ("-changed_at", "-id")
+
+
+class InboxCursorPagination(KeysetPagination):
+    """Oldest first, the order pending leaves are due in (PendingLeave)."""
+    ordering = ("created_at", "leave_id")
@@ -0,0 +1,253 @@
+"""
+Synthetic dataset generator behind the seed_hrms command.
+
+Creates organizations with holidays, an HR manager, employees, one policy per
+LeavePolicy.POLICY_TYPES value (with a version history) and a year of leaves
+per employee. Everything is written with bulk_create, a chunk of employees at
+a time, so memory stays flat whatever the size of the dataset. The output is
+deterministic for a given seed.
+
+bulk_create skips save() and signals, so what they would have maintained is
+rebuilt at the end: leave balances, analytics rollups, the approvals inbox,
+the policy and team calendar caches and the employee ETags.
+"""
+import random
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from analytics.rollups import rebuild_rollups
+from auth_app.models import User
+from employee.models import Employee
+from HRMS.conditional import bump_collection_version
+from leave.balances import rebuild_balances
+from leave.calendar import invalidate_calendar
+from leave.inbox import rebuild_inbox
+from leave.models import Leave
+from organization.models import Holiday, Organization
+from organization.workdays import working_days_by_organization
+from policy.cache import bump_policy_version
+from policy.models import LeavePolicy, LeavePolicyHistory
+from policy.versioning import checkpoint_interval, diff_states
+
+
+DEPARTMENTS = ["Engineering", "Sales", "Support", "Finance", "Operations", "People"]
+DESIGNATIONS = ["Associate", "Engineer", "Senior Engineer", "Analyst", "Manager", "Lead"]
+HOLIDAYS = [(1, 1, "New Year's Day"), (5, 1, "Labour Day"), (12, 25, "Christmas Day")]
+
+# Starting rules of each policy type
+POLICY_RULES = {
+    "ANNUAL": {"max_days_per_year": 20, "carry_forward_days": 5, "notice_period_days": 7,
+               "allow_encashment": True, "encashment_limit": 10},
+    "SICK": {"max_days_per_year": 12, "requires_document": True, "max_days_without_doc": 2},
+    "CASUAL": {"max_days_per_year": 8, "notice_period_days": 1},
+    "UNPAID": {"max_days_per_year": 30, "notice_period_days": 14},
+}
+
+# How often each policy type is taken, and (min, max) calendar days per leave
+LEAVE_MIX = {"ANNUAL": (40, (2, 7)), "SICK": (30, (1, 3)), "CASUAL": (25, (1, 2)), "UNPAID": (5, (3, 10))}
+
+# Status weights of leaves that already started, and of upcoming ones
+PAST_STATUSES = {"Approved": 75, "Rejected": 12, "Cancelled": 8, "Pending": 5}
+UPCOMING_STATUSES = {"Pending": 70, "Approved": 25, "Cancelled": 5}
+
+
+@contextmanager
+def explicit_timestamps(model, *field_names):
+    """Keep the values set on the instances for auto_now/auto_now_add fields."""
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def weighted_choice(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+class DatasetSeeder:
+    """
+    Seeds `organizations` organizations of `employees` employees each, with up
+    to `leaves` leaves per employee spread over the last year and the next two
+    months. Codes, emails and usernames all start with `prefix`, which must not
+    be in use yet. Every seeded user has the same password.
+    """
+
+    def __init__(self, organizations=1, employees=100, leaves=10, policy_versions=3,
+                 prefix="SEED", password="password123", seed=0, chunk_size=1000):
+        self.organizations = organizations
+        self.employees = employees
+        self.leaves = leaves
+        self.policy_versions = max(1, policy_versions)
+        self.prefix = prefix
+        self.password = password
+        self.rng = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.today = timezone.localdate()
+        self.now = timezone.now()
+        self.counts = dict.fromkeys(
+            ["organizations", "users", "employees", "policies", "policy_versions", "leaves", "holidays"], 0
+        )
+
+    def run(self):
+        if Organization.objects.filter(code__startswith=self.prefix).exists():
+            raise ValueError(f"Organizations with the prefix {self.prefix!r} already exist.")
+        self.password_hash = make_password(self.password)
+        handle = self.prefix.lower()
+        User.objects.create(
+            email=f"{handle}.admin@seed.example", username=f"{handle}_admin",
+            password=self.password_hash, role="SUPERADMIN", is_staff=True,
+        )
+        self.counts["users"] += 1
+
+        for index in range(1, self.organizations + 1):
+            organization = self.seed_organization(index)
+            bump_policy_version(organization.pk)
+            rebuild_balances(organization=organization)
+            rebuild_rollups(organization=organization)
+            rebuild_inbox(organization=organization)
+            bump_collection_version("employees", organization.pk)
+        return self.counts
+
+    def seed_organization(self, index):
+        code = f"{self.prefix}{index:03d}"
+        handle = code.lower()
+        with transaction.atomic():
+            organization = Organization.objects.create(name=f"{self.prefix} Organization {index}", code=code)
+            hr = User.objects.create(
+                email=f"{handle}.hr@seed.example", username=f"{handle}_hr",
+                password=self.password_hash, role="HR", organization=organization,
+            )
+            Holiday.objects.bulk_create([
+                Holiday(organization=organization, date=date(year, month, day), name=name)
+                for year in range(self.today.year - 1, self.today.year + 2)
+                for month, day, name in HOLIDAYS
+            ])
+            policies = self.seed_policies(organization, hr)
+        self.counts["organizations"] += 1
+        self.counts["users"] += 1
+        self.counts["holidays"] += 3 * len(HOLIDAYS)
+
+        for first in range(0, self.employees, self.chunk_size):
+            numbers = range(first + 1, min(first + self.chunk_size, self.employees) + 1)
+            with transaction.atomic():
+                self.seed_employees(organization, hr, policies, handle, numbers)
+
+        invalidate_calendar(
+            organization.pk, self.today - timedelta(days=400), self.today + timedelta(days=90)
+        )
+        return organization
+
+    def seed_policies(self, organization, hr):
+        interval = checkpoint_interval()
+        policies = {}
+        history = []
+        for policy_type, label in LeavePolicy.POLICY_TYPES:
+            state = {
+                "name": label, "policy_type": policy_type, "description": f"Seeded {label.lower()} policy",
+                "max_days_per_year": 0, "carry_forward_days": 0, "requires_document": False,
+                "max_days_without_doc": 0, "notice_period_days": 0, "allow_encashment": False,
+                "encashment_limit": 0, "is_active": True, **POLICY_RULES[policy_type],
+            }
+            states = [state]
+            for _ in range(self.policy_versions - 1):
+                state = dict(state)
+                state["max_days_per_year"] = max(1, state["max_days_per_year"] + self.rng.choice([-2, -1, 1, 2]))
+                state["notice_period_days"] = max(0, state["notice_period_days"] + self.rng.choice([-1, 0, 1]))
+                states.append(state)
+
+            policy = LeavePolicy(
+                organization=organization, created_by=hr, version=len(states), **states[-1]
+            )
+            policies[policy_type] = policy
+            # Versions are spread over the past year, the current one last
+            moments = sorted(
+                self.now - timedelta(days=self.rng.randint(1, 365), minutes=self.rng.randint(0, 1439))
+                for _ in states
+            )
+            previous = {}
+            for number, (version_state, moment) in enumerate(zip(states, moments), start=1):
+                is_checkpoint = (number - 1) % interval == 0
+                history.append(LeavePolicyHistory(
+                    policy=policy, version_number=number, changes=diff_states(previous, version_state),
+                    snapshot=version_state if is_checkpoint else None, is_checkpoint=is_checkpoint,
+                    changed_by=hr, changed_at=moment,
+                ))
+                previous = version_state
+
+        LeavePolicy.objects.bulk_create(policies.values())
+        with explicit_timestamps(LeavePolicyHistory, "changed_at"):
+            LeavePolicyHistory.objects.bulk_create(history, batch_size=1000)
+        self.counts["policies"] += len(policies)
+        self.counts["policy_versions"] += len(history)
+        return policies
+
+    def seed_employees(self, organization, hr, policies, handle, numbers):
+        users = User.objects.bulk_create([
+            User(
+                email=f"{handle}.emp{number}@seed.example", username=f"{handle}_emp{number}",
+                password=self.password_hash, role="EMPLOYEE", organization=organization,
+            )
+            for number in numbers
+        ])
+        employees = Employee.objects.bulk_create([
+            Employee(
+                user=user, organization=organization, employee_code=f"{handle.upper()}-{number:06d}",
+                department=self.rng.choice(DEPARTMENTS), designation=self.rng.choice(DESIGNATIONS),
+                date_of_joining=self.today - timedelta(days=self.rng.randint(400, 3650)),
+            )
+            for number, user in zip(numbers, users)
+        ])
+        leaves = [
+            leave
+            for employee in employees
+            for leave in self.employee_leaves(organization, employee, hr, policies)
+        ]
+        # The days a leave books are counted once, on the calendar it was applied under
+        booked = working_days_by_organization([(organization, leave.start_date, leave.end_date) for leave in leaves])
+        for leave, days in zip(leaves, booked):
+            leave.days = days
+            leave.applied_department = leave.employee.department
+        with explicit_timestamps(Leave, "created_at", "updated_at"):
+            Leave.objects.bulk_create(leaves, batch_size=1000)
+        self.counts["users"] += len(users)
+        self.counts["employees"] += len(employees)
+        self.counts["leaves"] += len(leaves)
+
+    def employee_leaves(self, organization, employee, hr, policies):
+        """Non-overlapping leaves from a year ago to two months ahead."""
+        horizon = self.today + timedelta(days=60)
+        start = self.today - timedelta(days=365 - self.rng.randint(0, 20))
+        mix = {policy_type: weight for policy_type, (weight, _) in LEAVE_MIX.items()}
+        leaves = []
+        while len(leaves) < self.leaves and start <= horizon:
+            policy_type = weighted_choice(self.rng, mix)
+            policy = policies[policy_type]
+            shortest, longest = LEAVE_MIX[policy_type][1]
+            end = start + timedelta(days=self.rng.randint(shortest, longest) - 1)
+            status = weighted_choice(self.rng, PAST_STATUSES if start <= self.today else UPCOMING_STATUSES)
+
+            applied = datetime.combine(
+                start - timedelta(days=policy.notice_period_days + self.rng.randint(1, 20)),
+                time(self.rng.randint(8, 18), self.rng.randint(0, 59)),
+            )
+            created_at = min(timezone.make_aware(applied), self.now)
+            reviewed_at = None
+            if status != "Pending":
+                reviewed_at = min(created_at + timedelta(hours=self.rng.randint(1, 72)), self.now)
+            leaves.append(Leave(
+                organization=organization, employee=employee, user_id=employee.user_id, policy=policy,
+                start_date=start, end_date=end, reason=f"{policy.name} ({status.lower()})", status=status,
+                reviewed_by=hr if reviewed_at else None, reviewed_at=reviewed_at,
+                remarks="Seeded review" if reviewed_at else None,
+                created_at=created_at, updated_at=reviewed_at or created_at,
+            ))
+            start = end + timedelta(days=self.rng.randint(7, 40))
+        return leaves
@@ -44,13 +44,17 @@ INSTALLED_APPS = [
     'employee',
     'policy',
     'leave',
+    'analytics',
+    'notifications',
     'rest_framework_simplejwt',
 
 
 ]
 
 MIDDLEWARE = [
+    'HRMS.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'HRMS.db_routing.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -86,8 +90,21 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'hrms_dev1.sqlite3',
+        # SQLite: take the write lock when a transaction begins, so concurrent writers
+        # queue on the busy timeout instead of failing to upgrade a read lock mid-way
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
     }
 }
+
+# Read replica (HRMS/db_routing.py): safe requests to the views of READ_REPLICA_APPS
+# read from this alias. Locally it is a second connection to the same file; point it
+# at the replica's host in production. Tests mirror it onto the test database.
+DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+DATABASE_ROUTERS = ['HRMS.db_routing.ReplicaRouter']
+READ_REPLICA_ALIAS = 'replica'
+READ_REPLICA_APPS = ['leave', 'employee', 'policy', 'organization']
+# After a write, the user's reads stay on the primary for this many seconds.
+READ_YOUR_WRITES_SECONDS = 5
 AUTH_USER_MODEL = 'auth_app.User'
 
 
@@ -132,8 +149,19 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# When enabled, API requests are authenticated from the access-token claims
+# (role, organization, token version) without loading the User row.
+# See auth_app/authentication.py.
+STATELESS_JWT_AUTH = False
+# Seconds a process trusts its cached token version. This is the revocation window:
+# with a per-process cache (the default LocMemCache), a deactivated or changed user
+# keeps access on the other workers for up to this long. 0 reads the row every request.
+TOKEN_VERSION_CACHE_TIMEOUT = 5
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        'auth_app.authentication.StatelessJWTAuthentication'
+        if STATELESS_JWT_AUTH else
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
@@ -141,10 +169,105 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Keyset-paginated list endpoints (see HRMS/pagination.py).
+# Clients may ask for a different size with ?page_size=, capped at PAGINATION_MAX_PAGE_SIZE.
+PAGINATION_PAGE_SIZE = 50
+PAGINATION_MAX_PAGE_SIZE = 500
+
+# Bulk employee import (employee/bulk_import.py): rows per bulk_create. Uploads to
+# /employees/import/ hash passwords in-process; import_employees --workers N uses a pool.
+EMPLOYEE_IMPORT_CHUNK_SIZE = 1000
+
+# Team calendar cache lifetime in seconds. Entries are also orphaned on every leave change
+# by bumping the month's LeaveCalendarVersion row, which all processes read.
+LEAVE_CALENDAR_CACHE_TIMEOUT = 600
+
+# Per-process LeavePolicy cache (policy/cache.py): organizations kept in the LRU
+# and the maximum age of an entry in seconds, on top of the version check.
+POLICY_CACHE_MAX_ORGANIZATIONS = 256
+POLICY_CACHE_TTL = 300
+
+# Compiled working-day calendars (organization/workdays.py): (organization, year)
+# entries kept per process and their maximum age in seconds, on top of the version check.
+WORKING_CALENDAR_CACHE_SIZE = 1024
+WORKING_CALENDAR_CACHE_TTL = 300
+
+# Leave writes that check the balance ledger (leave/balances.py) run again from
+# scratch when they lose a race (lock errors, or a ledger row that changed under an
+# optimistic check on databases without row locks), up to this many times, after a
+# jittered exponential backoff starting at RETRY_DELAY seconds.
+LEAVE_WRITE_RETRIES = 8
+LEAVE_WRITE_RETRY_DELAY = 0.01
+LEAVE_WRITE_RETRY_MAX_DELAY = 0.5
+
+# Approvals inbox (leave/inbox.py): the review SLA in days that /leaves/inbox/aging/
+# reports overdue leaves against, and the ages (in days) it counts leaves beyond.
+LEAVE_INBOX_SLA_DAYS = 3
+LEAVE_INBOX_AGING_BUCKETS = [1, 3, 7, 14]
+
+# Leave attachments (leave/attachments.py) are stored once per content under
+# MEDIA_ROOT/leave_attachments/, streamed to disk in chunks of CHUNK_SIZE bytes while
+# they are hashed. Larger files and other types (sniffed from the first bytes) are
+# refused while the upload is being read. gc_leave_attachments keeps unreferenced
+# files for GC_GRACE_SECONDS, since an upload references its file just after storing it.
+LEAVE_ATTACHMENT_MAX_BYTES = 5 * 1024 * 1024
+LEAVE_ATTACHMENT_CHUNK_SIZE = 64 * 1024
+LEAVE_ATTACHMENT_TYPES = ["application/pdf", "image/png", "image/jpeg"]
+LEAVE_ATTACHMENT_GC_GRACE_SECONDS = 24 * 3600
+# Let the web server send attachment files: "X-Accel-Redirect" (nginx, with an internal
+# location at the prefix aliasing MEDIA_ROOT) or "X-Sendfile" (Apache, prefix = MEDIA_ROOT/).
+LEAVE_ATTACHMENT_SENDFILE_HEADER = None
+LEAVE_ATTACHMENT_SENDFILE_PREFIX = "/protected/"
+
+# Policy history stores a full snapshot every N versions and diffs in between.
+POLICY_HISTORY_CHECKPOINT_INTERVAL = 10
+
+# Year-end close: employees per chunk. Requests to the API close in-process and stop
+# starting new chunks after the time budget (seconds); repeat them to resume.
+# close_leave_year --workers N uses a process pool (on PostgreSQL; SQLite serializes writers).
+YEAR_END_CHUNK_SIZE = 1000
+YEAR_END_REQUEST_TIME_BUDGET = 20
+
+# Request metrics (HRMS/metrics.py), served at /metrics in the Prometheus format.
+# Set METRICS_TOKEN to require "Authorization: Bearer <token>" from the scraper; without
+# one, /metrics is only served while DEBUG is on.
+# Requests slower than the threshold are logged with (up to N of) their SQL statements.
+METRICS_TOKEN = None
+SLOW_REQUEST_THRESHOLD_MS = 500
+SLOW_REQUEST_MAX_STATEMENTS = 100
+
+# Leave notifications (notifications/): events claimed per batch by the
+# dispatch_notifications worker, how long a claim is held, and the retry schedule
+# (base delay doubled per attempt, capped) before an event is marked Failed.
+NOTIFICATION_BATCH_SIZE = 100
+NOTIFICATION_LEASE_SECONDS = 60
+NOTIFICATION_MAX_ATTEMPTS = 8
+NOTIFICATION_RETRY_BASE_SECONDS = 30
+NOTIFICATION_RETRY_MAX_SECONDS = 3600
+
+# Notifications are sent through the email backend: the file backend writes them
+# under EMAIL_FILE_PATH; switch to the SMTP backend (EMAIL_HOST, ...) in production.
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
+EMAIL_TIMEOUT = 10
+DEFAULT_FROM_EMAIL = 'hrms@localhost'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'hrms.slow_requests': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'UPDATE_LAST_LOGIN': True,
+    'TOKEN_OBTAIN_SERIALIZER': 'auth_app.tokens.HRMSTokenObtainPairSerializer',
 }
@@ -0,0 +1,43 @@
+"""
+Test helpers shared by the app test suites.
+"""
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+
+# For test cases whose requests hash passwords or write large batches: under the test
+# database they regularly cross SLOW_REQUEST_THRESHOLD_MS, and every one would dump its SQL
+quiet_slow_requests = override_settings(SLOW_REQUEST_THRESHOLD_MS=60_000)
+
+
+class QueryPlanMixin:
+    """
+    Runs a request, captures every SELECT it issues and checks the
+    SQLite query plan of each one for full table scans.
+    """
+
+    def get_query_plans(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in captured.captured_queries:
+                sql = query["sql"]
+                if not sql.lstrip().upper().startswith("SELECT"):
+                    continue
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plans.append((sql, [row[-1] for row in cursor.fetchall()]))
+        return plans
+
+    def assertNoFullTableScan(self, url):
+        if connection.vendor != "sqlite":
+            self.skipTest("Query plan assertions are written against SQLite's EXPLAIN QUERY PLAN.")
+        for sql, plan in self.get_query_plans(url):
+            full_scans = [
+                step for step in plan
+                if step.startswith("SCAN ") and "USING" not in step and "CONSTANT ROW" not in step
+            ]
+            self.assertFalse(full_scans, f"Full table scan {full_scans} in plan {plan} for: {sql}")
@@ -1,9 +1,12 @@
 from django.contrib import admin
 from django.urls import include, path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from .metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # Prometheus scrape endpoint (HRMS/metrics.py)
+    path('metrics', metrics_view, name='metrics'),
 
     # existing urls...
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -14,4 +17,5 @@ urlpatterns = [
     path('', include('employee.urls')),
     path('', include('policy.urls')),
     path('', include('leave.urls')),
+    path('', include('analytics.urls')),
 ]
@@ -0,0 +1,17 @@
+from django.contrib import admin
+from .models import LeaveRollup
+
+
+@admin.register(LeaveRollup)
+class LeaveRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        "organization",
+        "department",
+        "policy",
+        "month",
+        "status",
+        "leave_count",
+        "leave_days",
+        "reviewed_count",
+    )
+    list_filter = ("status", "organization", "month")
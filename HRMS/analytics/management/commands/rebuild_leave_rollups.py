@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from organization.models import Organization
+from analytics.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the leave analytics rollups from the Leave table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--organization", help="Organization code to rebuild (default: all).")
+
+    def handle(self, *args, **options):
+        organization = None
+        if options["organization"]:
+            try:
+                organization = Organization.objects.get(code=options["organization"])
+            except Organization.DoesNotExist:
+                raise CommandError(f"No organization with code {options['organization']!r}.")
+
+        written = rebuild_rollups(organization=organization)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} leave rollup rows."))
@@ -0,0 +1,36 @@
+from django.db import models
+from organization.models import Organization
+from policy.models import LeavePolicy
+
+
+class LeaveRollup(models.Model):
+    """
+    Leave totals per (organization, department, policy, month, status).
+    Maintained incrementally from leave changes (analytics/rollups.py) and
+    rebuilt from the leave table by the rebuild_leave_rollups command.
+    """
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="leave_rollups")
+    department = models.CharField(max_length=100)
+    policy = models.ForeignKey(
+        LeavePolicy, on_delete=models.SET_NULL, null=True, blank=True, related_name="leave_rollups"
+    )
+    month = models.DateField()  # first day of the month the leave starts in
+    status = models.CharField(max_length=20)
+
+    leave_count = models.IntegerField(default=0)
+    leave_days = models.IntegerField(default=0)  # working days
+    reviewed_count = models.IntegerField(default=0)
+    turnaround_seconds = models.BigIntegerField(default=0)  # sum of created → reviewed
+
+    class Meta:
+        db_table = "analytics_leave_rollup"
+        verbose_name = "Leave Rollup"
+        verbose_name_plural = "Leave Rollups"
+        unique_together = ("organization", "department", "policy", "month", "status")
+        indexes = [
+            # Dashboards filter one organization over a range of months
+            models.Index(fields=["organization", "month"], name="rollup_org_month_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.organization_id} | {self.department} | {self.month:%Y-%m} ({self.status})"
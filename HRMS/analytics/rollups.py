@@ -0,0 +1,167 @@
+# analytics/rollups.py
+"""
+Leave rollups: running totals per (organization, department, policy, month, status).
+
+A leave contributes one row to the bucket of its current state: 1 leave, the
+working days booked when it was applied for (leave.balances.booked_days), and
+its review turnaround once reviewed. When a leave changes,
+its previous contribution (from the values remembered at load time, see
+Leave.TRACKED_FIELDS) is subtracted and the new one added, so every write
+costs a couple of single-row updates instead of a scan of the leave table.
+
+Leaves are attributed to the month they start in and to the department the
+employee was in when they applied (Leave.applied_department), so a transfer does not
+move past contributions. Deleting an employee or policy is not
+tracked incrementally; rebuild_rollups() realigns the table from the leaves.
+"""
+from collections import defaultdict
+from datetime import date
+from itertools import islice
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Coalesce
+from leave.balances import booked_days
+from leave.models import Leave
+from .models import LeaveRollup
+
+
+MEASURES = ("leave_count", "leave_days", "reviewed_count", "turnaround_seconds")
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def contribution(days, created_at, reviewed_at):
+    """The measures one leave adds to its bucket."""
+    turnaround = 0
+    if reviewed_at is not None and created_at is not None:
+        turnaround = max(0, int((reviewed_at - created_at).total_seconds()))
+    return {
+        "leave_count": 1,
+        "leave_days": days,
+        "reviewed_count": 1 if reviewed_at is not None else 0,
+        "turnaround_seconds": turnaround,
+    }
+
+
+def record_leave_changes(leaves, deleted=False):
+    """
+    Move the contributions of saved (or deleted) leaves between rollup buckets.
+    Leaves without a loaded state were just created. Must run in the
+    transaction that wrote the leaves.
+    """
+    entries = []  # (sign, leave, state)
+    for leave in leaves:
+        old_state = getattr(leave, "_loaded_state", None)
+        new_state = None if deleted else leave.get_tracked_state()
+        if old_state == new_state:
+            continue
+        if old_state is not None:
+            entries.append((-1, leave, old_state))
+        if new_state is not None:
+            entries.append((1, leave, new_state))
+        leave._loaded_state = new_state
+
+    if not entries:
+        return
+    leave_days = booked_days([
+        (leave.organization, state["start_date"], state["end_date"], state["days"]) for _, leave, state in entries
+    ])
+
+    deltas = defaultdict(lambda: dict.fromkeys(MEASURES, 0))
+    for (sign, leave, state), days in zip(entries, leave_days):
+        key = (
+            leave.organization_id,
+            state["applied_department"] if state["applied_department"] is not None else leave.employee.department,
+            state["policy_id"],
+            month_start(state["start_date"]),
+            state["status"],
+        )
+        for measure, value in contribution(days, leave.created_at, state["reviewed_at"]).items():
+            deltas[key][measure] += sign * value
+
+    apply_deltas({key: delta for key, delta in deltas.items() if any(delta.values())})
+
+
+def bucket_key(rollup):
+    return (rollup.organization_id, rollup.department, rollup.policy_id, rollup.month, rollup.status)
+
+
+def apply_deltas(deltas):
+    """
+    Add {bucket key: measure deltas} to the rollup table: one locked read of
+    the buckets, one bulk_update and one bulk_create for the missing ones.
+    """
+    if not deltas:
+        return
+    existing = {}
+    for rollup in LeaveRollup.objects.select_for_update().filter(
+        organization_id__in={key[0] for key in deltas},
+        department__in={key[1] for key in deltas},
+        month__in={key[3] for key in deltas},
+        status__in={key[4] for key in deltas},
+    ):
+        # Deleted policies leave NULL-policy buckets that may repeat; only ever touch one
+        existing.setdefault(bucket_key(rollup), rollup)
+
+    changed = []
+    missing = []
+    for key, delta in deltas.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            organization_id, department, policy_id, month, leave_status = key
+            missing.append(LeaveRollup(
+                organization_id=organization_id, department=department, policy_id=policy_id,
+                month=month, status=leave_status, **delta,
+            ))
+            continue
+        for measure, value in delta.items():
+            setattr(rollup, measure, getattr(rollup, measure) + value)
+        changed.append(rollup)
+
+    LeaveRollup.objects.bulk_update(changed, MEASURES, batch_size=1000)
+    if missing:
+        try:
+            with transaction.atomic():
+                LeaveRollup.objects.bulk_create(missing, batch_size=1000)
+        except IntegrityError:
+            # A concurrent writer created some of these buckets first; add to its rows instead
+            apply_deltas({bucket_key(rollup): {m: getattr(rollup, m) for m in MEASURES} for rollup in missing})
+
+
+def rebuild_rollups(organization=None, chunk_size=2000):
+    """
+    Recompute the rollup table (or one organization's part of it) from the
+    leave table. Returns the number of rollup rows written.
+    """
+    leaves = Leave.objects.all()
+    rollups = LeaveRollup.objects.all()
+    if organization is not None:
+        leaves = leaves.filter(organization=organization)
+        rollups = rollups.filter(organization=organization)
+
+    rows = leaves.annotate(bucket_department=Coalesce("applied_department", "employee__department")).values_list(
+        "organization_id", "bucket_department", "policy_id", "start_date", "end_date", "days",
+        "status", "created_at", "reviewed_at",
+    ).iterator(chunk_size=chunk_size)
+
+    totals = defaultdict(lambda: dict.fromkeys(MEASURES, 0))
+    organizations = {}
+    while chunk := list(islice(rows, chunk_size)):
+        leave_days = booked_days([(row[0], row[3], row[4], row[5]) for row in chunk], organizations)
+        for row, days in zip(chunk, leave_days):
+            organization_id, department, policy_id, start_date, _, _, leave_status, created_at, reviewed_at = row
+            key = (organization_id, department, policy_id, month_start(start_date), leave_status)
+            for measure, value in contribution(days, created_at, reviewed_at).items():
+                totals[key][measure] += value
+
+    with transaction.atomic():
+        rollups.delete()
+        LeaveRollup.objects.bulk_create([
+            LeaveRollup(
+                organization_id=organization_id, department=department, policy_id=policy_id,
+                month=month, status=leave_status, **measures,
+            )
+            for (organization_id, department, policy_id, month, leave_status), measures in totals.items()
+        ], batch_size=1000)
+    return len(totals)
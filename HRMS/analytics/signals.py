@@ -0,0 +1,18 @@
+# analytics/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from leave.models import Leave
+from .rollups import record_leave_changes
+
+
+@receiver(post_save, sender=Leave)
+def update_leave_rollups(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_leave_changes([instance])
+
+
+@receiver(post_delete, sender=Leave)
+def remove_leave_from_rollups(sender, instance, origin=None, **kwargs):
+    # Cascades from employee / organization deletes are left to rebuild_rollups()
+    if isinstance(origin, Leave) or getattr(origin, "model", None) is Leave:
+        record_leave_changes([instance], deleted=True)
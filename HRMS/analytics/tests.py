@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from HRMS.testing import QueryPlanMixin
+from leave.models import Leave
+from leave.tests import LeaveTestMixin
+from .models import LeaveRollup
+from .rollups import rebuild_rollups
+
+
+class LeaveRollupTests(QueryPlanMixin, LeaveTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.start = date.today() + timedelta(days=10)
+
+    def rollup_rows(self):
+        return sorted(
+            LeaveRollup.objects.filter(leave_count__gt=0).values_list(
+                "department", "policy_id", "month", "status",
+                "leave_count", "leave_days", "reviewed_count", "turnaround_seconds",
+            )
+        )
+
+    def make_history(self):
+        ids = [
+            self.apply(self.start + timedelta(days=offset), self.start + timedelta(days=offset + 1)).data["id"]
+            for offset in (0, 5, 10, 15)
+        ]
+        self.review(ids[0], "approve")
+        self.review(ids[1], "reject")
+        self.client.force_authenticate(self.hr)
+        self.client.post("/leaves/bulk-review/", {"items": [
+            {"id": ids[2], "action": "approve"}, {"id": ids[0], "action": "cancel"},
+        ]}, format="json")
+        self.client.delete(f"/leaves/{ids[3]}/")
+        return ids
+
+    def test_incremental_rollups_match_rebuild(self):
+        self.make_history()
+        incremental = self.rollup_rows()
+        self.assertEqual(sum(row[4] for row in incremental), Leave.objects.count())
+
+        rebuild_rollups()
+        self.assertEqual(self.rollup_rows(), incremental)
+
+    def test_transfer_keeps_contributions_in_the_credited_department(self):
+        leave_id = self.apply(self.start, self.start + timedelta(days=1)).data["id"]
+        self.employee.department = "Sales"
+        self.employee.save()
+        self.review(leave_id, "approve")
+
+        rows = self.rollup_rows()
+        self.assertEqual([(row[0], row[3], row[4]) for row in rows], [("Engineering", "Approved", 1)])
+        self.assertFalse(LeaveRollup.objects.filter(leave_count__lt=0).exists())
+        rebuild_rollups()
+        self.assertEqual(self.rollup_rows(), rows)
+
+    def test_group_by_and_filters(self):
+        self.make_history()
+        self.client.force_authenticate(self.hr)
+        response = self.client.get("/analytics/leaves/?group_by=department,status")
+        self.assertEqual(response.status_code, 200)
+        by_status = {row["status"]: row for row in response.data["results"]}
+        self.assertEqual(set(by_status), {"Approved", "Rejected", "Cancelled"})
+        self.assertEqual(by_status["Approved"]["leave_days"], 2)
+        self.assertEqual(by_status["Approved"]["reviewed_count"], 1)
+        self.assertIsNotNone(by_status["Approved"]["avg_turnaround_hours"])
+
+        month = self.start.strftime("%Y-%m")
+        response = self.client.get(f"/analytics/leaves/?status=Approved,Rejected&from={month}&to={month}")
+        expected = Leave.objects.filter(
+            status__in=["Approved", "Rejected"], start_date__year=self.start.year, start_date__month=self.start.month,
+        ).count()
+        self.assertEqual(response.data["results"][0]["leave_count"], expected)
+
+        self.assertEqual(self.client.get("/analytics/leaves/?group_by=reason").status_code, 400)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get("/analytics/leaves/").status_code, 403)
+
+    def test_dashboard_reads_only_the_rollup_index(self):
+        self.make_history()
+        self.client.force_authenticate(self.hr)
+        url = "/analytics/leaves/?group_by=month,policy&from=2020-01&to=2030-12"
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(url)
+        self.assertFalse([q["sql"] for q in captured.captured_queries if 'FROM "leave"' in q["sql"]])
+        self.assertNoFullTableScan(url)
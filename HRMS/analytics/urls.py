@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import LeaveAnalyticsView
+
+urlpatterns = [
+    path("analytics/leaves/", LeaveAnalyticsView.as_view(), name="analytics-leaves"),
+]
@@ -0,0 +1,119 @@
+from datetime import date
+from django.db.models import F, Sum
+from django.db.models.functions import ExtractYear
+from rest_framework import permissions, status
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from leave.models import Leave
+from leave.views import parse_uuid_param
+from .models import LeaveRollup
+
+
+# group_by name → expression over LeaveRollup
+DIMENSIONS = {
+    "department": F("department"),
+    "policy": F("policy_id"),
+    "policy_name": F("policy__name"),
+    "month": F("month"),
+    "year": ExtractYear("month"),
+    "status": F("status"),
+}
+
+
+AGGREGATES = {
+    "total_leaves": Sum("leave_count"),
+    "total_days": Sum("leave_days"),
+    "total_reviewed": Sum("reviewed_count"),
+    "total_turnaround": Sum("turnaround_seconds"),
+}
+
+
+def parse_month(params, name):
+    try:
+        year, month = params[name].split("-")
+        return date(int(year), int(month), 1)
+    except ValueError:
+        raise ValidationError({name: "Use the YYYY-MM format."})
+
+
+def parse_list(params, name):
+    return [value for value in params[name].split(",") if value]
+
+
+class LeaveAnalyticsView(APIView):
+    """
+    Leave utilization answered from the rollup table, never from the leave table.
+
+    Query params:
+      - group_by: comma-separated subset of department, policy, policy_name, month, year, status
+      - from, to: month range (YYYY-MM, inclusive)
+      - department, status, policy: filters, comma-separated values allowed
+      - organization: organization UUID (SUPERADMIN only)
+    Every result row has leave_count, leave_days (working days), reviewed_count
+    and avg_turnaround_hours (created → reviewed).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self, request):
+        user = request.user
+        params = request.query_params
+
+        if user.role == "HR":
+            rollups = LeaveRollup.objects.filter(organization_id=user.organization_id)
+        elif user.role == "SUPERADMIN":
+            rollups = LeaveRollup.objects.all()
+            if params.get("organization"):
+                rollups = rollups.filter(organization_id=parse_uuid_param(params, "organization"))
+        else:
+            raise PermissionDenied("Only HR and SUPERADMIN can view leave analytics.")
+
+        if params.get("from"):
+            rollups = rollups.filter(month__gte=parse_month(params, "from"))
+        if params.get("to"):
+            rollups = rollups.filter(month__lte=parse_month(params, "to"))
+        if params.get("department"):
+            rollups = rollups.filter(department__in=parse_list(params, "department"))
+        if params.get("status"):
+            statuses = parse_list(params, "status")
+            if not set(statuses) <= set(dict(Leave.STATUS_CHOICES)):
+                raise ValidationError({"status": "Invalid status."})
+            rollups = rollups.filter(status__in=statuses)
+        if params.get("policy"):
+            policy_ids = [parse_uuid_param({"policy": value}, "policy") for value in parse_list(params, "policy")]
+            rollups = rollups.filter(policy_id__in=policy_ids)
+        return rollups
+
+    def get(self, request):
+        group_by = parse_list(request.query_params, "group_by") if request.query_params.get("group_by") else []
+        unknown = [name for name in group_by if name not in DIMENSIONS]
+        if unknown:
+            raise ValidationError({"group_by": f"Unknown dimension(s): {', '.join(unknown)}. "
+                                               f"Use {', '.join(DIMENSIONS)}."})
+
+        rollups = self.get_queryset(request)
+        if group_by:
+            # Buckets emptied by status changes stay behind with zero counts
+            totals = (
+                rollups.values(**{f"_{name}": DIMENSIONS[name] for name in group_by})
+                .annotate(**AGGREGATES)
+                .filter(total_leaves__gt=0)
+                .order_by(*(f"_{name}" for name in group_by))
+            )
+        else:
+            totals = [rollups.aggregate(**AGGREGATES)]
+
+        results = []
+        for row in totals:
+            reviewed = row["total_reviewed"] or 0
+            result = {name: row[f"_{name}"] for name in group_by}
+            result.update({
+                "leave_count": row["total_leaves"] or 0,
+                "leave_days": row["total_days"] or 0,
+                "reviewed_count": reviewed,
+                "avg_turnaround_hours": (
+                    round(row["total_turnaround"] / reviewed / 3600, 2) if reviewed else None
+                ),
+            })
+            results.append(result)
+        return Response({"group_by": group_by, "results": results}, status=status.HTTP_200_OK)
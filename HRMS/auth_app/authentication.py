@@ -0,0 +1,141 @@
+# auth_app/authentication.py
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .models import StatelessUser, User
+
+
+# Claims added to every token by HRMSRefreshToken (auth_app/tokens.py)
+TOKEN_CLAIMS = ("role", "organization_id", "token_version", "email", "username")
+
+# Cached token version of a user that is inactive or deleted
+REVOKED = -1
+
+
+def _version_cache_key(user_id):
+    return f"auth-token-version:{user_id}"
+
+
+def _version_cache_timeout():
+    return getattr(settings, "TOKEN_VERSION_CACHE_TIMEOUT", 5)
+
+
+def remember_token_version(user):
+    """Called after every User save so the new version is seen without a DB read."""
+    version = user.token_version if user.is_active else REVOKED
+    cache.set(_version_cache_key(user.pk), version, _version_cache_timeout())
+
+
+def get_token_version(user_id):
+    key = _version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        row = User.objects.filter(pk=user_id).values_list("token_version", "is_active").first()
+        version = row[0] if row and row[1] else REVOKED
+        cache.set(key, version, _version_cache_timeout())
+    return version
+
+
+async def aget_token_version(user_id):
+    key = _version_cache_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        row = await User.objects.filter(pk=user_id).values_list("token_version", "is_active").afirst()
+        version = row[0] if row and row[1] else REVOKED
+        await cache.aset(key, version, _version_cache_timeout())
+    return version
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the role / organization claims of the access
+    token instead of loading the User row on every request.
+
+    The only state consulted is the user's token version, served from the cache
+    (one small DB read on a miss). Changing any of User.TOKEN_FIELDS (role,
+    organization, password, email, username) or deactivating the user bumps
+    User.token_version, which rejects older tokens. Other processes see the bump
+    once their cached version expires (TOKEN_VERSION_CACHE_TIMEOUT).
+    Tokens issued before these claims existed fall back to the regular DB lookup.
+    """
+
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in TOKEN_CLAIMS):
+            return super().get_user(validated_token)
+
+        user_id = self.get_user_id(validated_token)
+        return self.build_user(validated_token, user_id, get_token_version(user_id))
+
+    def get_user_id(self, validated_token):
+        try:
+            return int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken("Token contained no recognizable user identification")
+
+    def build_user(self, validated_token, user_id, version):
+        if version == REVOKED:
+            raise AuthenticationFailed("User not found or inactive", code="user_inactive")
+        if validated_token["token_version"] != version:
+            raise AuthenticationFailed("Token has been revoked, please log in again.", code="token_not_valid")
+
+        organization_id = validated_token["organization_id"]
+        user = StatelessUser(
+            id=user_id,
+            email=validated_token["email"],
+            username=validated_token["username"],
+            role=validated_token["role"],
+            organization_id=uuid.UUID(organization_id) if organization_id else None,
+            token_version=version,
+            is_active=True,
+        )
+        user._state.adding = False
+        user._state.db = "default"
+        return user
+
+
+class AsyncJWTAuthentication(StatelessJWTAuthentication):
+    """
+    JWT authentication for the async views (HRMS/async_views.py).
+
+    Parsing and verifying the token is pure CPU work; the only I/O (the token
+    version, or the User row when STATELESS_JWT_AUTH is off or the token
+    predates the role claims) goes through the async cache and ORM, so the
+    event loop is never blocked.
+    """
+
+    async def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        stateless = getattr(settings, "STATELESS_JWT_AUTH", False)
+        if stateless and all(claim in validated_token for claim in TOKEN_CLAIMS):
+            user_id = self.get_user_id(validated_token)
+            return self.build_user(validated_token, user_id, await aget_token_version(user_id))
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+        try:
+            user = await User.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+        return user
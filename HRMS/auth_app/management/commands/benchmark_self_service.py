@@ -0,0 +1,89 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from auth_app.models import User
+from auth_app.tokens import HRMSRefreshToken
+from HRMS.benchmark import client_settings, summarize
+
+
+ENDPOINTS = {
+    "employee-me": ("/employees/me/", "/async/employees/me/"),
+    "leave-me": ("/leaves/me/", "/async/leaves/me/"),
+    "policy-myorg": ("/policies/myorg/", "/async/policies/myorg/"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync self-service endpoints with their async twins under concurrent load. "
+        "Requests go through Django's WSGI and ASGI request handlers in-process (no server), "
+        "so the numbers compare the two code paths, not deployments."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", required=True, help="User the requests are authenticated as.")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and mode.")
+        parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight at once.")
+        parser.add_argument(
+            "--endpoint", action="append", choices=list(ENDPOINTS),
+            help="Endpoint to benchmark (repeatable; default: all).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options["email"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']!r}.")
+        headers = {"Authorization": f"Bearer {HRMSRefreshToken.for_user(user).access_token}"}
+
+        results = {}
+        with client_settings():
+            for name in options["endpoint"] or ENDPOINTS:
+                sync_url, async_url = ENDPOINTS[name]
+                results[name] = {
+                    "sync": self.run_sync(sync_url, headers, options["requests"], options["concurrency"]),
+                    "async": asyncio.run(
+                        self.run_async(async_url, headers, options["requests"], options["concurrency"])
+                    ),
+                }
+        self.stdout.write(json.dumps(
+            {"requests": options["requests"], "concurrency": options["concurrency"], "results": results},
+            indent=2,
+        ))
+
+    def run_sync(self, url, headers, total, concurrency):
+        """WSGI path: one thread (and client) per concurrent request, as a threaded server would."""
+        local = threading.local()
+
+        def timed_get(_):
+            if not hasattr(local, "client"):
+                local.client = Client()
+            started = time.perf_counter()
+            response = local.client.get(url, headers=headers)
+            return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(timed_get, range(total)))
+        elapsed = time.perf_counter() - started
+        return summarize([o[0] for o in outcomes], elapsed, sum(o[1] != 200 for o in outcomes))
+
+    async def run_async(self, url, headers, total, concurrency):
+        """ASGI path: all requests on one event loop, at most `concurrency` in flight."""
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed_get():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(timed_get() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+        return summarize([o[0] for o in outcomes], elapsed, sum(o[1] != 200 for o in outcomes))
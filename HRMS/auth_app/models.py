@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from organization.models import Organization
 
@@ -9,19 +9,62 @@ class User(AbstractUser):
         ('EMPLOYEE', 'Employee'),
     )
 
+    # Fields baked into access tokens; changing any of them revokes issued tokens
+    TOKEN_FIELDS = ('role', 'organization_id', 'is_active', 'password', 'email', 'username')
+
     # Login will use email instead of username
     email = models.EmailField(unique=True)
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE, null=True, blank=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='EMPLOYEE')
+    token_version = models.PositiveIntegerField(default=0, editable=False)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._token_state = instance._get_token_state()
+        return instance
+
+    def _get_token_state(self):
+        return tuple(self.__dict__.get(field) for field in self.TOKEN_FIELDS)
+
     def save(self, *args, **kwargs):
         # Only SUPERADMIN can have no organization
-        if self.role != 'SUPERADMIN' and self.organization is None:
+        if self.role != 'SUPERADMIN' and self.organization_id is None:
             raise ValueError("Only SUPERADMIN can exist without an organization.")
+
+        loaded_state = getattr(self, '_token_state', None)
+        if loaded_state is not None and loaded_state != self._get_token_state():
+            self.token_version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'token_version'}
+
         super().save(*args, **kwargs)
+        self._token_state = self._get_token_state()
+
+        # Publish the new version only once the save is durable, so a rolled-back
+        # save cannot revoke (or revive) tokens through the cache
+        from .authentication import remember_token_version
+        transaction.on_commit(lambda: remember_token_version(self), using=kwargs.get('using'))
 
     def __str__(self):
         return f"{self.username} ({self.role})"
+
+
+class StatelessUser(User):
+    """
+    In-memory user rebuilt from access-token claims (see StatelessJWTAuthentication).
+    Usable anywhere a User is expected for reads, filters and FK assignment, but
+    it only carries the claimed fields, so it must never be saved.
+    """
+
+    class Meta:
+        proxy = True
+
+    def save(self, *args, **kwargs):
+        raise TypeError("StatelessUser is built from token claims and cannot be saved.")
+
+    def delete(self, *args, **kwargs):
+        raise TypeError("StatelessUser is built from token claims and cannot be deleted.")
@@ -1,3 +1,214 @@
-from django.test import TestCase
+import json
+from datetime import date
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APITestCase
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from HRMS.testing import quiet_slow_requests
+from organization.models import Organization
+from employee.models import Employee
+from leave.models import Leave
+from policy.models import LeavePolicy
+from .authentication import StatelessJWTAuthentication
+from .models import StatelessUser, User
 
-# Create your tests here.
+
+@quiet_slow_requests
+class StatelessJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name="Acme", code="ACME")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = User.objects.create_user(
+                email="emp@acme.com", username="emp", password="pass", organization=self.org
+            )
+        Employee.objects.create(
+            user=self.user, organization=self.org, employee_code="E001",
+            department="Engineering", designation="Developer", date_of_joining=date(2020, 1, 1),
+        )
+
+    def save(self, user):
+        # The token version reaches the cache once the save commits
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+
+    def login(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/auth/login/", {"email": "emp@acme.com", "password": "pass"})
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return response.data
+
+    def get_me(self, authentication_class, queries):
+        with mock.patch.object(APIView, "authentication_classes", [authentication_class]):
+            with self.assertNumQueries(queries):
+                return self.client.get("/employees/me/")
+
+    def test_token_carries_claims(self):
+        tokens = self.login()
+        refreshed = self.client.post("/api/token/refresh/", {"refresh": tokens["refresh"]}).data["access"]
+        payload = StatelessJWTAuthentication().get_validated_token(refreshed)
+        self.assertEqual(payload["role"], "EMPLOYEE")
+        self.assertEqual(payload["organization_id"], str(self.org.id))
+        self.assertEqual(payload["token_version"], 0)
+
+    def test_stateless_auth_skips_user_query(self):
+        self.login()
+        # User row + employee row + ETag version with the regular authentication
+        self.get_me(JWTAuthentication, 3)
+        # Only the employee row and the ETag version once the token version is cached
+        response = self.get_me(StatelessJWTAuthentication, 2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user"], self.user.id)
+
+    def test_role_change_revokes_tokens(self):
+        self.login()
+        user = User.objects.get(pk=self.user.pk)
+        user.role = "HR"
+        self.save(user)
+        self.assertEqual(user.token_version, 1)
+        self.assertEqual(self.get_me(StatelessJWTAuthentication, 0).status_code, 401)
+
+    def test_rename_revokes_tokens(self):
+        # email and username are claims too: a renamed user must not keep acting under the old ones
+        self.login()
+        user = User.objects.get(pk=self.user.pk)
+        user.email = "employee@acme.com"
+        self.save(user)
+        self.assertEqual(user.token_version, 1)
+        self.assertEqual(self.get_me(StatelessJWTAuthentication, 0).status_code, 401)
+
+    def test_deactivation_revokes_tokens(self):
+        self.login()
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        self.save(user)
+        self.assertEqual(self.get_me(StatelessJWTAuthentication, 0).status_code, 401)
+
+    def test_rolled_back_save_keeps_tokens_valid(self):
+        self.login()
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    user.save()
+                    raise RuntimeError("rolled back")
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.get_me(StatelessJWTAuthentication, 2).status_code, 200)
+
+    def test_last_login_update_keeps_tokens_valid(self):
+        # /api/token/ saves last_login (UPDATE_LAST_LOGIN) and must not revoke anything
+        response = self.client.post("/api/token/", {"email": "emp@acme.com", "password": "pass"})
+        user = User.objects.get(pk=self.user.pk)
+        self.assertIsNotNone(user.last_login)
+        self.assertEqual(user.token_version, 0)
+        payload = StatelessJWTAuthentication().get_validated_token(response.data["access"])
+        self.assertEqual(payload["role"], "EMPLOYEE")
+
+    def test_stateless_user_cannot_be_saved(self):
+        with self.assertRaises(TypeError):
+            StatelessUser(id=self.user.id, role="HR", organization_id=self.org.id).save()
+
+
+@quiet_slow_requests
+class AsyncSelfServiceTests(APITestCase):
+    """The async self-service endpoints must answer exactly like their sync twins."""
+
+    ENDPOINTS = [
+        ("/employees/me/", "/async/employees/me/"),
+        ("/leaves/me/", "/async/leaves/me/"),
+        ("/policies/myorg/", "/async/policies/myorg/"),
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name="Acme", code="ACME")
+        self.user = User.objects.create_user(
+            email="emp@acme.com", username="emp", password="pass", organization=self.org
+        )
+        employee = Employee.objects.create(
+            user=self.user, organization=self.org, employee_code="E001",
+            department="Engineering", designation="Developer", date_of_joining=date(2020, 1, 1),
+        )
+        policy = LeavePolicy.objects.create(
+            organization=self.org, name="Annual", policy_type="ANNUAL", max_days_per_year=10
+        )
+        Leave.objects.create(
+            organization=self.org, employee=employee, user=self.user, policy=policy,
+            start_date=date(2024, 3, 4), end_date=date(2024, 3, 5), reason="Trip",
+        )
+
+    def login(self):
+        response = self.client.post("/api/auth/login/", {"email": "emp@acme.com", "password": "pass"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def assertSameAsSync(self, query=""):
+        for sync_url, async_url in self.ENDPOINTS:
+            with self.subTest(url=async_url):
+                expected = self.client.get(sync_url + query)
+                response = self.client.get(async_url + query)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response["Content-Type"], "application/json")
+                self.assertEqual(json.loads(response.content), json.loads(expected.content))
+
+    def test_matches_sync_endpoints(self):
+        self.login()
+        self.assertSameAsSync()
+
+    @override_settings(STATELESS_JWT_AUTH=True)
+    def test_matches_sync_endpoints_with_stateless_auth(self):
+        self.login()
+        self.assertSameAsSync()
+
+    def test_matches_sync_endpoints_with_sparse_fieldsets(self):
+        self.login()
+        self.assertSameAsSync("?fields=id,created_at")
+        self.assertSameAsSync("?exclude=id")
+        self.assertEqual(self.client.get("/async/leaves/me/?fields=salary").status_code, 400)
+
+    def test_requires_authentication(self):
+        for _, async_url in self.ENDPOINTS:
+            response = self.client.get(async_url)
+            self.assertEqual(response.status_code, 401)
+            self.assertIn("Bearer", response["WWW-Authenticate"])
+
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer not-a-token")
+        self.assertEqual(self.client.get("/async/employees/me/").status_code, 401)
+
+    def test_rejects_deactivated_user(self):
+        self.login()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get("/async/leaves/me/").status_code, 401)
+
+    def test_is_read_only(self):
+        self.login()
+        self.assertEqual(self.client.post("/async/leaves/me/", {}).status_code, 405)
+
+
+@quiet_slow_requests
+class SelfServiceBenchmarkTests(TransactionTestCase):
+    # Committed rows: the benchmark reads them from worker threads with their own connections,
+    # and its safe requests may be routed to the (mirrored) replica alias
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        org = Organization.objects.create(name="Acme", code="ACME")
+        self.user = User.objects.create_user(email="emp@acme.com", username="emp", password="pass", organization=org)
+
+    def test_reports_both_modes(self):
+        out = StringIO()
+        call_command(
+            "benchmark_self_service", email="emp@acme.com", requests=8, concurrency=4,
+            endpoint=["leave-me"], stdout=out,
+        )
+        report = json.loads(out.getvalue())["results"]["leave-me"]
+        for mode in ("sync", "async"):
+            self.assertEqual((report[mode]["requests"], report[mode]["errors"]), (8, 0))
@@ -0,0 +1,24 @@
+# auth_app/tokens.py
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class HRMSRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the claims StatelessJWTAuthentication needs.
+    Access tokens derived from it copy these claims.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token["role"] = user.role
+        token["organization_id"] = str(user.organization_id) if user.organization_id else None
+        token["token_version"] = user.token_version
+        token["email"] = user.email
+        token["username"] = user.username
+        return token
+
+
+class HRMSTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = HRMSRefreshToken
@@ -0,0 +1,222 @@
+# employee/bulk_import.py
+import csv
+import io
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from auth_app.models import User
+from HRMS.conditional import bump_collection_version
+from .models import Employee
+
+
+REQUIRED_COLUMNS = [
+    "email", "username", "employee_code", "department", "designation", "date_of_joining",
+]
+IMPORTABLE_ROLES = ["HR", "EMPLOYEE"]
+
+
+def _hash_password(raw_password):
+    # None → unusable password, the user has to go through a reset
+    return make_password(raw_password or None)
+
+
+def _parse_bool(value, default=True):
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "y")
+
+
+class EmployeeImporter:
+    """
+    Stream-import users + employee profiles from a CSV file.
+
+    Rows are read in chunks; every chunk is validated against the database with
+    one query per unique column (email, username, employee_code), passwords are hashed in a
+    process pool and the rows are inserted with bulk_create. Invalid rows are
+    reported with their line number and never abort the rest of the import.
+    """
+
+    def __init__(self, organization, chunk_size=1000, workers=None):
+        self.organization = organization
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.created = 0
+        self.errors = []
+        self._seen_emails = set()
+        self._seen_usernames = set()
+        self._seen_codes = set()
+
+    def run(self, stream):
+        """stream: a text file object or a binary file object (e.g. an UploadedFile)."""
+        if not isinstance(stream, io.TextIOBase):
+            stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        reader = csv.DictReader(stream)
+
+        missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise ValidationError(f"CSV is missing required columns: {', '.join(missing)}")
+
+        pool = None
+        if self.workers is None or self.workers > 1:
+            pool = ProcessPoolExecutor(max_workers=self.workers, initializer=django.setup)
+        try:
+            # Data starts on line 2 (line 1 is the header)
+            rows = enumerate(reader, start=2)
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                self._import_chunk(chunk, pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        # bulk_create sends no post_save
+        if self.created:
+            bump_collection_version("employees", self.organization.pk)
+        return {"created": self.created, "failed": len(self.errors), "errors": self.errors}
+
+    def _error(self, line, errors):
+        self.errors.append({"line": line, "errors": errors})
+
+    def _validate_row(self, row):
+        errors = {}
+        for column in REQUIRED_COLUMNS:
+            if not (row.get(column) or "").strip():
+                errors[column] = "This field is required."
+        if errors:
+            return None, errors
+
+        # Domain lowercased like UserManager.create_user; the local part is kept as given
+        email = User.objects.normalize_email(row["email"].strip())
+        username = row["username"].strip()
+        code = row["employee_code"].strip()
+        role = (row.get("role") or "EMPLOYEE").strip().upper()
+
+        try:
+            validate_email(email)
+        except ValidationError:
+            errors["email"] = "Enter a valid email address."
+        # Only SUPERADMIN may exist without an organization; imports always
+        # attach one, so SUPERADMIN accounts cannot be created this way.
+        if role not in IMPORTABLE_ROLES:
+            errors["role"] = f"Role must be one of {', '.join(IMPORTABLE_ROLES)}."
+        if len(username) > 150:
+            errors["username"] = "Ensure this field has no more than 150 characters."
+        if len(code) > 20:
+            errors["employee_code"] = "Ensure this field has no more than 20 characters."
+        try:
+            joined = date.fromisoformat(row["date_of_joining"].strip())
+        except ValueError:
+            errors["date_of_joining"] = "Use the YYYY-MM-DD format."
+            joined = None
+
+        # Emails are compared case-insensitively, in the file and against the database
+        if email.lower() in self._seen_emails:
+            errors["email"] = "Duplicate email in file."
+        if username in self._seen_usernames:
+            errors["username"] = "Duplicate username in file."
+        if code in self._seen_codes:
+            errors["employee_code"] = "Duplicate employee code in file."
+        if errors:
+            return None, errors
+
+        return {
+            "email": email,
+            "username": username,
+            "password": row.get("password") or "",
+            "role": role,
+            "employee_code": code,
+            "department": row["department"].strip(),
+            "designation": row["designation"].strip(),
+            "date_of_joining": joined,
+            "is_active": _parse_bool(row.get("is_active")),
+        }, None
+
+    def _import_chunk(self, chunk, pool):
+        valid = []
+        for line, row in chunk:
+            data, errors = self._validate_row(row)
+            if errors:
+                self._error(line, errors)
+                continue
+            self._seen_emails.add(data["email"].lower())
+            self._seen_usernames.add(data["username"])
+            self._seen_codes.add(data["employee_code"])
+            valid.append((line, data))
+        if not valid:
+            return
+
+        # Uniqueness against the database: one query per column for the whole chunk
+        taken_emails = set(User.objects.annotate(email_lower=Lower("email")).filter(
+            email_lower__in=[data["email"].lower() for _, data in valid]
+        ).values_list("email_lower", flat=True))
+        taken_usernames = set(User.objects.filter(
+            username__in=[data["username"] for _, data in valid]
+        ).values_list("username", flat=True))
+        taken_codes = set(Employee.objects.filter(
+            employee_code__in=[data["employee_code"] for _, data in valid]
+        ).values_list("employee_code", flat=True))
+
+        accepted = []
+        for line, data in valid:
+            errors = {}
+            if data["email"].lower() in taken_emails:
+                errors["email"] = "A user with this email already exists."
+            if data["username"] in taken_usernames:
+                errors["username"] = "A user with this username already exists."
+            if data["employee_code"] in taken_codes:
+                errors["employee_code"] = "An employee with this code already exists."
+            if errors:
+                self._error(line, errors)
+            else:
+                accepted.append((line, data))
+        if not accepted:
+            return
+
+        passwords = [data["password"] for _, data in accepted]
+        if pool is not None:
+            hashes = list(pool.map(_hash_password, passwords, chunksize=max(1, len(passwords) // 32)))
+        else:
+            hashes = [_hash_password(password) for password in passwords]
+
+        users = [
+            User(
+                email=data["email"],
+                username=data["username"],
+                password=hashed,
+                role=data["role"],
+                organization=self.organization,
+                is_active=data["is_active"],
+            )
+            for (_, data), hashed in zip(accepted, hashes)
+        ]
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                Employee.objects.bulk_create([
+                    Employee(
+                        user=user,
+                        organization=self.organization,
+                        employee_code=data["employee_code"],
+                        department=data["department"],
+                        designation=data["designation"],
+                        date_of_joining=data["date_of_joining"],
+                        is_active=data["is_active"],
+                    )
+                    for user, (_, data) in zip(users, accepted)
+                ])
+        except IntegrityError as exc:
+            # A concurrent writer took one of the emails/codes after our check
+            for line, _ in accepted:
+                self._error(line, {"non_field_errors": f"Chunk rejected by the database: {exc}"})
+            return
+
+        self.created += len(users)
@@ -0,0 +1,48 @@
+import json
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from organization.models import Organization
+from employee.bulk_import import EmployeeImporter
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import users and employee profiles from a CSV file. Columns: email, username, "
+        "password, role, employee_code, department, designation, date_of_joining, is_active."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", help="Path to the CSV file.")
+        parser.add_argument("--organization", required=True, help="Code of the organization to import into.")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Rows inserted per bulk_create.")
+        parser.add_argument(
+            "--workers", type=int, default=None,
+            help="Password hashing processes (default: CPU count, 1 = hash in-process).",
+        )
+        parser.add_argument("--errors-file", help="Write per-row errors to this JSON file.")
+
+    def handle(self, *args, **options):
+        try:
+            organization = Organization.objects.get(code=options["organization"])
+        except Organization.DoesNotExist:
+            raise CommandError(f"No organization with code {options['organization']!r}.")
+
+        importer = EmployeeImporter(
+            organization, chunk_size=options["chunk_size"], workers=options["workers"]
+        )
+        try:
+            with open(options["csv_path"], newline="", encoding="utf-8-sig") as stream:
+                result = importer.run(stream)
+        except (OSError, ValidationError) as exc:
+            raise CommandError(str(exc))
+
+        if options["errors_file"]:
+            with open(options["errors_file"], "w") as handle:
+                json.dump(result["errors"], handle, indent=2)
+        else:
+            for error in result["errors"]:
+                self.stderr.write(f"line {error['line']}: {error['errors']}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['created']} employees, {result['failed']} rows failed."
+        ))
@@ -19,6 +19,10 @@ class Employee(models.Model):
         db_table = "employee"
         verbose_name = "Employee"
         verbose_name_plural = "Employees"
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="employee_created_idx"),
+            models.Index(fields=["organization", "-created_at", "-id"], name="employee_org_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} ({self.designation})"
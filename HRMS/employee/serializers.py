@@ -17,3 +17,13 @@ class EmployeeSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'user']  #Added 'user' here
+
+
+class EmployeeListSerializer(EmployeeSerializer):
+    """Default shape of employee list responses; ?fields= can ask for any EmployeeSerializer field."""
+
+    class Meta(EmployeeSerializer.Meta):
+        fields = [
+            'id', 'user', 'username', 'employee_code',
+            'department', 'designation', 'is_active',
+        ]
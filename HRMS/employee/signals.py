@@ -0,0 +1,21 @@
+# employee/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from auth_app.models import User
+from HRMS.conditional import bump_collection_version
+from .models import Employee
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_employee_etags(sender, instance, **kwargs):
+    bump_collection_version("employees", instance.organization_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_etags(sender, instance, update_fields=None, **kwargs):
+    # Employees and policies render user names, emails and roles; logins only touch last_login
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    bump_collection_version("employees", instance.organization_id)
+    bump_collection_version("policies", instance.organization_id)
@@ -1,3 +1,224 @@
+import io
+from datetime import date
+from unittest import mock
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
+from organization.models import Organization
+from auth_app.models import User
+from HRMS.testing import QueryPlanMixin, quiet_slow_requests
+from .bulk_import import EmployeeImporter
+from .models import Employee
 
-# Create your tests here.
+
+class EmployeeTestMixin:
+    def setUp(self):
+        self.org = Organization.objects.create(name="Acme", code="ACME")
+        self.hr = User.objects.create_user(
+            email="hr@acme.com", username="hr", password="pass", role="HR", organization=self.org
+        )
+
+    def seed_employees(self, total):
+        existing = Employee.objects.count()
+        users = User.objects.bulk_create([
+            User(email=f"emp{i}@acme.com", username=f"emp{i}", password="!", organization=self.org)
+            for i in range(existing, total)
+        ])
+        Employee.objects.bulk_create([
+            Employee(
+                user=user, organization=self.org, employee_code=f"E{existing + i:05d}",
+                department="Engineering", designation="Developer", date_of_joining=date(2020, 1, 1),
+            )
+            for i, user in enumerate(users)
+        ])
+
+
+class EmployeeQueryBudgetTests(EmployeeTestMixin, APITestCase):
+    """Employee endpoints must cost a constant number of queries, however many rows they return."""
+
+    ROW_COUNTS = (10, 100, 1000)
+
+    def assertQueryBudget(self, viewer, url, budget):
+        self.client.force_authenticate(viewer)
+        for total in self.ROW_COUNTS:
+            self.seed_employees(total)
+            with self.subTest(rows=total), self.assertNumQueries(budget):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_employee_list(self):
+        # Rows + the collection's ETag version
+        self.assertQueryBudget(self.hr, "/employees/", 2)
+
+    def test_employee_detail(self):
+        self.seed_employees(1)
+        employee = Employee.objects.first()
+        self.assertQueryBudget(self.hr, f"/employees/{employee.id}/", 2)
+
+    def test_employee_me(self):
+        self.seed_employees(1)
+        self.assertQueryBudget(Employee.objects.first().user, "/employees/me/", 2)
+
+
+class EmployeeFieldsetTests(EmployeeTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.seed_employees(2)
+        self.client.force_authenticate(self.hr)
+
+    def test_list_is_compact_and_fields_skip_user_join(self):
+        row = self.client.get("/employees/").data["results"][0]
+        self.assertNotIn("user_email", row)
+        self.assertIn("username", row)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/employees/?fields=id,employee_code")
+        self.assertEqual(set(response.data["results"][0]), {"id", "employee_code"})
+        self.assertNotIn("JOIN", queries.captured_queries[0]["sql"])
+
+    def test_detail_fields_and_exclude(self):
+        employee = Employee.objects.first()
+        response = self.client.get(f"/employees/{employee.id}/?fields=id,user_email")
+        self.assertEqual(response.data, {"id": str(employee.id), "user_email": employee.user.email})
+        response = self.client.get(f"/employees/{employee.id}/?exclude=created_at,updated_at")
+        self.assertNotIn("created_at", response.data)
+        self.assertEqual(self.client.get("/employees/?exclude=salary").status_code, 400)
+
+
+class EmployeeConditionalRequestTests(EmployeeTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.seed_employees(2)
+        self.employee = Employee.objects.select_related("user").first()
+        self.url = f"/employees/{self.employee.id}/"
+        self.client.force_authenticate(self.hr)
+
+    def test_list_revalidation(self):
+        etag = self.client.get("/employees/")["ETag"]
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/employees/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Another worker (its own cache) derives the same validators from the database
+        cache.clear()
+        self.assertEqual(self.client.get("/employees/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Logins only touch last_login; a rename is visible in the list
+        user = self.employee.user
+        user.save(update_fields=["last_login"])
+        self.assertEqual(self.client.get("/employees/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        user.username = "renamed"
+        user.save()
+        self.assertEqual(self.client.get("/employees/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_match_on_update(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        response = self.client.patch(self.url, {"designation": "Lead"}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.patch(self.url, {"designation": "Manager"}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(Employee.objects.get(pk=self.employee.pk).designation, "Lead")
+
+
+class EmployeeQueryPlanTests(QueryPlanMixin, EmployeeTestMixin, APITestCase):
+    """The queries behind each employee endpoint must be served from an index."""
+
+    def setUp(self):
+        super().setUp()
+        self.seed_employees(300)
+
+    def test_hr_employee_list(self):
+        self.client.force_authenticate(self.hr)
+        self.assertNoFullTableScan("/employees/")
+
+    def test_superadmin_employee_list(self):
+        admin = User.objects.create_user(
+            email="root@acme.com", username="root", password="pass", role="SUPERADMIN"
+        )
+        self.client.force_authenticate(admin)
+        self.assertNoFullTableScan("/employees/")
+
+    def test_employee_me(self):
+        self.client.force_authenticate(Employee.objects.first().user)
+        self.assertNoFullTableScan("/employees/me/")
+
+
+IMPORT_HEADER = "email,username,password,role,employee_code,department,designation,date_of_joining\n"
+
+
+@quiet_slow_requests
+class EmployeeImportTests(EmployeeTestMixin, TestCase):
+    def import_csv(self, body, **kwargs):
+        return EmployeeImporter(self.org, **kwargs).run(io.StringIO(IMPORT_HEADER + body))
+
+    def test_imports_rows_and_reports_bad_ones(self):
+        self.seed_employees(1)  # emp0@acme.com / E00000 already exist
+        result = self.import_csv(
+            "a@acme.com,alice,secret,EMPLOYEE,A1,Ops,Analyst,2024-01-01\n"
+            "emp0@acme.com,bob,secret,EMPLOYEE,A2,Ops,Analyst,2024-01-01\n"
+            "c@acme.com,carol,secret,EMPLOYEE,E00000,Ops,Analyst,2024-01-01\n"
+            "d@acme.com,dave,secret,SUPERADMIN,A4,Ops,Analyst,2024-01-01\n"
+            "e@acme.com,erin,secret,EMPLOYEE,A1,Ops,Analyst,2024-01-01\n"
+            "f@acme.com,frank,,HR,A6,People,Partner,not-a-date\n",
+            workers=1, chunk_size=2,
+        )
+
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(
+            sorted((error["line"], sorted(error["errors"])) for error in result["errors"]),
+            [(3, ["email"]), (4, ["employee_code"]), (5, ["role"]), (6, ["employee_code"]), (7, ["date_of_joining"])],
+        )
+        alice = Employee.objects.select_related("user").get(employee_code="A1")
+        self.assertEqual(alice.organization, self.org)
+        self.assertTrue(alice.user.check_password("secret"))
+
+    def test_emails_are_normalized_and_compared_case_insensitively(self):
+        self.seed_employees(1)  # emp0@acme.com already exists
+        result = self.import_csv(
+            "EMP0@Acme.com,bob,secret,EMPLOYEE,A1,Ops,Analyst,2024-01-01\n"
+            "Zoe@ACME.com,zoe,secret,EMPLOYEE,A2,Ops,Analyst,2024-01-01\n"
+            "zoe@acme.com,zoe2,secret,EMPLOYEE,A3,Ops,Analyst,2024-01-01\n",
+            workers=1, chunk_size=2,
+        )
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(
+            [(error["line"], error["errors"]) for error in result["errors"]],
+            [(2, {"email": "A user with this email already exists."}), (4, {"email": "Duplicate email in file."})],
+        )
+        # The domain is lowercased as create_user does, the local part is kept
+        self.assertEqual(Employee.objects.get(employee_code="A2").user.email, "Zoe@acme.com")
+
+    def test_hashes_passwords_in_process_pool(self):
+        rows = "".join(
+            f"u{i}@acme.com,user{i},pw{i},EMPLOYEE,P{i},Ops,Analyst,2024-01-01\n" for i in range(4)
+        )
+        result = self.import_csv(rows, workers=2)
+        self.assertEqual(result["created"], 4)
+        self.assertTrue(User.objects.get(email="u3@acme.com").check_password("pw3"))
+
+    def test_import_endpoint(self):
+        upload = SimpleUploadedFile(
+            "staff.csv",
+            (IMPORT_HEADER + "a@acme.com,alice,secret,EMPLOYEE,A1,Ops,Analyst,2024-01-01\n").encode(),
+            content_type="text/csv",
+        )
+        client = APIClient()
+        client.force_authenticate(self.hr)
+        # The request hashes in-process: no pool of Django processes forked per upload
+        with mock.patch("employee.bulk_import.ProcessPoolExecutor") as pool:
+            response = client.post("/employees/import/", {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 1)
+        pool.assert_not_called()
+
+    def test_import_endpoint_rejects_malformed_organization(self):
+        admin = User.objects.create_user(email="root@hrms.com", username="root", password="pass", role="SUPERADMIN")
+        upload = SimpleUploadedFile("staff.csv", IMPORT_HEADER.encode(), content_type="text/csv")
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.post("/employees/import/", {"file": upload, "organization": "acme"}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("organization", response.data)
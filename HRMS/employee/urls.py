@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import EmployeeListCreateView, EmployeeDetailView, EmployeeMeView
+from .views import EmployeeListCreateView, EmployeeDetailView, EmployeeMeView, EmployeeImportView, AsyncEmployeeMeView
 
 urlpatterns = [
     path("employees/", EmployeeListCreateView.as_view(), name="employee-list-create"),
     path("employees/me/", EmployeeMeView.as_view(), name="employee-me"),
+    path("employees/import/", EmployeeImportView.as_view(), name="employee-import"),
     path("employees/<uuid:pk>/", EmployeeDetailView.as_view(), name="employee-detail"),
+    path("async/employees/me/", AsyncEmployeeMeView.as_view(), name="employee-me-async"),
 ]
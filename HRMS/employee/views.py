@@ -1,9 +1,21 @@
+import uuid
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.views import APIView
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from django.shortcuts import get_object_or_404
+from organization.models import Organization
+from .bulk_import import EmployeeImporter
 from .models import Employee
-from .serializers import EmployeeSerializer
+from .serializers import EmployeeSerializer, EmployeeListSerializer
+from HRMS.async_views import AsyncAPIView
+from HRMS.conditional import ConditionalGetMixin
+from HRMS.fieldsets import SparseFieldsetMixin, restrict_queryset, sparse_serializer
+from HRMS.pagination import CreatedAtCursorPagination
 
 
 class EmployeePermission(permissions.BasePermission):
@@ -25,26 +37,30 @@ class EmployeePermission(permissions.BasePermission):
         user = request.user
         if user.role == "SUPERADMIN":
             return True
-        if user.role == "HR" and obj.organization == user.organization:
+        if user.role == "HR" and obj.organization_id == user.organization_id:
             return True
-        if user.role == "EMPLOYEE" and obj.user == user and request.method in permissions.SAFE_METHODS:
+        if user.role == "EMPLOYEE" and obj.user_id == user.id and request.method in permissions.SAFE_METHODS:
             return True
         return False
 
 
 # List + Create Employees
-class EmployeeListCreateView(generics.ListCreateAPIView):
+class EmployeeListCreateView(ConditionalGetMixin, SparseFieldsetMixin, generics.ListCreateAPIView):
     serializer_class = EmployeeSerializer
+    compact_serializer_class = EmployeeListSerializer
+    conditional_collection = "employees"
     permission_classes = [permissions.IsAuthenticated, EmployeePermission]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         user = self.request.user
+        employees = Employee.objects.select_related("user")
         if user.role == "SUPERADMIN":
-            return Employee.objects.all()
+            return employees
         elif user.role == "HR":
-            return Employee.objects.filter(organization=user.organization)
+            return employees.filter(organization_id=user.organization_id)
         elif user.role == "EMPLOYEE":
-            return Employee.objects.filter(user=user)
+            return employees.filter(user=user)
         return Employee.objects.none()
 
     def perform_create(self, serializer):
@@ -64,34 +80,99 @@ class EmployeeListCreateView(generics.ListCreateAPIView):
           raise PermissionDenied("You do not have permission to create employees.")
 
 # Get, Update, or Delete employee by UUID
-class EmployeeDetailView(generics.RetrieveUpdateDestroyAPIView):
+class EmployeeDetailView(ConditionalGetMixin, SparseFieldsetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = EmployeeSerializer
     permission_classes = [permissions.IsAuthenticated, EmployeePermission]
     queryset = Employee.objects.all()
+    sparse_always_load = ("organization", "user", "updated_at")
+    conditional_collection = "employees"
 
     def get_object(self):
         user = self.request.user
         pk = self.kwargs.get("pk")
 
         # If not found → 404, not crash
-        employee = get_object_or_404(Employee, pk=pk)
+        employee = get_object_or_404(self.sparse_queryset(Employee.objects.select_related("user")), pk=pk)
 
         # Role-based access control
         if user.role == "SUPERADMIN":
             return employee
-        if user.role == "HR" and employee.organization == user.organization:
+        if user.role == "HR" and employee.organization_id == user.organization_id:
             return employee
-        if user.role == "EMPLOYEE" and employee.user == user:
+        if user.role == "EMPLOYEE" and employee.user_id == user.id:
             return employee
 
         raise PermissionDenied({"detail": "You are not authorized to access this employee record."})
 
+    def perform_update(self, serializer):
+        # 412 when If-Match names another version of the employee
+        with transaction.atomic():
+            self.check_if_match(serializer.instance)
+            serializer.save()
+
 
 # Get logged-in employee’s own profile
-class EmployeeMeView(generics.RetrieveAPIView):
+class EmployeeMeView(ConditionalGetMixin, SparseFieldsetMixin, generics.RetrieveAPIView):
     serializer_class = EmployeeSerializer
     permission_classes = [permissions.IsAuthenticated]
+    sparse_always_load = ("organization", "user", "updated_at")
+    conditional_collection = "employees"
 
     def get_object(self):
         # Get the employee record linked to the logged-in user
-        return get_object_or_404(Employee, user=self.request.user)
+        employees = self.sparse_queryset(Employee.objects.select_related("user"))
+        return get_object_or_404(employees, user=self.request.user)
+
+
+class AsyncEmployeeMeView(AsyncAPIView):
+    """Async twin of EmployeeMeView for ASGI deployments (/async/employees/me/)."""
+
+    async def get(self, request):
+        template = sparse_serializer(request, EmployeeSerializer)
+        employees = restrict_queryset(Employee.objects.select_related("user"), template, ["user"])
+        employee = await employees.filter(user_id=request.user.pk).afirst()
+        if employee is None:
+            raise NotFound("No Employee matches the given query.")
+        return self.render(sparse_serializer(request, EmployeeSerializer, None, employee).data)
+
+
+# Bulk onboarding from CSV (/employees/import/)
+class EmployeeImportView(APIView):
+    """
+    Upload a CSV of users + employee profiles (multipart field "file").
+    HR imports into their own organization; SUPERADMIN must pass "organization" (UUID).
+    Invalid rows are reported per line and do not abort the import. Passwords
+    are hashed in the request's own process: for files too large for that, use
+    the import_employees command, which hashes in a process pool.
+    """
+    permission_classes = [permissions.IsAuthenticated, EmployeePermission]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        user = request.user
+        if user.role == "HR":
+            organization = user.organization
+        elif user.role == "SUPERADMIN":
+            try:
+                organization_id = uuid.UUID(str(request.data.get("organization")))
+            except ValueError:
+                raise ValidationError({"organization": "A valid organization id (UUID) is required."})
+            organization = get_object_or_404(Organization, pk=organization_id)
+        else:
+            raise PermissionDenied("You do not have permission to import employees.")
+
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": "A CSV file is required."})
+
+        # workers=1: no process pool forked inside a web worker
+        importer = EmployeeImporter(
+            organization, chunk_size=getattr(settings, "EMPLOYEE_IMPORT_CHUNK_SIZE", 1000), workers=1,
+        )
+        try:
+            result = importer.run(upload.file)
+        except DjangoValidationError as exc:
+            raise ValidationError({"file": exc.messages})
+
+        response_status = status.HTTP_201_CREATED if result["created"] else status.HTTP_400_BAD_REQUEST
+        return Response(result, status=response_status)
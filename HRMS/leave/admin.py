@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Leave
+from .models import AttachmentBlob, Leave, LeaveBalance, LeaveClosing, YearEndRun
 
 @admin.register(Leave)
 class LeaveAdmin(admin.ModelAdmin):
@@ -14,3 +14,57 @@ class LeaveAdmin(admin.ModelAdmin):
     )
     list_filter = ("status", "organization", "policy")
     search_fields = ("employee__user__email", "reason")
+
+
+@admin.register(LeaveBalance)
+class LeaveBalanceAdmin(admin.ModelAdmin):
+    list_display = (
+        "employee",
+        "policy",
+        "year",
+        "entitled_days",
+        "used_days",
+        "pending_days",
+        "carried_forward_days",
+        "encashed_days",
+    )
+    list_filter = ("year", "policy__organization")
+    readonly_fields = ("updated_at",)
+
+
+@admin.register(YearEndRun)
+class YearEndRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "organization",
+        "year",
+        "status",
+        "employees_processed",
+        "carried_forward_days",
+        "encashed_days",
+        "lapsed_days",
+        "finished_at",
+    )
+    list_filter = ("status", "year")
+    readonly_fields = ("started_at", "updated_at", "finished_at")
+
+
+@admin.register(LeaveClosing)
+class LeaveClosingAdmin(admin.ModelAdmin):
+    list_display = (
+        "employee",
+        "policy",
+        "year",
+        "closing_days",
+        "carried_forward_days",
+        "encashed_days",
+        "lapsed_days",
+    )
+    list_filter = ("year", "policy__organization")
+
+
+@admin.register(AttachmentBlob)
+class AttachmentBlobAdmin(admin.ModelAdmin):
+    list_display = ("sha256", "content_type", "size", "ref_count", "updated_at")
+    list_filter = ("content_type",)
+    search_fields = ("sha256",)
+    readonly_fields = ("sha256", "name", "size", "content_type", "ref_count", "created_at", "updated_at")
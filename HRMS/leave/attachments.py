@@ -0,0 +1,333 @@
+# leave/attachments.py
+"""
+Content-addressed storage for leave attachments.
+
+A file is stored once per content, under leave_attachments/<ab>/<sha256><ext>,
+and described by an AttachmentBlob row whose ref_count is the number of leaves
+pointing at it (kept by leave/signals.py). Re-uploading the same medical
+certificate for the next leave only touches the blob row.
+
+Uploads to the leave endpoints go through AttachmentUploadHandler instead of
+Django's memory/temporary-file handlers: the body is written to a temporary
+file in LEAVE_ATTACHMENT_CHUNK_SIZE chunks and hashed on the way, so the
+storage only has to move the file into place. A Content-Length above the limit
+is refused before anything is read, the running size is checked on every
+chunk and the type is sniffed from the first one (413 / 415).
+
+serve_attachment() answers downloads with FileResponse (wsgi.file_wrapper, so
+sendfile where the server has it) and single byte ranges, or hands the file
+to the web server when LEAVE_ATTACHMENT_SENDFILE_HEADER is set.
+gc_leave_attachments deletes unreferenced blobs.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+from collections import Counter
+
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+from django.db.models import F
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header, parse_etags
+from rest_framework import status
+from rest_framework.exceptions import APIException, UnsupportedMediaType
+
+
+# Magic numbers of the accepted types, and the extension files are stored under
+SIGNATURES = {
+    "application/pdf": (b"%PDF-",),
+    "image/png": (b"\x89PNG\r\n\x1a\n",),
+    "image/jpeg": (b"\xff\xd8\xff",),
+}
+EXTENSIONS = {
+    "application/pdf": ".pdf",
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+}
+CONTENT_TYPES = {extension: content_type for content_type, extension in EXTENSIONS.items()}
+
+# Multipart framing (boundaries, part headers, other form fields) allowed on
+# top of the attachment itself before Content-Length alone is refused
+MULTIPART_ALLOWANCE = 64 * 1024
+
+DIRECTORY = "leave_attachments"
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class AttachmentTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_code = "attachment_too_large"
+
+    def __init__(self):
+        super().__init__(f"Attachments are limited to {settings.LEAVE_ATTACHMENT_MAX_BYTES} bytes.")
+
+
+def sniff_content_type(head):
+    """The accepted content type the first bytes of a file match, or None."""
+    for content_type in settings.LEAVE_ATTACHMENT_TYPES:
+        if any(head.startswith(signature) for signature in SIGNATURES.get(content_type, ())):
+            return content_type
+    return None
+
+
+def blob_digest(name):
+    """The SHA-256 a stored attachment name is addressed by (None for legacy names)."""
+    if not name:
+        return None
+    digest = posixpath.splitext(posixpath.basename(name))[0]
+    return digest if _DIGEST_RE.match(digest) else None
+
+
+def blob_name(digest, content_type):
+    return f"{DIRECTORY}/{digest[:2]}/{digest}{EXTENSIONS.get(content_type, '')}"
+
+
+class HashedUploadedFile(TemporaryUploadedFile):
+    """A TemporaryUploadedFile that knows its SHA-256 (set by AttachmentUploadHandler)."""
+    sha256 = None
+
+
+class AttachmentUploadHandler(FileUploadHandler):
+    """Streams uploaded files to disk in fixed-size chunks, hashing and checking them as they arrive."""
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.chunk_size = settings.LEAVE_ATTACHMENT_CHUNK_SIZE
+        self.max_bytes = settings.LEAVE_ATTACHMENT_MAX_BYTES
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Nothing has been read from the body yet
+        if content_length > self.max_bytes + MULTIPART_ALLOWANCE:
+            raise AttachmentTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = HashedUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+        self.hash = hashlib.sha256()
+        self.size = 0
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > self.max_bytes:
+            raise AttachmentTooLarge()
+        if start == 0:
+            content_type = sniff_content_type(raw_data)
+            if content_type is None:
+                raise UnsupportedMediaType(
+                    self.content_type, f"Attachments must be one of: {', '.join(settings.LEAVE_ATTACHMENT_TYPES)}."
+                )
+            # What the bytes are, not what the client claimed
+            self.file.content_type = content_type
+        self.hash.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.hash.hexdigest()
+        return self.file
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that names files by their SHA-256 and stores each content
+    once. The requested name only contributes its directory; the returned name
+    is the content address, and the AttachmentBlob row is created or touched.
+    """
+
+    def _save(self, name, content):
+        from .models import AttachmentBlob
+
+        digest = getattr(content, "sha256", None)
+        content_type = getattr(content, "content_type", None)
+        if digest is not None and hasattr(content, "temporary_file_path"):
+            # Hashed while it was uploaded: only the move is left
+            source, owned = content.temporary_file_path(), False
+        else:
+            source, digest, content_type = self._spool(content)
+            owned = True
+
+        if content_type is None or content_type not in EXTENSIONS:
+            with open(source, "rb") as handle:
+                content_type = sniff_content_type(handle.read(16)) or "application/octet-stream"
+        name = blob_name(digest, content_type)
+        # The row first: once it is touched, gc_leave_attachments leaves the file alone
+        _, created = AttachmentBlob.objects.get_or_create(
+            sha256=digest, defaults={"name": name, "size": os.path.getsize(source), "content_type": content_type}
+        )
+        if not created:
+            AttachmentBlob.objects.filter(pk=digest).update(updated_at=timezone.now())
+
+        path = self.path(name)
+        if os.path.exists(path):
+            # Already stored: same digest, same bytes. The new mtime keeps the orphan sweep off it
+            os.utime(path)
+            if owned:
+                os.remove(source)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                file_move_safe(source, path)
+            except FileExistsError:
+                # A concurrent upload of the same content won: same bytes, keep theirs
+                if owned:
+                    os.remove(source)
+            else:
+                if self.file_permissions_mode is not None:
+                    os.chmod(path, self.file_permissions_mode)
+        return name
+
+    def _spool(self, content):
+        """Copy content that was not hashed on upload to a temporary file, hashing it chunk by chunk."""
+        hasher = hashlib.sha256()
+        content_type = None
+        descriptor, path = tempfile.mkstemp(suffix=".upload", dir=settings.FILE_UPLOAD_TEMP_DIR)
+        with os.fdopen(descriptor, "wb") as spooled:
+            for chunk in content.chunks(settings.LEAVE_ATTACHMENT_CHUNK_SIZE):
+                if content_type is None:
+                    content_type = sniff_content_type(chunk)
+                hasher.update(chunk)
+                spooled.write(chunk)
+        return path, hasher.hexdigest(), content_type
+
+    def get_available_name(self, name, max_length=None):
+        # Content-addressed: an existing file with the final name is the same file
+        return name
+
+
+attachment_storage = ContentAddressedStorage()
+
+
+def add_references(names):
+    _adjust_references(names, 1)
+
+
+def remove_references(names):
+    _adjust_references(names, -1)
+
+
+def _adjust_references(names, delta):
+    from .models import AttachmentBlob
+
+    counts = Counter(digest for digest in map(blob_digest, names) if digest)
+    for digest, count in counts.items():
+        AttachmentBlob.objects.filter(pk=digest).update(
+            ref_count=F("ref_count") + delta * count, updated_at=timezone.now()
+        )
+
+
+class _RangeFile:
+    """Read at most length bytes of an open file, for bounded byte ranges."""
+
+    def __init__(self, handle, length):
+        self.handle = handle
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.handle.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.handle.close()
+
+
+def parse_range(header, size):
+    """
+    (start, end) of a single "bytes=" range, None to ignore the header (absent,
+    malformed or several ranges, which are answered with the whole file) and
+    False when the range cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # bytes=-N: the last N bytes
+            length = int(last)
+            if length < 0:
+                return None
+            if length == 0:
+                return False
+            start, end = max(size - length, 0), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        return False
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def serve_attachment(request, name, filename):
+    """Response for a stored attachment: 200, 206 or 304/416, or a sendfile hand-off."""
+    extension = posixpath.splitext(name)[1]
+    content_type = CONTENT_TYPES.get(extension, "application/octet-stream")
+    digest = blob_digest(name)
+    etag = f'"{digest}"' if digest else None
+
+    header = settings.LEAVE_ATTACHMENT_SENDFILE_HEADER
+    if header:
+        # nginx (X-Accel-Redirect) / Apache (X-Sendfile) send the bytes and handle ranges
+        response = HttpResponse(content_type=content_type)
+        response[header] = settings.LEAVE_ATTACHMENT_SENDFILE_PREFIX + name
+        response["Content-Disposition"] = content_disposition_header(True, filename + extension)
+        return response
+
+    if etag and etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        response["ETag"] = etag
+        return response
+
+    try:
+        handle = attachment_storage.open(name, "rb")
+    except FileNotFoundError:
+        raise Http404("The attachment file is missing.")
+    size = os.fstat(handle.fileno()).st_size
+    byte_range = parse_range(request.headers.get("Range"), size)
+    if_range = request.headers.get("If-Range")
+    if byte_range is not None and if_range and if_range != etag:
+        # The client's partial copy is of other content: send it all
+        byte_range = None
+
+    if byte_range is False:
+        handle.close()
+        response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    options = {"as_attachment": True, "filename": filename + extension, "content_type": content_type}
+    if byte_range is None:
+        response = FileResponse(handle, **options)
+    else:
+        start, end = byte_range
+        handle.seek(start)
+        if end == size - 1:
+            # Runs to the end: the file itself, so file_wrapper/sendfile still applies
+            response = FileResponse(handle, status=status.HTTP_206_PARTIAL_CONTENT, **options)
+        else:
+            response = FileResponse(
+                _RangeFile(handle, end - start + 1), status=status.HTTP_206_PARTIAL_CONTENT, **options
+            )
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    if etag:
+        response["ETag"] = etag
+        # The content behind a content address never changes
+        response["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
@@ -0,0 +1,292 @@
+# leave/balances.py
+import random
+import time
+from collections import defaultdict
+from functools import reduce
+from itertools import islice
+from operator import or_
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import Q
+from organization.workdays import working_days, working_days_by_organization
+from policy.models import LeavePolicy
+from .models import Leave, LeaveBalance
+
+
+# Which ledger column a leave status counts against.
+# Rejected / Cancelled leaves do not consume balance.
+STATUS_BUCKETS = {
+    "Pending": "pending_days",
+    "Approved": "used_days",
+}
+
+
+# Database errors that mean "lost a race, run the transaction again": SQLite's
+# busy/locked errors, PostgreSQL deadlocks and serialization failures
+RETRYABLE_ERRORS = ("locked", "deadlock", "could not serialize")
+
+
+class InsufficientBalance(Exception):
+    """A status change would commit more days than the ledger row allows."""
+
+    def __init__(self, balance, allowed_days, days):
+        super().__init__(
+            f"{days} more days exceed the {allowed_days} allowed "
+            f"({balance.used_days} used, {balance.pending_days} pending)."
+        )
+        self.balance = balance
+        self.allowed_days = allowed_days
+        self.days = days
+
+
+class BalanceConflict(Exception):
+    """A ledger row changed between being read and written back (optimistic check)."""
+
+
+def atomic_with_retry(func, *args, **kwargs):
+    """
+    Run func(*args, **kwargs) in a transaction and run it again from scratch
+    when it loses a race: BalanceConflict, or the database reporting a lock
+    or serialization failure. func must be safe to repeat (everything it
+    wrote was rolled back). Inside an outer transaction there is nothing to
+    retry, so the error is raised as is, as it is after LEAVE_WRITE_RETRIES.
+    """
+    attempt = 0
+    while True:
+        try:
+            with transaction.atomic():
+                return func(*args, **kwargs)
+        except (BalanceConflict, OperationalError) as error:
+            if isinstance(error, OperationalError) and not any(
+                message in str(error).lower() for message in RETRYABLE_ERRORS
+            ):
+                raise
+            if attempt >= settings.LEAVE_WRITE_RETRIES or transaction.get_connection().in_atomic_block:
+                raise
+            attempt += 1
+            # Jittered exponential backoff, so the writers that collided don't collide again
+            delay = min(settings.LEAVE_WRITE_RETRY_DELAY * 2 ** attempt, settings.LEAVE_WRITE_RETRY_MAX_DELAY)
+            time.sleep(random.uniform(0, delay))
+
+
+def allowed_days(balance, policy):
+    """Days the ledger row may hold (used + pending): the entitlement plus carry-forward, less encashment."""
+    return policy.max_days_per_year + balance.carried_forward_days - balance.encashed_days
+
+
+def count_leave_days(start_date, end_date, organization=None):
+    """
+    Number of leave days between two dates (inclusive): the working days of the
+    organization's calendar (Organization instance or id), or calendar days without one.
+    """
+    if organization is None:
+        return (end_date - start_date).days + 1
+    return working_days(organization, start_date, end_date)
+
+
+def booked_days(rows, organizations=None):
+    """
+    Days each leave counts for, from rows of (organization, start_date, end_date, days):
+    the days stored when it was applied for, or its working days on the current
+    calendar where none were stored (rows written in bulk, e.g. by seeding).
+    """
+    days = [row[3] for row in rows]
+    missing = [index for index, value in enumerate(days) if value is None]
+    if missing:
+        counted = working_days_by_organization([rows[index][:3] for index in missing], organizations)
+        for index, value in zip(missing, counted):
+            days[index] = value
+    return days
+
+
+def apply_status_change(leave, old_status, new_status, check_limit=False):
+    """
+    Move the leave's days from the ledger bucket of old_status to the one of new_status.
+    Must be called inside the same transaction that saves the Leave.
+    old_status=None → newly created leave, new_status=None → deleted leave.
+    check_limit: raise InsufficientBalance rather than commit days beyond allowed_days().
+    """
+    apply_status_changes([(leave, old_status, new_status)], check_limit=check_limit)
+
+
+def lock_balances(keys, policies):
+    """
+    The ledger rows of keys [(employee_id, policy_id, year)], created with the
+    policy's entitlement when missing. Where the database has row locks the
+    rows are read with SELECT ... FOR UPDATE and stay locked until the
+    transaction ends; elsewhere (SQLite) write_balances() checks that their
+    version has not moved since.
+    """
+    keys = set(keys)
+    balances = select_balances(keys)
+    missing = [
+        LeaveBalance(
+            employee_id=employee_id,
+            policy_id=policy_id,
+            year=year,
+            entitled_days=policies[policy_id].max_days_per_year,
+        )
+        for employee_id, policy_id, year in keys
+        if (employee_id, policy_id, year) not in balances
+    ]
+    if missing:
+        LeaveBalance.objects.bulk_create(missing, ignore_conflicts=True)
+        created = select_balances([(b.employee_id, b.policy_id, b.year) for b in missing])
+        for key, balance in created.items():
+            balances.setdefault(key, balance)
+    return balances
+
+
+def select_balances(keys, chunk_size=300):
+    """
+    {key: row} of the ledger rows of exactly these (employee_id, policy_id, year)
+    keys, read with SELECT ... FOR UPDATE: one OR'ed term per key (a chunk of keys
+    per query), so no other row of the same employees, policies or years is locked.
+    """
+    keys = list(keys)
+    balances = {}
+    for start in range(0, len(keys), chunk_size):
+        condition = reduce(or_, (
+            Q(employee_id=employee_id, policy_id=policy_id, year=year)
+            for employee_id, policy_id, year in keys[start:start + chunk_size]
+        ))
+        for balance in LeaveBalance.objects.select_for_update().filter(condition):
+            balances[(balance.employee_id, balance.policy_id, balance.year)] = balance
+    return balances
+
+
+def write_balances(balances):
+    """
+    Write back used/pending days of rows read by lock_balances(), bumping
+    their version. Without row locks each row is only written if its version
+    is still the one read (BalanceConflict otherwise: retry the transaction).
+    """
+    if connection.features.has_select_for_update:
+        for balance in balances:
+            balance.version += 1
+        LeaveBalance.objects.bulk_update(balances, ["used_days", "pending_days", "version"], batch_size=1000)
+        return
+    for balance in balances:
+        written = LeaveBalance.objects.filter(pk=balance.pk, version=balance.version).update(
+            used_days=balance.used_days, pending_days=balance.pending_days, version=balance.version + 1,
+        )
+        if not written:
+            raise BalanceConflict(f"Leave balance {balance.pk} changed while it was being updated.")
+        balance.version += 1
+
+
+def apply_status_changes(transitions, check_limit=False):
+    """
+    Batch version of apply_status_change for many leaves at once.
+    transitions: iterable of (leave, old_status, new_status).
+    Deltas are summed per ledger row, the affected rows are read (and locked
+    where the database supports it) in one query, missing rows are created
+    and everything is written back by write_balances(). With check_limit,
+    InsufficientBalance is raised before anything is written when a row would
+    end up holding more than allowed_days().
+    """
+    transitions = [
+        (leave, old_status, new_status)
+        for leave, old_status, new_status in transitions
+        if leave.policy_id is not None and STATUS_BUCKETS.get(old_status) != STATUS_BUCKETS.get(new_status)
+    ]
+    leave_days = booked_days(
+        [(leave.organization, leave.start_date, leave.end_date, leave.days) for leave, _, _ in transitions]
+    )
+
+    deltas = defaultdict(lambda: {"used_days": 0, "pending_days": 0})
+    policies = {}
+    for (leave, old_status, new_status), days in zip(transitions, leave_days):
+        old_bucket = STATUS_BUCKETS.get(old_status)
+        new_bucket = STATUS_BUCKETS.get(new_status)
+        key = (leave.employee_id, leave.policy_id, leave.start_date.year)
+        if old_bucket:
+            deltas[key][old_bucket] -= days
+        if new_bucket:
+            deltas[key][new_bucket] += days
+        policies[leave.policy_id] = leave.policy
+
+    if not deltas:
+        return
+
+    balances = lock_balances(deltas, policies)
+    changed = []
+    for key, delta in deltas.items():
+        balance = balances[key]
+        added = delta["used_days"] + delta["pending_days"]
+        if check_limit and added > 0:
+            limit = allowed_days(balance, policies[key[1]])
+            if balance.used_days + balance.pending_days + added > limit:
+                raise InsufficientBalance(balance, limit, added)
+        balance.used_days += delta["used_days"]
+        balance.pending_days += delta["pending_days"]
+        changed.append(balance)
+    write_balances(changed)
+
+
+def rebuild_balances(organization=None, year=None):
+    """
+    Recompute used/pending days of the ledger from the Leave table.
+    Entitlement is refreshed from the policy; carried-forward and encashed
+    days are kept as they are not derived from leaves. Every leave counts for
+    the days booked when it was applied for (booked_days), so holiday changes
+    do not move it. The ledger rows are locked before the leaves are read and
+    written back with their version bumped, like write_balances(), so a
+    concurrent status change either waits for the rebuild or fails its version
+    check and is retried. Returns the number of ledger rows written.
+    """
+    leaves = Leave.objects.filter(policy__isnull=False, status__in=STATUS_BUCKETS.keys())
+    balances = LeaveBalance.objects.select_related("policy").select_for_update(of=("self",))
+    if organization is not None:
+        leaves = leaves.filter(organization=organization)
+        balances = balances.filter(policy__organization=organization)
+    if year is not None:
+        leaves = leaves.filter(start_date__year=year)
+        balances = balances.filter(year=year)
+
+    with transaction.atomic():
+        balances = list(balances)
+
+        totals = defaultdict(lambda: {"used_days": 0, "pending_days": 0})
+        rows = leaves.values_list(
+            "organization_id", "employee_id", "policy_id", "start_date", "end_date", "days", "status"
+        ).iterator(chunk_size=2000)
+        organizations = {}
+        # Unstored days are counted a chunk at a time, vectorized per organization
+        while chunk := list(islice(rows, 2000)):
+            leave_days = booked_days(
+                [(organization_id, start, end, days) for organization_id, _, _, start, end, days, _ in chunk],
+                organizations,
+            )
+            for (_, employee_id, policy_id, start_date, _, _, leave_status), days in zip(chunk, leave_days):
+                key = (employee_id, policy_id, start_date.year)
+                totals[key][STATUS_BUCKETS[leave_status]] += days
+
+        entitlements = dict(
+            LeavePolicy.objects.filter(pk__in={key[1] for key in totals}).values_list("id", "max_days_per_year")
+        )
+
+        for balance in balances:
+            key = (balance.employee_id, balance.policy_id, balance.year)
+            values = totals.pop(key, {"used_days": 0, "pending_days": 0})
+            balance.used_days = values["used_days"]
+            balance.pending_days = values["pending_days"]
+            balance.entitled_days = balance.policy.max_days_per_year
+            balance.version += 1
+        LeaveBalance.objects.bulk_update(
+            balances, ["used_days", "pending_days", "entitled_days", "version"], batch_size=1000
+        )
+
+        missing = [
+            LeaveBalance(
+                employee_id=employee_id,
+                policy_id=policy_id,
+                year=balance_year,
+                entitled_days=entitlements[policy_id],
+                **values,
+            )
+            for (employee_id, policy_id, balance_year), values in totals.items()
+        ]
+        LeaveBalance.objects.bulk_create(missing, batch_size=1000)
+
+    return len(balances) + len(missing)
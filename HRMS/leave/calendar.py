@@ -0,0 +1,98 @@
+# leave/calendar.py
+import calendar
+from datetime import date, timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from .models import LeaveCalendarVersion
+
+
+CALENDAR_STATUSES = ["Approved", "Pending"]
+
+
+def month_bounds(year, month):
+    last_day = calendar.monthrange(year, month)[1]
+    return date(year, month, 1), date(year, month, last_day)
+
+
+def months_between(start_date, end_date):
+    """Yield (year, month) for every month touched by [start_date, end_date]."""
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def build_day_occupancy(window_start, window_end, leaves):
+    """
+    Sweep-line over the leaves overlapping [window_start, window_end].
+
+    leaves: iterable of dicts with "start_date", "end_date", "status" and member details.
+    Every leave contributes one "enter" event on its (clamped) first day and one
+    "exit" event the day after its (clamped) last day; walking the days in order
+    with the set of active leaves gives the headcount and members for each day.
+    """
+    leaves = list(leaves)
+    total_days = (window_end - window_start).days + 1
+    enter = [[] for _ in range(total_days + 1)]
+    exit_ = [[] for _ in range(total_days + 1)]
+
+    for index, leave in enumerate(leaves):
+        first = max(leave["start_date"], window_start)
+        last = min(leave["end_date"], window_end)
+        if first > last:
+            continue
+        enter[(first - window_start).days].append(index)
+        exit_[(last - window_start).days + 1].append(index)
+
+    active = {}
+    approved = 0
+    days = []
+    for offset in range(total_days):
+        for index in exit_[offset]:
+            approved -= active.pop(index)["status"] == "Approved"
+        for index in enter[offset]:
+            active[index] = leaves[index]
+            approved += leaves[index]["status"] == "Approved"
+
+        days.append({
+            "date": window_start + timedelta(days=offset),
+            "on_leave": len(active),
+            "approved": approved,
+            "pending": len(active) - approved,
+            "members": list(active.values()),
+        })
+    return days
+
+
+# Caching: one version counter per (organization, month), kept in the database
+# (LeaveCalendarVersion) so that every process sees a bump at once. Any change to
+# a leave in that month bumps the counter, which orphans every cached calendar for it.
+def calendar_version(organization_id, year, month):
+    return LeaveCalendarVersion.objects.filter(
+        organization_id=organization_id, month=date(year, month, 1)
+    ).values_list("version", flat=True).first() or 0
+
+
+def calendar_cache_key(organization_id, year, month, department):
+    version = calendar_version(organization_id, year, month)
+    return f"leave-calendar:{organization_id}:{year}-{month:02d}:{department or '*'}:{version}"
+
+
+def invalidate_calendar(organization_id, start_date, end_date):
+    for year, month in months_between(start_date, end_date):
+        versions = LeaveCalendarVersion.objects.filter(organization_id=organization_id, month=date(year, month, 1))
+        if versions.update(version=F("version") + 1):
+            continue
+        try:
+            with transaction.atomic():
+                LeaveCalendarVersion.objects.create(
+                    organization_id=organization_id, month=date(year, month, 1), version=1
+                )
+        except IntegrityError:
+            # A concurrent writer created the counter first
+            versions.update(version=F("version") + 1)
+
+
+def calendar_cache_timeout():
+    return getattr(settings, "LEAVE_CALENDAR_CACHE_TIMEOUT", 600)
@@ -0,0 +1,126 @@
+# leave/inbox.py
+"""
+Pending-approvals inbox.
+
+Every pending leave has a PendingLeave row (organization, department,
+created_at) that reviewers page through oldest first, and PendingCount keeps
+the number of those rows per organization (department "") and per department,
+so badge counts are a single-row read and the aging report is a range scan
+of the queue index, never of the leave table.
+
+Both are maintained where statuses change: post_save for single saves (see
+leave/signals.py), the bulk review for bulk_update, and pre_delete before the
+queue row cascades away. A leave stays counted under the department it was
+applied from (Leave.applied_department, the employee's current one for rows
+without it); rebuild_inbox() realigns queue and counters with the leave table
+(e.g. after bulk-loading leaves).
+"""
+from collections import Counter
+from itertools import islice
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from .models import Leave, PendingCount, PendingLeave
+
+
+ALL_DEPARTMENTS = ""
+
+
+def applied_department(leave):
+    """The department a leave is queued and counted under."""
+    return leave.applied_department or leave.employee.department
+
+
+def sync_inbox(leaves, created=False):
+    """
+    Queue the saved leaves that are pending and dequeue the others. created:
+    the leaves were just inserted, so none of them is queued yet. Must run in
+    the transaction that wrote the leaves.
+    """
+    pending = [leave for leave in leaves if leave.status == "Pending"]
+    deltas = dequeue([leave.pk for leave in leaves if leave.status != "Pending"])
+    if pending and not created:
+        queued = set(
+            PendingLeave.objects.filter(leave_id__in=[leave.pk for leave in pending])
+            .values_list("leave_id", flat=True)
+        )
+        pending = [leave for leave in pending if leave.pk not in queued]
+    if pending:
+        PendingLeave.objects.bulk_create([
+            PendingLeave(
+                leave=leave, organization_id=leave.organization_id,
+                department=applied_department(leave), created_at=leave.created_at,
+            )
+            for leave in pending
+        ])
+        deltas.update((leave.organization_id, applied_department(leave)) for leave in pending)
+    apply_counts(deltas)
+
+
+def dequeue(leave_ids):
+    """Remove leaves from the queue; returns the count deltas to apply."""
+    deltas = Counter()
+    if not leave_ids:
+        return deltas
+    rows = list(PendingLeave.objects.filter(leave_id__in=leave_ids).values_list("leave_id", "organization_id", "department"))
+    if rows:
+        PendingLeave.objects.filter(leave_id__in=[row[0] for row in rows]).delete()
+        deltas.subtract((organization_id, department) for _, organization_id, department in rows)
+    return deltas
+
+
+def apply_counts(deltas):
+    """Add {(organization id, department): delta} to the department and organization counters."""
+    totals = Counter()
+    for (organization_id, department), delta in deltas.items():
+        totals[(organization_id, department)] += delta
+        totals[(organization_id, ALL_DEPARTMENTS)] += delta
+    for (organization_id, department), delta in totals.items():
+        if delta == 0:
+            continue
+        counters = PendingCount.objects.filter(organization_id=organization_id, department=department)
+        if counters.update(pending=F("pending") + delta):
+            continue
+        try:
+            with transaction.atomic():
+                PendingCount.objects.create(organization_id=organization_id, department=department, pending=delta)
+        except IntegrityError:
+            # A concurrent writer created the counter first
+            counters.update(pending=F("pending") + delta)
+
+
+def pending_count(organization_id=None, department=ALL_DEPARTMENTS):
+    """Pending leaves of an organization (or department of it); every organization's without one."""
+    counters = PendingCount.objects.filter(department=department)
+    if organization_id is not None:
+        return counters.filter(organization_id=organization_id).values_list("pending", flat=True).first() or 0
+    return sum(counters.values_list("pending", flat=True))
+
+
+def rebuild_inbox(organization=None, chunk_size=2000):
+    """Recompute queue and counters (or one organization's) from the leave table. Returns the leaves queued."""
+    leaves = Leave.objects.filter(status="Pending")
+    queue = PendingLeave.objects.all()
+    counters = PendingCount.objects.all()
+    if organization is not None:
+        leaves = leaves.filter(organization=organization)
+        queue = queue.filter(organization=organization)
+        counters = counters.filter(organization=organization)
+
+    rows = leaves.annotate(
+        queue_department=Coalesce("applied_department", "employee__department")
+    ).values_list("pk", "organization_id", "queue_department", "created_at").iterator(
+        chunk_size=chunk_size
+    )
+    totals = Counter()
+    with transaction.atomic():
+        queue.delete()
+        counters.delete()
+        while chunk := list(islice(rows, chunk_size)):
+            PendingLeave.objects.bulk_create([
+                PendingLeave(leave_id=pk, organization_id=organization_id, department=department, created_at=created_at)
+                for pk, organization_id, department, created_at in chunk
+            ])
+            totals.update((organization_id, department) for _, organization_id, department, _ in chunk)
+        apply_counts(totals)
+    return sum(totals.values())
@@ -0,0 +1,55 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from organization.models import Organization
+from HRMS.benchmark import DEFAULT_COLLECTION, CollectionBenchmark, client_settings, load_collection
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the Postman collection's requests in-process against the current database "
+        "(see seed_hrms) and report p50/p95/p99 latency, queries and peak memory per endpoint as JSON. "
+        "Every request is rolled back, so the dataset is left unchanged."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--organization", required=True,
+            help="Code of the organization whose rows fill the collection variables (e.g. SEED001).",
+        )
+        parser.add_argument("--collection", default=str(DEFAULT_COLLECTION), help="Postman collection file.")
+        parser.add_argument("--iterations", type=int, default=20, help="Timed requests per endpoint.")
+        parser.add_argument("--warmup", type=int, default=2, help="Untimed requests per endpoint first.")
+        parser.add_argument("--password", default="password123", help="Password of the seeded users (login).")
+        parser.add_argument("--method", action="append", help="Only replay these HTTP methods (repeatable).")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            organization = Organization.objects.get(code=options["organization"])
+        except Organization.DoesNotExist:
+            raise CommandError(f"No organization with code {options['organization']!r}.")
+
+        requests = load_collection(options["collection"])
+        if options["method"]:
+            methods = {method.upper() for method in options["method"]}
+            requests = [request for request in requests if request["method"] in methods]
+
+        try:
+            benchmark = CollectionBenchmark(
+                organization, requests, iterations=options["iterations"],
+                warmup=options["warmup"], password=options["password"],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        with client_settings():
+            report = benchmark.run()
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as report_file:
+                report_file.write(output + "\n")
+            self.stdout.write(self.style.SUCCESS(
+                f"Benchmarked {len(report['endpoints'])} requests, report written to {options['output']}."
+            ))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,93 @@
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from leave.attachments import DIRECTORY, attachment_storage, blob_digest
+from leave.models import AttachmentBlob, Leave
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete leave attachment files no leave references any more: blobs whose reference "
+        "count has been zero for the grace period, and stored files without a blob row."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-seconds", type=int, default=None,
+            help="Keep blobs unreferenced for less than this (default: LEAVE_ATTACHMENT_GC_GRACE_SECONDS).",
+        )
+        parser.add_argument(
+            "--recount", action="store_true",
+            help="Recompute every reference count from the Leave table first.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted.")
+
+    def handle(self, *args, **options):
+        grace = options["grace_seconds"]
+        if grace is None:
+            grace = settings.LEAVE_ATTACHMENT_GC_GRACE_SECONDS
+        cutoff = timezone.now() - timedelta(seconds=grace)
+        dry_run = options["dry_run"]
+
+        if options["recount"]:
+            corrected = self.recount()
+            self.stdout.write(f"Corrected {corrected} reference counts.")
+
+        deleted = freed = 0
+        candidates = AttachmentBlob.objects.filter(ref_count__lte=0, updated_at__lt=cutoff)
+        for digest, name, size in candidates.values_list("sha256", "name", "size").iterator():
+            if not dry_run:
+                # Conditional: a blob referenced or re-uploaded since the scan is kept
+                removed, _ = AttachmentBlob.objects.filter(
+                    pk=digest, ref_count__lte=0, updated_at__lt=cutoff
+                ).delete()
+                if not removed:
+                    continue
+                attachment_storage.delete(name)
+            deleted += 1
+            freed += size
+
+        orphans = self.delete_orphan_files(cutoff, dry_run)
+        verb = "Would delete" if dry_run else "Deleted"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {deleted} unreferenced attachments ({freed} bytes) and {orphans} orphaned files."
+        ))
+
+    def recount(self):
+        references = Counter(
+            digest for digest in map(blob_digest, Leave.objects.exclude(attachment="")
+                                     .exclude(attachment__isnull=True)
+                                     .values_list("attachment", flat=True).iterator())
+            if digest
+        )
+        corrected = 0
+        with transaction.atomic():
+            for digest, ref_count in AttachmentBlob.objects.select_for_update().values_list("sha256", "ref_count"):
+                if references.get(digest, 0) != ref_count:
+                    AttachmentBlob.objects.filter(pk=digest).update(ref_count=references.get(digest, 0))
+                    corrected += 1
+        return corrected
+
+    def delete_orphan_files(self, cutoff, dry_run):
+        """Stored files without a blob row, e.g. left by an upload whose transaction rolled back."""
+        root = attachment_storage.path(DIRECTORY)
+        if not os.path.isdir(root):
+            return 0
+        known = set(AttachmentBlob.objects.values_list("sha256", flat=True))
+        oldest = cutoff.timestamp()
+        deleted = 0
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                digest = blob_digest(filename)
+                path = os.path.join(directory, filename)
+                if digest is None or digest in known or os.path.getmtime(path) >= oldest:
+                    continue
+                if not dry_run:
+                    os.remove(path)
+                deleted += 1
+        return deleted
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from organization.models import Organization
+from leave.balances import rebuild_balances
+
+
+class Command(BaseCommand):
+    help = "Reconcile the leave balance ledger from the Leave table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--organization", help="Organization code to rebuild (default: all).")
+        parser.add_argument("--year", type=int, help="Only rebuild this year (default: all years).")
+
+    def handle(self, *args, **options):
+        organization = None
+        if options["organization"]:
+            try:
+                organization = Organization.objects.get(code=options["organization"])
+            except Organization.DoesNotExist:
+                raise CommandError(f"No organization with code {options['organization']!r}.")
+
+        written = rebuild_balances(organization=organization, year=options["year"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} leave balance rows."))
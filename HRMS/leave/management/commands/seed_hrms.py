@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from HRMS.seeding import DatasetSeeder
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic dataset: organizations with holidays, an HR manager, employees, "
+        "one policy per policy type with version history, and a year of leaves per employee."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--organizations", type=int, default=1, help="Organizations to create.")
+        parser.add_argument("--employees", type=int, default=100, help="Employees per organization.")
+        parser.add_argument("--leaves", type=int, default=10, help="Leaves per employee (at most).")
+        parser.add_argument("--policy-versions", type=int, default=3, help="History versions per policy.")
+        parser.add_argument(
+            "--prefix", default="SEED",
+            help="Prefix of organization codes, emails and usernames; must not be in use yet.",
+        )
+        parser.add_argument("--password", default="password123", help="Password of every seeded user.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed (same seed, same dataset).")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Employees written per transaction.")
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+        if not prefix.isalnum() or len(prefix) > 6:
+            raise CommandError("--prefix must be at most 6 letters or digits.")
+
+        seeder = DatasetSeeder(
+            organizations=options["organizations"], employees=options["employees"],
+            leaves=options["leaves"], policy_versions=options["policy_versions"], prefix=prefix.upper(),
+            password=options["password"], seed=options["seed"], chunk_size=options["chunk_size"],
+        )
+        try:
+            counts = seeder.run()
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            "Seeded " + ", ".join(f"{count} {name.replace('_', ' ')}" for name, count in counts.items()) + "."
+        ))
+        self.stdout.write(f"Sign in as {prefix.lower()}.admin@seed.example, {prefix.lower()}001.hr@seed.example "
+                          f"or {prefix.lower()}001.emp1@seed.example with password {options['password']!r}.")
@@ -0,0 +1,162 @@
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from auth_app.models import User
+from auth_app.tokens import HRMSRefreshToken
+from employee.models import Employee
+from HRMS.benchmark import client_settings, summarize
+from leave.models import LeaveBalance
+from organization.models import Organization
+from policy.models import LeavePolicy
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer the leave endpoints from concurrent writers and check that the balance ledger "
+        "is never overspent: every writer applies for distinct one-day leaves of the same employee "
+        "(more days than the policy allows in total), then every leave is approved by several "
+        "reviewers at once. Runs in-process against a scratch organization that is deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--writers", type=int, nargs="+", default=[1, 8, 32],
+            help="Concurrent writers of each round (one round per value).",
+        )
+        parser.add_argument("--requests", type=int, default=4, help="Applications sent by each writer.")
+        parser.add_argument("--allowed-days", type=int, default=10, help="Days per year the scratch policy allows.")
+        parser.add_argument(
+            "--reviewers", type=int, default=2,
+            help="Concurrent approvals of every granted leave (0 skips the review phase).",
+        )
+
+    def handle(self, *args, **options):
+        if any(writers < 1 for writers in options["writers"]) or options["requests"] < 1:
+            raise CommandError("--writers and --requests must be positive.")
+        if max(options["writers"]) * options["requests"] > 365:
+            raise CommandError("At most 365 applications per round (one per day of the year).")
+
+        code = f"STRESS-{uuid.uuid4().hex[:8].upper()}"
+        self.organization = Organization.objects.create(name=f"Stress {code}", code=code, working_week="1111111")
+        try:
+            self.hr = User.objects.create_user(
+                email=f"hr@{code.lower()}.example", username=f"{code.lower()}-hr", password=None,
+                role="HR", organization=self.organization,
+            )
+            self.policy = LeavePolicy.objects.create(
+                organization=self.organization, name="Annual", policy_type="ANNUAL",
+                max_days_per_year=options["allowed_days"],
+            )
+            with client_settings():
+                rounds = [
+                    self.run_round(writers, options["requests"], options["reviewers"])
+                    for writers in options["writers"]
+                ]
+        finally:
+            User.objects.filter(organization=self.organization).delete()
+            self.organization.delete()
+
+        self.stdout.write(json.dumps(
+            {"database": connection.vendor, "allowed_days": options["allowed_days"], "rounds": rounds}, indent=2,
+        ))
+        if not all(result["consistent"] for result in rounds):
+            raise CommandError("The ledger does not match the leaves that were granted (see the report).")
+
+    def run_round(self, writers, per_writer, reviewers):
+        """One employee, writers × per_writer concurrent applications, then concurrent approvals."""
+        user = User.objects.create_user(
+            email=f"w{writers}@{self.organization.code.lower()}.example",
+            username=f"{self.organization.code.lower()}-w{writers}", password=None, organization=self.organization,
+        )
+        employee = Employee.objects.create(
+            user=user, organization=self.organization, employee_code=f"{self.organization.code}-{writers}",
+            department="Stress", designation="Writer", date_of_joining=date(2020, 1, 1),
+        )
+        first_day = date(date.today().year + 1, 1, 1)
+        days = [first_day + timedelta(days=offset) for offset in range(writers * per_writer)]
+        random.shuffle(days)
+
+        def apply(client, day):
+            return client.post("/leaves/", {
+                "policy": str(self.policy.pk), "start_date": day, "end_date": day, "reason": "Stress",
+            })
+
+        applications = self.hammer(user, writers, apply, days)
+        granted = [response.json() for response in applications["responses"] if response.status_code == 201]
+        ledger = self.ledger(employee, first_day.year)
+        result = {
+            "writers": writers,
+            "apply": applications["summary"],
+            "granted": len(granted),
+            "ledger": ledger,
+            "consistent": (
+                ledger["pending_days"] == len(granted) and ledger["used_days"] == 0
+                and len(granted) == min(len(days), self.policy.max_days_per_year)
+            ),
+        }
+
+        if reviewers and granted:
+            # Every reviewer holds the version the leave was created with: exactly one approval may win
+            tasks = [leave for leave in granted for _ in range(reviewers)]
+            random.shuffle(tasks)
+
+            def approve(client, leave):
+                return client.put(
+                    f"/leaves/{leave['id']}/", {"action": "approve", "version": leave["version"]},
+                    content_type="application/json",
+                )
+
+            approvals = self.hammer(self.hr, writers, approve, tasks)
+            wins = Counter(
+                task["id"] for task, response in zip(tasks, approvals["responses"]) if response.status_code == 200
+            )
+            ledger = self.ledger(employee, first_day.year)
+            result["approve"] = approvals["summary"]
+            result["ledger"] = ledger
+            result["consistent"] = result["consistent"] and (
+                all(wins[leave["id"]] == 1 for leave in granted)
+                and ledger["used_days"] == len(granted) and ledger["pending_days"] == 0
+            )
+        return result
+
+    def hammer(self, user, concurrency, send, payloads):
+        """Send every payload from `concurrency` threads (one client each); responses in payload order."""
+        headers = {"Authorization": f"Bearer {HRMSRefreshToken.for_user(user).access_token}"}
+        local = threading.local()
+
+        def timed(payload):
+            if not hasattr(local, "client"):
+                local.client = Client(headers=headers, raise_request_exception=False)
+            started = time.perf_counter()
+            response = send(local.client, payload)
+            return time.perf_counter() - started, response
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(timed, payloads))
+        elapsed = time.perf_counter() - started
+
+        responses = [outcome[1] for outcome in outcomes]
+        summary = summarize(
+            [outcome[0] for outcome in outcomes], elapsed, sum(r.status_code >= 500 for r in responses)
+        )
+        summary["statuses"] = {
+            str(code): count for code, count in sorted(Counter(r.status_code for r in responses).items())
+        }
+        return {"summary": summary, "responses": responses}
+
+    def ledger(self, employee, year):
+        balance = LeaveBalance.objects.filter(employee=employee, policy=self.policy, year=year).first()
+        return {
+            "used_days": balance.used_days if balance else 0,
+            "pending_days": balance.pending_days if balance else 0,
+        }
@@ -1,9 +1,11 @@
 import uuid
 from django.db import models
+from django.db.models import DEFERRED
 from organization.models import Organization
 from policy.models import LeavePolicy
 from auth_app.models import User
 from employee.models import Employee 
+from .attachments import attachment_storage
 
 class Leave(models.Model):
     STATUS_CHOICES = [
@@ -12,6 +14,8 @@ class Leave(models.Model):
         ("Rejected", "Rejected"),
         ("Cancelled", "Cancelled"),
     ]
+    # Values remembered at load time so changes can be diffed after save (analytics rollups)
+    TRACKED_FIELDS = ("status", "policy_id", "start_date", "end_date", "reviewed_at", "days", "applied_department")
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     organization = models.ForeignKey(
@@ -28,10 +32,18 @@ class Leave(models.Model):
     )
     start_date = models.DateField()
     end_date = models.DateField()
+    # Working days counted when the leave was applied for: what the ledger and the rollups
+    # book, so a later holiday change does not move them (NULL: counted on the current calendar)
+    days = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    # The employee's department when the leave was applied for: the rollup bucket it is counted in
+    # (NULL: the employee's current one)
+    applied_department = models.CharField(max_length=100, null=True, blank=True, editable=False)
     reason = models.TextField()
 
-    # optional supporting document (medical proof, travel proof, etc.)
-    attachment = models.FileField(upload_to="leave_attachments/", null=True, blank=True)
+    # optional supporting document (medical proof, travel proof, etc.), stored by content (AttachmentBlob)
+    attachment = models.FileField(
+        upload_to="leave_attachments/", storage=attachment_storage, null=True, blank=True
+    )
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Pending")
     remarks = models.TextField(blank=True, null=True)
@@ -43,6 +55,9 @@ class Leave(models.Model):
         blank=True,
         related_name="reviewed_leaves"
     )
+    reviewed_at = models.DateTimeField(null=True, blank=True)
+    # Bumped by every review; a review of an older version is rejected (409)
+    version = models.PositiveIntegerField(default=1)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -52,6 +67,232 @@ class Leave(models.Model):
         verbose_name = "Leave"
         verbose_name_plural = "Leaves"
         ordering = ["-created_at"]
+        indexes = [
+            # SUPERADMIN listing, keyset-paginated on (created_at, id)
+            models.Index(fields=["-created_at", "-id"], name="leave_created_idx"),
+            # HR listing scoped to one organization
+            models.Index(fields=["organization", "-created_at", "-id"], name="leave_org_created_idx"),
+            # Employee history (/leaves/me/)
+            models.Index(fields=["user", "-created_at", "-id"], name="leave_user_created_idx"),
+            # Balance and overlap checks for one employee + policy
+            models.Index(
+                fields=["employee", "policy", "status", "start_date", "end_date"],
+                name="leave_emp_policy_status_idx",
+            ),
+            # Overlap probe for one employee: end_date >= new_start AND start_date <= new_end
+            models.Index(fields=["employee", "end_date", "start_date"], name="leave_emp_window_idx"),
+            # Calendar window probes: end_date >= window_start AND start_date <= window_end
+            models.Index(fields=["organization", "end_date", "start_date"], name="leave_org_window_idx"),
+            # Review queues only ever look at pending leaves
+            models.Index(
+                fields=["organization", "created_at"],
+                name="leave_pending_org_idx",
+                condition=models.Q(status="Pending"),
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_state = instance.get_tracked_state()
+        # Attachment references are counted per leave (leave/signals.py)
+        instance._loaded_attachment = instance.__dict__.get("attachment", DEFERRED)
+        return instance
+
+    def get_tracked_state(self):
+        return {field: self.__dict__.get(field) for field in self.TRACKED_FIELDS}
 
     def __str__(self):
         return f"{self.employee.user.email} | {self.policy.name if self.policy else 'No Policy'} ({self.status})"
+
+
+class PendingLeave(models.Model):
+    """
+    The approvals inbox: one row per pending leave, with what reviewers filter
+    and sort on (leave/inbox.py). created_at is the leave's, the SLA clock.
+    """
+    leave = models.OneToOneField(Leave, on_delete=models.CASCADE, primary_key=True, related_name="inbox_entry")
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="pending_leaves")
+    department = models.CharField(max_length=100)  # the employee's when the leave was applied for
+    created_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "leave_inbox"
+        indexes = [
+            # HR inbox, oldest first, and the aging report's range scans
+            models.Index(fields=["organization", "created_at", "leave"], name="leave_inbox_org_idx"),
+            # Inbox scoped to one department
+            models.Index(
+                fields=["organization", "department", "created_at", "leave"], name="leave_inbox_dept_idx"
+            ),
+            # SUPERADMIN inbox across organizations
+            models.Index(fields=["created_at", "leave"], name="leave_inbox_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.leave_id} | {self.department} (since {self.created_at:%Y-%m-%d})"
+
+
+class PendingCount(models.Model):
+    """
+    Live number of pending leaves per organization (department "") and per
+    department, kept alongside PendingLeave so inbox badges are one-row reads.
+    """
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="pending_counts")
+    department = models.CharField(max_length=100, blank=True)
+    pending = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "leave_inbox_count"
+        unique_together = ("organization", "department")
+
+    def __str__(self):
+        return f"{self.organization_id} | {self.department or 'all'}: {self.pending}"
+
+
+class LeaveCalendarVersion(models.Model):
+    """
+    Version of an organization's team calendar for one month (leave/calendar.py).
+    Cached calendars are keyed by it, so bumping it here orphans them in every
+    process at once.
+    """
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="calendar_versions")
+    month = models.DateField()  # first day of the month
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        db_table = "leave_calendar_version"
+        unique_together = ("organization", "month")
+
+    def __str__(self):
+        return f"{self.organization_id} | {self.month:%Y-%m}: v{self.version}"
+
+
+class AttachmentBlob(models.Model):
+    """
+    One stored attachment file, addressed by the SHA-256 of its content
+    (leave/attachments.py). ref_count is the number of leaves referencing it;
+    gc_leave_attachments deletes blobs that have been unreferenced for a while.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=100)
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Also touched whenever the blob is uploaded again or referenced (GC grace period)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "leave_attachment_blob"
+        indexes = [
+            # Garbage collection candidates
+            models.Index(
+                fields=["updated_at"], name="attachment_unreferenced_idx", condition=models.Q(ref_count__lte=0)
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
+
+
+class LeaveBalance(models.Model):
+    """
+    Materialized leave ledger per (employee, policy, year).
+    Kept in sync with Leave status changes so that applying for leave
+    is a single indexed lookup instead of an aggregate over history.
+    """
+    employee = models.ForeignKey(
+        Employee, on_delete=models.CASCADE, related_name="leave_balances"
+    )
+    policy = models.ForeignKey(
+        LeavePolicy, on_delete=models.CASCADE, related_name="balances"
+    )
+    year = models.PositiveIntegerField()
+
+    entitled_days = models.IntegerField(default=0)
+    used_days = models.IntegerField(default=0)  # Approved
+    pending_days = models.IntegerField(default=0)  # Pending review
+    carried_forward_days = models.IntegerField(default=0)
+    encashed_days = models.IntegerField(default=0)
+    # Bumped by every used/pending write; checked on write where rows can't be locked (balances.write_balances)
+    version = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "leave_balance"
+        verbose_name = "Leave Balance"
+        verbose_name_plural = "Leave Balances"
+        unique_together = ("employee", "policy", "year")
+
+    @property
+    def available_days(self):
+        return self.entitled_days + self.carried_forward_days - self.used_days - self.encashed_days
+
+    def __str__(self):
+        return f"{self.employee_id} | {self.policy_id} | {self.year}"
+
+
+class YearEndRun(models.Model):
+    """
+    Progress of the year-end close of one organization. Employees are closed in
+    keyset order of their id; last_employee_id is the checkpoint, every
+    employee up to it has been closed and committed.
+    """
+    STATUS_CHOICES = [
+        ("Running", "Running"),
+        ("Completed", "Completed"),
+        ("Failed", "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="year_end_runs")
+    year = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Running")
+
+    last_employee_id = models.UUIDField(null=True, blank=True)
+    employees_processed = models.PositiveIntegerField(default=0)
+    carried_forward_days = models.IntegerField(default=0)
+    encashed_days = models.IntegerField(default=0)
+    lapsed_days = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+
+    started_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="year_end_runs"
+    )
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "leave_year_end_run"
+        verbose_name = "Year-End Run"
+        verbose_name_plural = "Year-End Runs"
+        unique_together = ("organization", "year")
+
+    def __str__(self):
+        return f"{self.organization_id} | {self.year} ({self.status})"
+
+
+class LeaveClosing(models.Model):
+    """Closing balance of one employee and policy for a year, and where it went."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    run = models.ForeignKey(YearEndRun, on_delete=models.CASCADE, related_name="closings")
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="leave_closings")
+    policy = models.ForeignKey(LeavePolicy, on_delete=models.CASCADE, related_name="closings")
+    year = models.PositiveIntegerField()
+
+    closing_days = models.IntegerField(default=0)
+    carried_forward_days = models.IntegerField(default=0)  # into year + 1
+    encashed_days = models.IntegerField(default=0)
+    lapsed_days = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "leave_closing"
+        verbose_name = "Leave Closing"
+        verbose_name_plural = "Leave Closings"
+        unique_together = ("employee", "policy", "year")
+
+    def __str__(self):
+        return f"{self.employee_id} | {self.policy_id} | {self.year}"
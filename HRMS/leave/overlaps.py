@@ -0,0 +1,105 @@
+# leave/overlaps.py
+import heapq
+from bisect import bisect_right
+from collections import defaultdict
+from employee.models import Employee
+from .models import Leave
+
+
+# Leaves that hold the employee's days and therefore cannot overlap each other
+BLOCKING_STATUSES = ["Pending", "Approved"]
+
+
+def lock_employees(employee_ids):
+    """
+    Serialize the overlap checks of these employees until the transaction ends:
+    where the database has row locks, their Employee rows are taken with
+    SELECT ... FOR UPDATE (in primary-key order, so batches cannot deadlock), and
+    a concurrent application or approval for the same employee waits, then sees
+    the leave this transaction wrote. Without row locks (SQLite) the
+    transaction already holds the database's write lock (transaction_mode IMMEDIATE).
+    """
+    locked = Employee.objects.select_for_update().filter(pk__in=employee_ids).order_by("pk")
+    list(locked.values_list("pk", flat=True))
+
+
+def find_overlapping_leave(employee_id, start_date, end_date, statuses=BLOCKING_STATUSES, exclude_id=None):
+    """
+    Return one of the employee's leaves overlapping [start_date, end_date], or None.
+    Two ranges overlap when start <= other_end AND end >= other_start; the probe is
+    served by the (employee, end_date, start_date) index.
+    """
+    leaves = Leave.objects.filter(
+        employee_id=employee_id,
+        end_date__gte=start_date,
+        start_date__lte=end_date,
+        status__in=statuses,
+    )
+    if exclude_id is not None:
+        leaves = leaves.exclude(pk=exclude_id)
+    return leaves.only("id", "start_date", "end_date", "status").first()
+
+
+class IntervalSet:
+    """
+    Non-overlapping date ranges kept sorted by start date.
+    overlaps() is a binary search; add() assumes the range does not overlap.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def overlaps(self, start_date, end_date):
+        # The only candidate is the last range starting on or before end_date
+        index = bisect_right(self.starts, end_date) - 1
+        return index >= 0 and self.ends[index] >= start_date
+
+    def add(self, start_date, end_date):
+        index = bisect_right(self.starts, start_date)
+        self.starts.insert(index, start_date)
+        self.ends.insert(index, end_date)
+
+
+def approved_interval_sets(employee_ids, window_start, window_end, exclude_ids=()):
+    """One query: the approved leaves of many employees inside a window, as IntervalSets."""
+    intervals = defaultdict(IntervalSet)
+    rows = (
+        Leave.objects.filter(
+            employee_id__in=employee_ids,
+            status="Approved",
+            end_date__gte=window_start,
+            start_date__lte=window_end,
+        )
+        .exclude(pk__in=exclude_ids)
+        .order_by("start_date")
+        .values_list("employee_id", "start_date", "end_date")
+    )
+    for employee_id, start_date, end_date in rows:
+        if not intervals[employee_id].overlaps(start_date, end_date):
+            intervals[employee_id].add(start_date, end_date)
+    return intervals
+
+
+def find_overlapping_pairs(rows):
+    """
+    Sorted sweep over leaves ordered by (employee_id, start_date).
+
+    rows: iterable of dicts with "employee_id", "start_date" and "end_date".
+    Active leaves are kept in a min-heap on end_date; when a new leave starts,
+    every active leave that already ended is popped and the rest overlap it.
+    Runs in O(n log n + k) for k overlapping pairs.
+    """
+    pairs = []
+    active = []
+    current_employee = None
+    for sequence, row in enumerate(rows):
+        if row["employee_id"] != current_employee:
+            current_employee = row["employee_id"]
+            active = []
+        while active and active[0][0] < row["start_date"]:
+            heapq.heappop(active)
+        for _, _, other in active:
+            pairs.append((other, row))
+        heapq.heappush(active, (row["end_date"], sequence, row))
+    return pairs
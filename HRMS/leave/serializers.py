@@ -1,5 +1,34 @@
+import uuid
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Leave
+from policy.cache import policy_cache
+from policy.models import LeavePolicy
+from .models import Leave, YearEndRun
+
+
+class CachedPolicyField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves the policy from the requesting user's organization policy cache
+    instead of querying LeavePolicy on every application. Only policies of the
+    user's own organization are accepted; users without an organization
+    (SUPERADMIN) fall back to a regular database lookup.
+    """
+
+    def to_internal_value(self, data):
+        request = self.context.get("request")
+        organization_id = getattr(getattr(request, "user", None), "organization_id", None)
+        if organization_id is None:
+            return super().to_internal_value(data)
+
+        try:
+            policy_id = uuid.UUID(str(data))
+        except ValueError:
+            self.fail("does_not_exist", pk_value=data)
+        policy = policy_cache.get_policy(organization_id, policy_id)
+        if policy is None:
+            self.fail("does_not_exist", pk_value=data)
+        return policy
+
 
 class LeaveSerializer(serializers.ModelSerializer):
     organization_name = serializers.CharField(source='organization.name', read_only=True)
@@ -8,6 +37,7 @@ class LeaveSerializer(serializers.ModelSerializer):
     employee_role = serializers.CharField(source='employee.user.role', read_only=True)
     policy_name = serializers.CharField(source='policy.name', read_only=True)
     reviewed_by_username = serializers.CharField(source='reviewed_by.username', read_only=True, default=None)
+    policy = CachedPolicyField(queryset=LeavePolicy.objects.all(), allow_null=True, required=False)
 
     class Meta:
         model = Leave
@@ -16,10 +46,55 @@ class LeaveSerializer(serializers.ModelSerializer):
             'employee', 'employee_name', 'employee_email', 'employee_role',
             'user', 'policy', 'policy_name',
             'start_date', 'end_date', 'reason', 'attachment',
-            'status', 'remarks', 'reviewed_by', 'reviewed_by_username',
-            'created_at', 'updated_at'
+            'status', 'remarks', 'reviewed_by', 'reviewed_by_username', 'reviewed_at',
+            'version', 'created_at', 'updated_at'
         ]
         read_only_fields = [
             'id', 'organization', 'employee', 'user',
-            'status', 'reviewed_by', 'created_at', 'updated_at'
+            'status', 'reviewed_by', 'reviewed_at', 'version', 'created_at', 'updated_at'
+        ]
+
+
+class LeaveListSerializer(LeaveSerializer):
+    """Default shape of leave list responses; ?fields= can ask for any LeaveSerializer field."""
+
+    class Meta(LeaveSerializer.Meta):
+        fields = [
+            'id', 'employee', 'employee_name', 'policy', 'policy_name',
+            'start_date', 'end_date', 'status', 'created_at',
+        ]
+
+
+class LeaveReviewItemSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    action = serializers.ChoiceField(choices=["approve", "reject", "cancel"])
+    remarks = serializers.CharField(required=False, allow_blank=True, default="")
+    # The version the reviewer saw; the item fails if the leave has changed since
+    version = serializers.IntegerField(required=False, min_value=1)
+
+
+class LeaveBulkReviewSerializer(serializers.Serializer):
+    items = LeaveReviewItemSerializer(many=True, allow_empty=False, max_length=5000)
+
+
+class YearEndRunSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = YearEndRun
+        fields = [
+            'id', 'organization', 'year', 'status',
+            'employees_processed', 'last_employee_id',
+            'carried_forward_days', 'encashed_days', 'lapsed_days', 'error',
+            'started_by', 'started_at', 'updated_at', 'finished_at',
         ]
+        read_only_fields = fields
+
+
+class YearEndRequestSerializer(serializers.Serializer):
+    year = serializers.IntegerField(min_value=2000)
+    restart = serializers.BooleanField(required=False, default=False)
+
+    def validate_year(self, value):
+        # Leaves can still be booked against the current year, so only past years close
+        if value >= timezone.localdate().year:
+            raise serializers.ValidationError("Only past years can be closed.")
+        return value
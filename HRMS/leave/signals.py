@@ -0,0 +1,68 @@
+# leave/signals.py
+from django.db.models import DEFERRED
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from .attachments import add_references, remove_references
+from .balances import count_leave_days
+from .calendar import invalidate_calendar
+from .inbox import apply_counts, dequeue, sync_inbox
+from .models import Leave
+
+
+@receiver(pre_save, sender=Leave)
+def book_leave_days(sender, instance, raw=False, **kwargs):
+    # Leaves created without them (admin, scripts) book the working days of today's calendar
+    # and the employee's department of today
+    if raw or not instance._state.adding:
+        return
+    if instance.days is None:
+        instance.days = count_leave_days(instance.start_date, instance.end_date, instance.organization_id)
+    if instance.applied_department is None:
+        instance.applied_department = instance.employee.department
+
+
+@receiver(post_save, sender=Leave)
+@receiver(post_delete, sender=Leave)
+def invalidate_leave_calendar(sender, instance, **kwargs):
+    # In the leave's transaction: the version row commits (or is retried) with the change,
+    # so readers never see the new version before the new rows
+    invalidate_calendar(instance.organization_id, instance.start_date, instance.end_date)
+
+
+def _attachment_name(value):
+    # The raw column (str) until the descriptor has wrapped it in a FieldFile
+    return getattr(value, "name", value) or None
+
+
+@receiver(post_save, sender=Leave)
+def count_attachment_references(sender, instance, created, **kwargs):
+    if "attachment" not in instance.__dict__:
+        return
+    loaded = getattr(instance, "_loaded_attachment", None)
+    if loaded is DEFERRED:
+        # Loaded without the column: unknown (gc_leave_attachments --recount reconciles)
+        return
+    old, new = _attachment_name(loaded), _attachment_name(instance.__dict__["attachment"])
+    if old != new:
+        add_references([new])
+        remove_references([old])
+    instance._loaded_attachment = new
+
+
+@receiver(post_delete, sender=Leave)
+def release_attachment_reference(sender, instance, **kwargs):
+    if "attachment" in instance.__dict__:
+        remove_references([_attachment_name(instance.__dict__["attachment"])])
+
+
+@receiver(post_save, sender=Leave)
+def update_inbox(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        sync_inbox([instance], created=created)
+
+
+@receiver(pre_delete, sender=Leave)
+def remove_from_inbox(sender, instance, **kwargs):
+    # Before the queue row cascades away with the leave, so its counters can follow
+    if instance.status == "Pending":
+        apply_counts(dequeue([instance.pk]))
@@ -1,3 +1,1167 @@
-from django.test import TestCase
+import hashlib
+import json
+import math
+import os
+import posixpath
+import random
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+from datetime import date, timedelta
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, router
+from django.db.models import Sum
+from django.utils import timezone
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase, APITransactionTestCase
+from organization.models import Holiday, Organization
+from auth_app.models import User
+from auth_app.tokens import HRMSRefreshToken
+from employee.models import Employee
+from policy.models import LeavePolicy
+from policy.versioning import policy_as_of
+from analytics.models import LeaveRollup
+from notifications.models import OutboxEvent
+from HRMS import metrics
+from HRMS.db_routing import pin_key
+from HRMS.testing import QueryPlanMixin, quiet_slow_requests
+from .balances import BalanceConflict, lock_balances, rebuild_balances, write_balances
+from .calendar import build_day_occupancy
+from .overlaps import find_overlapping_pairs
+from .models import (
+    AttachmentBlob, Leave, LeaveBalance, LeaveCalendarVersion, LeaveClosing, PendingCount, PendingLeave, YearEndRun,
+)
+from . import year_end
+from .year_end import YearEndClose
 
-# Create your tests here.
+
+class LeaveTestMixin:
+    """Shared fixtures: one organization with an HR user, an employee and an annual policy."""
+
+    def setUp(self):
+        # Every day is a working day, so leave lengths are plain calendar days here
+        # (working-day calendars are covered by LeaveWorkingDayTests)
+        self.org = Organization.objects.create(name="Acme", code="ACME", working_week="1111111")
+        self.hr = User.objects.create_user(
+            email="hr@acme.com", username="hr", password="pass", role="HR", organization=self.org
+        )
+        self.user = User.objects.create_user(
+            email="emp@acme.com", username="emp", password="pass", organization=self.org
+        )
+        self.employee = Employee.objects.create(
+            user=self.user, organization=self.org, employee_code="E001",
+            department="Engineering", designation="Developer", date_of_joining=date(2020, 1, 1),
+        )
+        self.policy = LeavePolicy.objects.create(
+            organization=self.org, name="Annual", policy_type="ANNUAL",
+            max_days_per_year=10, allow_encashment=True, encashment_limit=5,
+        )
+
+    def apply(self, start, end, **extra):
+        self.client.force_authenticate(self.user)
+        data = {"policy": str(self.policy.id), "start_date": start, "end_date": end, "reason": "Trip", **extra}
+        return self.client.post("/leaves/", data)
+
+    def review(self, leave_id, action, **extra):
+        self.client.force_authenticate(self.hr)
+        return self.client.put(f"/leaves/{leave_id}/", {"action": action, **extra})
+
+
+class LeaveBalanceLedgerTests(LeaveTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.start = date.today() + timedelta(days=10)
+
+    def balance(self):
+        return LeaveBalance.objects.get(employee=self.employee, policy=self.policy, year=self.start.year)
+
+    def test_ledger_follows_status_changes(self):
+        response = self.apply(self.start, self.start + timedelta(days=2))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((self.balance().pending_days, self.balance().used_days), (3, 0))
+
+        self.review(response.data["id"], "approve")
+        self.assertEqual((self.balance().pending_days, self.balance().used_days), (0, 3))
+
+        self.review(response.data["id"], "cancel")
+        self.assertEqual((self.balance().pending_days, self.balance().used_days), (0, 0))
+
+    def test_holiday_added_after_applying_does_not_move_the_ledger(self):
+        leave_id = self.apply(self.start, self.start + timedelta(days=2)).data["id"]
+        self.assertEqual(Leave.objects.get(pk=leave_id).days, 3)
+        Holiday.objects.create(organization=self.org, date=self.start + timedelta(days=1), name="New holiday")
+
+        # The days booked at apply time move between the buckets, whatever the calendar says now
+        self.review(leave_id, "approve")
+        self.assertEqual((self.balance().pending_days, self.balance().used_days), (0, 3))
+        self.assertEqual(
+            LeaveRollup.objects.filter(organization=self.org).values_list("status", "leave_count", "leave_days")
+            .get(leave_count=1),
+            ("Approved", 1, 3),
+        )
+        self.assertEqual(LeaveRollup.objects.filter(organization=self.org, status="Pending").get().leave_days, 0)
+        rebuild_balances(self.org)
+        self.assertEqual((self.balance().pending_days, self.balance().used_days), (0, 3))
+
+    def test_rebuild_bumps_versions_so_stale_writers_conflict(self):
+        self.apply(self.start, self.start + timedelta(days=2))
+        stale = self.balance()
+        stale.pending_days += 1
+        rebuild_balances(self.org)
+
+        self.assertEqual(self.balance().version, stale.version + 1)
+        if not connection.features.has_select_for_update:
+            with self.assertRaises(BalanceConflict):
+                write_balances([stale])
+        self.assertEqual((self.balance().pending_days, self.balance().used_days), (3, 0))
+
+    def test_ledger_rows_are_locked_by_exact_key(self):
+        other = LeavePolicy.objects.create(
+            organization=self.org, name="Casual", policy_type="CASUAL", max_days_per_year=5,
+        )
+        colleague = Employee.objects.create(
+            user=self.hr, organization=self.org, employee_code="E002",
+            department="People", designation="HR", date_of_joining=date(2020, 1, 1),
+        )
+        year = self.start.year
+        for employee in (self.employee, colleague):
+            for policy in (self.policy, other):
+                LeaveBalance.objects.create(employee=employee, policy=policy, year=year, entitled_days=5)
+
+        # Not the cross product of these employees, policies and years
+        keys = {(self.employee.id, self.policy.id, year), (colleague.id, other.id, year)}
+        self.assertEqual(set(lock_balances(keys, {self.policy.id: self.policy, other.id: other})), keys)
+
+    def test_apply_rejected_when_balance_exhausted(self):
+        leave_id = self.apply(self.start, self.start + timedelta(days=7)).data["id"]
+        self.review(leave_id, "approve")
+
+        response = self.apply(self.start + timedelta(days=20), self.start + timedelta(days=22))
+        self.assertEqual(response.status_code, 403)
+
+    def test_apply_counts_pending_days(self):
+        self.assertEqual(self.apply(self.start, self.start + timedelta(days=7)).status_code, 201)
+
+        response = self.apply(self.start + timedelta(days=20), self.start + timedelta(days=22))
+        self.assertEqual(response.status_code, 403)
+        self.assertIn("8 are pending review", response.data["detail"])
+        self.assertEqual((self.balance().pending_days, self.balance().used_days), (8, 0))
+
+    def test_stale_review_rejected(self):
+        leave_id = self.apply(self.start, self.start + timedelta(days=1)).data["id"]
+        response = self.review(leave_id, "approve", version=1)
+        self.assertEqual((response.status_code, response.data["version"]), (200, 2))
+
+        # A second reviewer still holding version 1
+        response = self.review(leave_id, "reject", version=1)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Leave.objects.get(pk=leave_id).status, "Approved")
+        self.assertEqual((self.balance().pending_days, self.balance().used_days), (0, 2))
+
+    def test_reapproval_checked_against_balance(self):
+        first = self.apply(self.start, self.start + timedelta(days=5)).data["id"]
+        self.review(first, "reject")
+        second = self.apply(self.start + timedelta(days=10), self.start + timedelta(days=15)).data["id"]
+        self.review(second, "approve")
+
+        response = self.review(first, "approve")
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Leave.objects.get(pk=first).status, "Rejected")
+        self.assertEqual((self.balance().pending_days, self.balance().used_days), (0, 6))
+
+    def test_delete_releases_days_or_answers_conflict(self):
+        leave_id = self.apply(self.start, self.start + timedelta(days=2)).data["id"]
+        self.client.force_authenticate(self.hr)
+
+        # A ledger row that keeps changing under the delete (retries run outside test transactions only)
+        with mock.patch("leave.balances.write_balances", side_effect=BalanceConflict("changed")):
+            self.assertEqual(self.client.delete(f"/leaves/{leave_id}/").status_code, 409)
+        self.assertTrue(Leave.objects.filter(pk=leave_id).exists())
+
+        self.assertEqual(self.client.delete(f"/leaves/{leave_id}/").status_code, 204)
+        self.assertFalse(Leave.objects.filter(pk=leave_id).exists())
+        self.assertEqual((self.balance().pending_days, self.balance().used_days), (0, 0))
+
+    def test_rebuild_reconciles_from_leaves(self):
+        leave_id = self.apply(self.start, self.start + timedelta(days=1)).data["id"]
+        self.review(leave_id, "approve")
+        LeaveBalance.objects.update(used_days=0, pending_days=7)
+
+        call_command("rebuild_leave_balances", stdout=StringIO())
+
+        self.assertEqual((self.balance().pending_days, self.balance().used_days), (0, 2))
+        self.assertEqual(Leave.objects.count(), 1)
+
+
+class LeaveQueryBudgetTests(LeaveTestMixin, APITestCase):
+    """Every leave endpoint must cost a constant number of queries, however many rows it returns."""
+
+    ROW_COUNTS = (10, 100, 1000)
+
+    def seed_leaves(self, total):
+        start = date(2024, 1, 1)
+        missing = total - Leave.objects.count()
+        Leave.objects.bulk_create([
+            Leave(
+                organization=self.org, employee=self.employee, user=self.user, policy=self.policy,
+                start_date=start, end_date=start, reason="Seed", status="Approved", reviewed_by=self.hr,
+            )
+            for _ in range(missing)
+        ])
+
+    def assertQueryBudget(self, viewer, url, budget):
+        self.client.force_authenticate(viewer)
+        for total in self.ROW_COUNTS:
+            self.seed_leaves(total)
+            with self.subTest(rows=total), self.assertNumQueries(budget):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_hr_leave_list(self):
+        self.assertQueryBudget(self.hr, "/leaves/", 1)
+
+    def test_employee_leave_history(self):
+        self.assertQueryBudget(self.user, "/leaves/me/", 1)
+
+    def test_leave_detail(self):
+        self.seed_leaves(1)
+        leave = Leave.objects.first()
+        self.assertQueryBudget(self.hr, f"/leaves/{leave.id}/", 1)
+
+
+class LeavePaginationTests(LeaveTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        start = date(2024, 1, 1)
+        Leave.objects.bulk_create([
+            Leave(
+                organization=self.org, employee=self.employee, user=self.user, policy=self.policy,
+                start_date=start, end_date=start, reason="Seed",
+            )
+            for _ in range(25)
+        ])
+        # Force ties on created_at so the id tie-breaker is exercised
+        Leave.objects.update(created_at=Leave.objects.first().created_at)
+        self.client.force_authenticate(self.hr)
+
+    def walk(self, url, link):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row["id"] for row in response.data["results"])
+            url = response.data[link]
+        return ids
+
+    def test_forward_pages_cover_every_row_once(self):
+        ids = self.walk("/leaves/?page_size=10", "next")
+        self.assertEqual(len(ids), 25)
+        self.assertEqual(len(set(ids)), 25)
+
+    def test_previous_link_returns_to_earlier_page(self):
+        first = self.client.get("/leaves/?page_size=10").data
+        second = self.client.get(first["next"]).data
+        back = self.client.get(second["previous"]).data
+        self.assertIsNone(first["previous"])
+        self.assertEqual([row["id"] for row in back["results"]], [row["id"] for row in first["results"]])
+
+    def test_invalid_cursor_is_404(self):
+        self.assertEqual(self.client.get("/leaves/?cursor=garbage").status_code, 404)
+
+
+class SparseFieldsetTests(LeaveTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.leave = Leave.objects.create(
+            organization=self.org, employee=self.employee, user=self.user, policy=self.policy,
+            start_date=date(2024, 1, 1), end_date=date(2024, 1, 2), reason="Trip", status="Approved",
+            reviewed_by=self.hr,
+        )
+        self.client.force_authenticate(self.hr)
+
+    def get_with_sql(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, " ".join(query["sql"] for query in queries.captured_queries)
+
+    def test_list_defaults_to_compact_serializer(self):
+        row = self.client.get("/leaves/").data["results"][0]
+        self.assertEqual(set(row), {
+            "id", "employee", "employee_name", "policy", "policy_name",
+            "start_date", "end_date", "status", "created_at",
+        })
+        self.assertEqual(row["policy_name"], "Annual")
+
+    def test_detail_keeps_full_serializer(self):
+        self.assertIn("reason", self.client.get(f"/leaves/{self.leave.id}/").data)
+
+    def test_fields_selects_columns_and_joins(self):
+        response, sql = self.get_with_sql("/leaves/?fields=id,status,reason")
+        self.assertEqual(set(response.data["results"][0]), {"id", "status", "reason"})
+        self.assertNotIn("JOIN", sql)
+        self.assertNotIn('"remarks"', sql)
+
+        response, sql = self.get_with_sql(f"/leaves/{self.leave.id}/?fields=id,employee_email")
+        self.assertEqual(response.data, {"id": str(self.leave.id), "employee_email": "emp@acme.com"})
+        self.assertNotIn('"reason"', sql)
+        self.assertNotIn('"policy"', sql.replace('"policy_id"', ""))
+
+    def test_exclude_drops_fields(self):
+        response, sql = self.get_with_sql("/leaves/?exclude=employee_name,policy_name")
+        self.assertNotIn("employee_name", response.data["results"][0])
+        self.assertNotIn("JOIN", sql)
+
+    def test_unknown_field_is_400(self):
+        response = self.client.get("/leaves/?fields=id,salary")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("salary", str(response.data["fields"]))
+
+    def test_fields_keep_pagination_working(self):
+        Leave.objects.bulk_create([
+            Leave(organization=self.org, employee=self.employee, user=self.user, policy=self.policy,
+                  start_date=date(2024, 2, 1), end_date=date(2024, 2, 1), reason="Seed")
+            for _ in range(4)
+        ])
+        first = self.client.get("/leaves/?fields=id&page_size=3").data
+        second = self.client.get(first["next"]).data
+        ids = [row["id"] for row in first["results"] + second["results"]]
+        self.assertEqual(len(set(ids)), 5)
+
+    def test_writes_ignore_fields(self):
+        leave = Leave.objects.create(
+            organization=self.org, employee=self.employee, user=self.user, policy=self.policy,
+            start_date=date(2024, 3, 1), end_date=date(2024, 3, 1), reason="Trip",
+        )
+        response = self.client.put(f"/leaves/{leave.id}/?fields=id", {"action": "reject"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], "Rejected")
+        self.assertIn("reason", response.data)
+
+
+class LeaveQueryPlanTests(QueryPlanMixin, LeaveTestMixin, APITestCase):
+    """The queries behind each leave endpoint must be served from an index."""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_user(
+            email="root@acme.com", username="root", password="pass", role="SUPERADMIN"
+        )
+        start = date(2024, 1, 1)
+        Leave.objects.bulk_create([
+            Leave(
+                organization=self.org, employee=self.employee, user=self.user, policy=self.policy,
+                start_date=start + timedelta(days=i), end_date=start + timedelta(days=i), reason="Seed",
+                status=("Pending", "Approved", "Rejected")[i % 3],
+            )
+            for i in range(300)
+        ])
+
+    def test_hr_leave_list(self):
+        self.client.force_authenticate(self.hr)
+        self.assertNoFullTableScan("/leaves/")
+        next_page = self.client.get("/leaves/?page_size=20").data["next"]
+        self.assertNoFullTableScan(next_page)
+
+    def test_superadmin_leave_list(self):
+        self.client.force_authenticate(self.admin)
+        self.assertNoFullTableScan("/leaves/")
+
+    def test_employee_leave_history(self):
+        self.client.force_authenticate(self.user)
+        self.assertNoFullTableScan("/leaves/me/")
+
+    def test_leave_detail(self):
+        self.client.force_authenticate(self.hr)
+        self.assertNoFullTableScan(f"/leaves/{Leave.objects.first().id}/")
+
+
+@quiet_slow_requests
+class LeaveBulkReviewTests(LeaveTestMixin, APITestCase):
+    def seed_pending(self, total, organization=None, employee=None):
+        start = date(2025, 3, 3)
+        return Leave.objects.bulk_create([
+            Leave(
+                organization=organization or self.org, employee=employee or self.employee,
+                user=(employee or self.employee).user, policy=self.policy,
+                start_date=start, end_date=start + timedelta(days=1), reason="Seed",
+            )
+            for _ in range(total)
+        ])
+
+    def bulk_review(self, items):
+        self.client.force_authenticate(self.hr)
+        return self.client.post("/leaves/bulk-review/", {"items": items}, format="json")
+
+    def test_mixed_batch_reports_per_item_results(self):
+        approve, reject = self.seed_pending(2)
+        other_org = Organization.objects.create(name="Other", code="OTHER")
+        other_user = User.objects.create_user(
+            email="x@other.com", username="x", password="pass", organization=other_org
+        )
+        other_employee = Employee.objects.create(
+            user=other_user, organization=other_org, employee_code="X001",
+            department="Ops", designation="Analyst", date_of_joining=date(2020, 1, 1),
+        )
+        (foreign,) = self.seed_pending(1, organization=other_org, employee=other_employee)
+
+        response = self.bulk_review([
+            {"id": str(approve.id), "action": "approve", "remarks": "Enjoy"},
+            {"id": str(reject.id), "action": "reject"},
+            {"id": str(foreign.id), "action": "approve"},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["updated"], response.data["failed"]), (2, 1))
+        self.assertEqual([r["success"] for r in response.data["results"]], [True, True, False])
+        approve.refresh_from_db()
+        foreign.refresh_from_db()
+        self.assertEqual((approve.status, approve.remarks, approve.reviewed_by), ("Approved", "Enjoy", self.hr))
+        self.assertEqual(foreign.status, "Pending")
+
+        balance = LeaveBalance.objects.get(employee=self.employee, policy=self.policy, year=2025)
+        self.assertEqual(balance.used_days, 2)
+
+    def test_stale_items_fail_alone(self):
+        current, stale = self.seed_pending(2)
+        Leave.objects.filter(pk=stale.pk).update(version=3)
+
+        response = self.bulk_review([
+            {"id": str(current.id), "action": "approve", "version": 1},
+            {"id": str(stale.id), "action": "approve", "version": 2},
+        ])
+
+        self.assertEqual((response.data["updated"], response.data["failed"]), (1, 1))
+        self.assertEqual(response.data["results"][0]["version"], 2)
+        self.assertIn("stale version", response.data["results"][1]["detail"])
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.version), ("Pending", 3))
+
+    def test_large_batch_is_written_in_bulk(self):
+        leaves = self.seed_pending(1000)
+        items = [{"id": str(leave.id), "action": "cancel"} for leave in leaves]
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = self.bulk_review(items)
+            elapsed = time.perf_counter() - started
+        self.assertEqual(response.data["updated"], 1000)
+        # One outbox row per leave, in one bulk_create (as many INSERTs as the database's parameter limit needs)
+        outbox = [q for q in captured if q["sql"].startswith('INSERT INTO "notification_outbox"')]
+        fields = [field for field in OutboxEvent._meta.concrete_fields if not field.primary_key]
+        self.assertEqual(len(outbox), math.ceil(1000 / min(1000, connection.ops.bulk_batch_size(fields, leaves))))
+        # Besides: one scoped read, batched UPDATEs, and a handful of ledger, calendar and rollup queries
+        self.assertLess(len(captured) - len(outbox), 25)
+        # Same status and remarks: one plain UPDATE per 500 rows, no per-row CASE expressions
+        updates = [q["sql"] for q in captured if q["sql"].startswith('UPDATE "leave" ')]
+        self.assertEqual(len(updates), 2)
+        self.assertFalse(any("CASE" in sql for sql in updates))
+        # Well under a second on SQLite; the bound leaves room for slow CI machines
+        self.assertLess(elapsed, 1.0)
+        self.assertFalse(Leave.objects.exclude(status="Cancelled").exists())
+
+    def test_employee_cannot_bulk_review(self):
+        (leave,) = self.seed_pending(1)
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            "/leaves/bulk-review/", {"items": [{"id": str(leave.id), "action": "approve"}]}, format="json"
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class LeaveExportTests(LeaveTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        start = date(2025, 6, 2)
+        self.leaves = Leave.objects.bulk_create([
+            Leave(
+                organization=self.org, employee=self.employee, user=self.user, policy=self.policy,
+                start_date=start + timedelta(days=7 * i), end_date=start + timedelta(days=7 * i + 1),
+                reason="Seed", status=status,
+            )
+            for i, status in enumerate(["Approved", "Approved", "Pending"])
+        ])
+        self.client.force_authenticate(self.hr)
+
+    def read(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_export_with_filters(self):
+        body = self.read("/leaves/export/?status=Approved&from=2025-06-01&to=2025-06-08")
+        lines = body.strip().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["id", "organization", "employee_code"])
+        self.assertEqual(len(lines), 2)
+        self.assertIn("E001,emp@acme.com,Engineering,Annual,ANNUAL,2025-06-02,2025-06-03,Approved", lines[1])
+        self.assertTrue(lines[1].endswith(",2"))
+
+    def test_ndjson_export(self):
+        body = self.read(f"/leaves/export/?output=ndjson&policy={self.policy.id}")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row["status"] for row in rows}, {"Approved", "Pending"})
+
+    def test_employee_cannot_export(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get("/leaves/export/").status_code, 403)
+
+
+class LeaveCalendarTests(LeaveTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_authenticate(self.hr)
+
+    def add_leave(self, start, end, status="Approved"):
+        return Leave.objects.create(
+            organization=self.org, employee=self.employee, user=self.user, policy=self.policy,
+            start_date=start, end_date=end, reason="Trip", status=status,
+        )
+
+    def test_sweep_clamps_leaves_to_window(self):
+        leaves = [
+            {"start_date": date(2025, 5, 30), "end_date": date(2025, 6, 2), "status": "Approved"},
+            {"start_date": date(2025, 6, 2), "end_date": date(2025, 6, 3), "status": "Pending"},
+            {"start_date": date(2025, 7, 1), "end_date": date(2025, 7, 3), "status": "Approved"},
+        ]
+        days = build_day_occupancy(date(2025, 6, 1), date(2025, 6, 30), leaves)
+        self.assertEqual(len(days), 30)
+        self.assertEqual([day["on_leave"] for day in days[:4]], [1, 2, 1, 0])
+        self.assertEqual((days[1]["approved"], days[1]["pending"]), (1, 1))
+
+    def test_calendar_is_cached_and_invalidated_on_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            leave = self.add_leave(date(2025, 6, 9), date(2025, 6, 10), status="Pending")
+
+        days = self.client.get("/leaves/calendar/?month=2025-06&department=Engineering").data["days"]
+        self.assertEqual((days[8]["on_leave"], days[8]["pending"]), (1, 1))
+        self.assertEqual(days[8]["members"][0]["employee_name"], "emp")
+
+        # Served from the cache: only the month's version is read from the database
+        with self.assertNumQueries(1):
+            self.client.get("/leaves/calendar/?month=2025-06&department=Engineering")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.review(leave.id, "reject")
+        days = self.client.get("/leaves/calendar/?month=2025-06&department=Engineering").data["days"]
+        self.assertEqual(days[8]["on_leave"], 0)
+
+    def test_bump_from_another_process_is_seen(self):
+        self.client.get("/leaves/calendar/?month=2025-06")
+        # Another worker's bump: its cache is not ours, only the database version is shared
+        self.add_leave(date(2025, 6, 9), date(2025, 6, 9))
+        self.assertEqual(LeaveCalendarVersion.objects.get(organization=self.org, month=date(2025, 6, 1)).version, 1)
+
+        days = self.client.get("/leaves/calendar/?month=2025-06").data["days"]
+        self.assertEqual(days[8]["on_leave"], 1)
+
+    def test_department_filter(self):
+        self.add_leave(date(2025, 6, 9), date(2025, 6, 9))
+        days = self.client.get("/leaves/calendar/?month=2025-06&department=Sales").data["days"]
+        self.assertEqual(sum(day["on_leave"] for day in days), 0)
+
+    def test_bad_month(self):
+        self.assertEqual(self.client.get("/leaves/calendar/?month=June").status_code, 400)
+
+
+class LeaveOverlapTests(LeaveTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.start = date.today() + timedelta(days=10)
+
+    def add_leave(self, offset, length, status="Pending"):
+        start = self.start + timedelta(days=offset)
+        return Leave.objects.create(
+            organization=self.org, employee=self.employee, user=self.user, policy=self.policy,
+            start_date=start, end_date=start + timedelta(days=length - 1), reason="Trip", status=status,
+        )
+
+    def test_apply_rejects_overlap_with_pending_leave(self):
+        self.add_leave(0, 3)
+        response = self.apply(self.start + timedelta(days=2), self.start + timedelta(days=4))
+        self.assertEqual(response.status_code, 403)
+        self.assertIn("overlaps", str(response.data["detail"]))
+
+        # Adjacent ranges do not overlap
+        response = self.apply(self.start + timedelta(days=3), self.start + timedelta(days=4))
+        self.assertEqual(response.status_code, 201)
+
+    def test_overlap_probe_runs_with_the_employee_locked(self):
+        # Applications under different policies lock different ledger rows: the employee row orders them
+        calls = []
+        with (
+            mock.patch("leave.views.lock_employees", side_effect=lambda ids: calls.append(("lock", list(ids)))),
+            mock.patch("leave.views.find_overlapping_leave", side_effect=lambda *a, **k: calls.append(("probe",))),
+        ):
+            self.assertEqual(self.apply(self.start, self.start).status_code, 201)
+        self.assertEqual(calls, [("lock", [self.employee.id]), ("probe",)])
+
+    def test_apply_ignores_rejected_leaves(self):
+        self.add_leave(0, 3, status="Rejected")
+        self.assertEqual(self.apply(self.start, self.start).status_code, 201)
+
+    def test_approve_rejects_overlap_with_approved_leave(self):
+        self.add_leave(0, 3, status="Approved")
+        clashing = self.add_leave(1, 1)
+        self.assertEqual(self.review(clashing.id, "approve").status_code, 400)
+        self.assertEqual(self.review(clashing.id, "reject").status_code, 200)
+
+    def test_bulk_approve_checks_overlaps_within_batch(self):
+        first, second = self.add_leave(0, 3), self.add_leave(2, 2)
+        self.client.force_authenticate(self.hr)
+        response = self.client.post("/leaves/bulk-review/", {"items": [
+            {"id": str(first.id), "action": "approve"},
+            {"id": str(second.id), "action": "approve"},
+        ]}, format="json")
+        self.assertEqual([r["success"] for r in response.data["results"]], [True, False])
+
+    def test_conflicts_report(self):
+        a, b, c = self.add_leave(0, 5), self.add_leave(1, 1, "Approved"), self.add_leave(3, 1)
+        self.add_leave(10, 1)
+        self.client.force_authenticate(self.hr)
+        response = self.client.get("/leaves/conflicts/")
+        self.assertEqual(response.data["count"], 2)
+        pairs = {frozenset((p["first"]["id"], p["second"]["id"])) for p in response.data["conflicts"]}
+        self.assertEqual(pairs, {frozenset((a.id, b.id)), frozenset((a.id, c.id))})
+
+    def test_sweep_matches_pairwise_comparison(self):
+        rng = random.Random(7)
+        rows = []
+        for employee_id in range(5):
+            for _ in range(40):
+                start = date(2025, 1, 1) + timedelta(days=rng.randrange(200))
+                rows.append({
+                    "employee_id": employee_id, "start_date": start,
+                    "end_date": start + timedelta(days=rng.randrange(6)),
+                })
+        rows.sort(key=lambda row: (row["employee_id"], row["start_date"]))
+        expected = {
+            (i, j)
+            for i, a in enumerate(rows) for j, b in enumerate(rows)
+            if i < j and a["employee_id"] == b["employee_id"]
+            and a["start_date"] <= b["end_date"] and b["start_date"] <= a["end_date"]
+        }
+        index = {id(row): i for i, row in enumerate(rows)}
+        found = {tuple(sorted((index[id(a)], index[id(b)]))) for a, b in find_overlapping_pairs(rows)}
+        self.assertEqual(found, expected)
+
+
+class YearEndCloseTests(LeaveTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.year = date.today().year - 1
+        LeavePolicy.objects.filter(pk=self.policy.pk).update(carry_forward_days=3, encashment_limit=2)
+        # E001 used 4 of 10 days; E002 never took leave (no ledger row)
+        LeaveBalance.objects.create(
+            employee=self.employee, policy=self.policy, year=self.year, entitled_days=10, used_days=4
+        )
+        other = User.objects.create_user(
+            email="other@acme.com", username="other", password="pass", organization=self.org
+        )
+        self.other = Employee.objects.create(
+            user=other, organization=self.org, employee_code="E002",
+            department="Sales", designation="Rep", date_of_joining=date(2020, 1, 1),
+        )
+
+    def ledger(self, employee, year):
+        balance = LeaveBalance.objects.get(employee=employee, policy=self.policy, year=year)
+        return balance.carried_forward_days, balance.encashed_days
+
+    def assertClosed(self):
+        # Closing 6 → 3 carried, 2 encashed, 1 lapsed; closing 10 → 3, 2, 5
+        self.assertEqual(self.ledger(self.employee, self.year), (0, 2))
+        self.assertEqual(self.ledger(self.employee, self.year + 1), (3, 0))
+        self.assertEqual(self.ledger(self.other, self.year + 1), (3, 0))
+        run = YearEndRun.objects.get(organization=self.org, year=self.year)
+        self.assertEqual(run.status, "Completed")
+        self.assertEqual(run.employees_processed, 2)
+        self.assertEqual((run.carried_forward_days, run.encashed_days, run.lapsed_days), (6, 4, 6))
+
+    def test_close_is_idempotent(self):
+        YearEndClose(self.org, self.year).run()
+        self.assertClosed()
+        YearEndClose(self.org, self.year).run(restart=True)
+        self.assertClosed()
+        self.assertEqual(LeaveClosing.objects.count(), 2)
+
+    def test_failed_close_resumes_from_checkpoint(self):
+        real_close_chunk = year_end.close_chunk
+        calls = []
+
+        def crash_on_second_chunk(*args):
+            calls.append(args[2])
+            if len(calls) == 2:
+                raise RuntimeError("worker died")
+            return real_close_chunk(*args)
+
+        with mock.patch.object(year_end, "close_chunk", crash_on_second_chunk):
+            with self.assertRaises(RuntimeError):
+                YearEndClose(self.org, self.year, chunk_size=1).run()
+        run = YearEndRun.objects.get(organization=self.org, year=self.year)
+        self.assertEqual((run.status, run.employees_processed), ("Failed", 1))
+
+        with mock.patch.object(year_end, "close_chunk", crash_on_second_chunk):
+            YearEndClose(self.org, self.year, chunk_size=1).run()
+        # The first chunk is not redone
+        self.assertEqual(calls[2], calls[1])
+        self.assertEqual(len(calls), 3)
+        self.assertClosed()
+
+    def test_api_and_command(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.post("/leaves/year-end/", {"year": self.year}).status_code, 403)
+
+        self.client.force_authenticate(self.hr)
+        response = self.client.post("/leaves/year-end/", {"year": self.year})
+        self.assertEqual(response.status_code, 200)
+        self.assertClosed()
+        self.assertEqual(self.client.get(f"/leaves/year-end/?year={self.year}").data["status"], "Completed")
+        self.assertEqual(self.client.post("/leaves/year-end/", {"year": self.year + 2}).status_code, 400)
+        # The current year is still open for bookings
+        response = self.client.post("/leaves/year-end/", {"year": self.year + 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(YearEndRun.objects.filter(year=self.year + 1).exists())
+
+        out = StringIO()
+        call_command("close_leave_year", organization="ACME", year=self.year, restart=True, stdout=out)
+        self.assertIn("2 employees", out.getvalue())
+        self.assertClosed()
+
+
+class LeaveWorkingDayTests(LeaveTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        Organization.objects.filter(pk=self.org.pk).update(working_week="1111100")
+        # A Monday-to-Sunday week, a month out, with a holiday on Wednesday
+        self.monday = date.today() + timedelta(days=35 - date.today().weekday())
+        Holiday.objects.create(organization=self.org, date=self.monday + timedelta(days=2), name="Founders Day")
+
+    def test_weekends_and_holidays_do_not_use_entitlement(self):
+        response = self.apply(self.monday, self.monday + timedelta(days=6))
+        self.assertEqual(response.status_code, 201)
+        balance = LeaveBalance.objects.get(employee=self.employee, policy=self.policy, year=self.monday.year)
+        self.assertEqual(balance.pending_days, 4)
+
+        self.review(response.data["id"], "approve")
+        balance.refresh_from_db()
+        self.assertEqual((balance.pending_days, balance.used_days), (0, 4))
+
+        rows = self.client.get("/leaves/export/?output=ndjson").streaming_content
+        self.assertEqual(json.loads(b"".join(rows).splitlines()[0])["days"], 4)
+
+    def test_weekend_only_request_rejected(self):
+        saturday = self.monday + timedelta(days=5)
+        self.assertEqual(self.apply(saturday, saturday + timedelta(days=1)).status_code, 403)
+
+
+class ReplicaRoutingTests(LeaveTestMixin, APITransactionTestCase):
+    """Safe leave requests read from the replica alias (a mirror of the test database here)."""
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.start = date.today() + timedelta(days=10)
+
+    def run_on(self, alias, request):
+        with CaptureQueriesContext(connections[alias]) as captured:
+            response = request()
+        return response, [query["sql"] for query in captured.captured_queries]
+
+    def test_safe_requests_read_from_replica(self):
+        self.client.force_authenticate(self.user)
+        response, replica_queries = self.run_on("replica", lambda: self.client.get("/leaves/me/"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(replica_queries), 1)
+        self.assertIn('FROM "leave"', replica_queries[0])
+
+        _, replica_queries = self.run_on("replica", lambda: self.client.get(f"/policies/{self.policy.id}/"))
+        self.assertEqual(len(replica_queries), 1)
+
+    def test_writes_and_their_checks_stay_on_primary(self):
+        response, replica_queries = self.run_on(
+            "replica", lambda: self.apply(self.start, self.start + timedelta(days=1))
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(replica_queries, [])
+
+    def test_read_your_writes(self):
+        leave_id = self.apply(self.start, self.start + timedelta(days=1)).data["id"]
+
+        # The employee just wrote: their reads stay on the primary for a while
+        response, replica_queries = self.run_on("replica", lambda: self.client.get("/leaves/me/"))
+        self.assertEqual(replica_queries, [])
+        self.assertEqual(response.data["results"][0]["id"], leave_id)
+
+        # Other users are not pinned
+        self.client.force_authenticate(self.hr)
+        _, replica_queries = self.run_on("replica", lambda: self.client.get("/leaves/"))
+        self.assertEqual(len(replica_queries), 1)
+
+        cache.delete(pin_key(self.user.pk))
+        self.client.force_authenticate(self.user)
+        _, replica_queries = self.run_on("replica", lambda: self.client.get("/leaves/me/"))
+        self.assertEqual(len(replica_queries), 1)
+
+    def test_other_apps_and_authentication_use_primary(self):
+        self.client.force_authenticate(self.hr)
+        _, replica_queries = self.run_on("replica", lambda: self.client.get("/analytics/leaves/"))
+        self.assertEqual(replica_queries, [])
+
+        self.client.force_authenticate(None)
+        token = HRMSRefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        # The token's user is loaded from the primary, the leaves from the replica
+        _, primary_queries = self.run_on("default", lambda: self.client.get("/leaves/me/"))
+        self.assertEqual(len(primary_queries), 1)
+        self.assertIn('FROM "auth_app_user"', primary_queries[0])
+
+    def test_replica_is_never_migrated(self):
+        self.assertFalse(router.allow_migrate("replica", "leave", model_name="leave"))
+        self.assertIsNot(router.allow_migrate("default", "leave", model_name="leave"), False)
+
+
+# The benchmark logs in and registers users many times; skip the slow production hasher
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class SeedAndBenchmarkTests(APITestCase):
+    def test_seed_is_consistent(self):
+        call_command("seed_hrms", organizations=2, employees=6, leaves=8, stdout=StringIO())
+
+        self.assertEqual(Organization.objects.filter(code__startswith="SEED").count(), 2)
+        self.assertEqual(Employee.objects.count(), 12)
+        self.assertEqual(
+            set(LeavePolicy.objects.values_list("policy_type", flat=True)),
+            {policy_type for policy_type, _ in LeavePolicy.POLICY_TYPES},
+        )
+        self.assertEqual(set(Leave.objects.values_list("status", flat=True)), {s for s, _ in Leave.STATUS_CHOICES})
+        for employee in Employee.objects.all():
+            leaves = list(employee.leaves.order_by("start_date"))
+            self.assertTrue(all(a.end_date < b.start_date for a, b in zip(leaves, leaves[1:])))
+
+        # Bulk writes skip the signals, so the derived tables were rebuilt
+        pending = Leave.objects.filter(status="Pending").count()
+        self.assertEqual(LeaveRollup.objects.filter(status="Pending").aggregate(n=Sum("leave_count"))["n"], pending)
+        self.assertTrue(LeaveBalance.objects.exists())
+        policy = LeavePolicy.objects.first()
+        self.assertEqual(policy.history.count(), 3)
+        self.assertEqual(policy_as_of(policy.pk, timezone.now())["state"]["max_days_per_year"], policy.max_days_per_year)
+
+        with self.assertRaises(CommandError):
+            call_command("seed_hrms", employees=1, stdout=StringIO())
+
+    def test_benchmark_replays_collection_without_changes(self):
+        call_command("seed_hrms", employees=4, leaves=8, stdout=StringIO())
+        leaves = Leave.objects.count()
+
+        out = StringIO()
+        call_command("benchmark_api", organization="SEED001", iterations=2, warmup=0, stdout=out)
+        report = json.loads(out.getvalue())
+
+        endpoints = report["endpoints"]
+        self.assertEqual(len(endpoints), 26)
+        self.assertEqual([e for e in endpoints if e["errors"]], [])
+        me = next(e for e in endpoints if e["path"] == "/leaves/me/")
+        self.assertEqual((me["statuses"], me["queries"]), ({"200": 2}, 2))
+        self.assertTrue({"p50_ms", "p95_ms", "p99_ms", "peak_memory_kb"} <= set(me))
+        self.assertEqual(Leave.objects.count(), leaves)
+        self.assertTrue(Organization.objects.filter(code="SEED001").exists())
+
+
+class RequestMetricsTests(LeaveTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.registry.clear()
+
+    def sample(self, text, series):
+        line = next(line for line in text.splitlines() if line.startswith(series + " "))
+        return float(line.rsplit(" ", 1)[1])
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_records_labeled_histograms(self):
+        self.apply(date.today() + timedelta(days=10), date.today() + timedelta(days=11))
+        self.client.force_authenticate(self.hr)
+        for _ in range(3):
+            response = self.client.get("/leaves/")
+
+        self.client.force_authenticate(None)
+        text = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret").content.decode()
+        labels = '{route="leave-list-create",method="GET",role="HR"}'
+        self.assertEqual(self.sample(text, f"hrms_request_duration_seconds_count{labels}"), 3)
+        # One query per list request (the user comes from force_authenticate)
+        self.assertEqual(self.sample(text, f"hrms_db_queries_sum{labels}"), 3)
+        self.assertGreater(self.sample(text, f"hrms_db_duration_seconds_sum{labels}"), 0)
+        self.assertGreater(self.sample(text, f"hrms_serializer_duration_seconds_sum{labels}"), 0)
+        self.assertEqual(self.sample(text, f"hrms_response_size_bytes_sum{labels}"), 3 * len(response.content))
+        self.assertEqual(self.sample(text, f'hrms_db_queries_bucket{labels[:-1]},le="+Inf"}}'), 3)
+        self.assertIn('route="leave-list-create",method="POST",role="EMPLOYEE"', text)
+        # The scrape endpoint itself is not recorded
+        self.assertNotIn('route="metrics"', text)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_requests_log_their_sql(self):
+        self.client.force_authenticate(self.user)
+        with self.assertLogs("hrms.slow_requests", "WARNING") as logs:
+            self.client.get("/leaves/me/")
+        self.assertIn("Slow request GET /leaves/me/ (leave-me, EMPLOYEE)", logs.output[0])
+        self.assertIn('FROM "leave"', logs.output[0])
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+
+    def test_metrics_need_a_token_outside_debug(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+
+class LeaveAttachmentTests(LeaveTestMixin, APITestCase):
+    PDF = b"%PDF-1.4\n" + bytes(range(256)) * 8
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.start = date.today() + timedelta(days=10)
+
+    def apply_with(self, content, offset=0, name="certificate.pdf"):
+        start = self.start + timedelta(days=offset)
+        return self.apply(start, start, attachment=SimpleUploadedFile(name, content, "application/pdf"))
+
+    def stored_files(self):
+        return [name for _, _, names in os.walk(self.media_root) for name in names]
+
+    def test_identical_uploads_are_stored_once(self):
+        first = self.apply_with(self.PDF)
+        second = self.apply_with(self.PDF, offset=2, name="copy.pdf")
+        self.assertEqual((first.status_code, second.status_code), (201, 201))
+
+        digest = hashlib.sha256(self.PDF).hexdigest()
+        blob = AttachmentBlob.objects.get()
+        self.assertEqual((blob.sha256, blob.size, blob.content_type, blob.ref_count),
+                         (digest, len(self.PDF), "application/pdf", 2))
+        self.assertEqual(self.stored_files(), [f"{digest}.pdf"])
+        self.assertEqual(Leave.objects.get(pk=first.data["id"]).attachment.name, f"leave_attachments/{digest[:2]}/{digest}.pdf")
+
+        self.client.force_authenticate(self.hr)
+        self.client.delete(f"/leaves/{first.data['id']}/")
+        self.assertEqual(AttachmentBlob.objects.get().ref_count, 1)
+
+    @override_settings(LEAVE_ATTACHMENT_MAX_BYTES=1024)
+    def test_limits_are_enforced_while_reading(self):
+        # Within the multipart allowance: refused once the running size passes the limit
+        self.assertEqual(self.apply_with(self.PDF).status_code, 413)
+        # Refused from Content-Length, before the body is read
+        with mock.patch("leave.attachments.AttachmentUploadHandler.receive_data_chunk") as receive:
+            self.assertEqual(self.apply_with(self.PDF * 40).status_code, 413)
+        receive.assert_not_called()
+        # The type comes from the bytes, not the name or the declared type
+        response = self.apply_with(b"MZ\x90\x00 not a certificate")
+        self.assertEqual(response.status_code, 415)
+
+        self.assertFalse(Leave.objects.exists())
+        self.assertFalse(AttachmentBlob.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    def test_download_supports_ranges(self):
+        leave_id = self.apply_with(self.PDF).data["id"]
+        url = f"/leaves/{leave_id}/attachment/"
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.PDF)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertIn(f'filename="leave-{leave_id}.pdf"', response["Content-Disposition"])
+
+        response = self.client.get(url, HTTP_RANGE="bytes=2-9")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), self.PDF[2:10])
+        self.assertEqual(response["Content-Range"], f"bytes 2-9/{len(self.PDF)}")
+        self.assertEqual(response["Content-Length"], "8")
+
+        response = self.client.get(url, HTTP_RANGE="bytes=-5")
+        self.assertEqual(b"".join(response.streaming_content), self.PDF[-5:])
+        response = self.client.get(url, HTTP_RANGE=f"bytes={len(self.PDF)}-")
+        self.assertEqual((response.status_code, response["Content-Range"]), (416, f"bytes */{len(self.PDF)}"))
+        # A partial copy of other content gets the whole file
+        response = self.client.get(url, HTTP_RANGE="bytes=2-9", HTTP_IF_RANGE='"other"')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.force_authenticate(self.hr)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        other = User.objects.create_user(email="other@acme.com", username="other", password="pass", organization=self.org)
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    @override_settings(LEAVE_ATTACHMENT_SENDFILE_HEADER="X-Accel-Redirect")
+    def test_sendfile_hands_the_file_to_the_web_server(self):
+        leave_id = self.apply_with(self.PDF).data["id"]
+        response = self.client.get(f"/leaves/{leave_id}/attachment/")
+        name = Leave.objects.get(pk=leave_id).attachment.name
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected/{name}")
+        self.assertEqual(response.content, b"")
+
+    def test_gc_deletes_unreferenced_blobs(self):
+        kept = self.apply_with(self.PDF).data["id"]
+        dropped = self.apply_with(self.PDF + b"\n%%EOF", offset=2).data["id"]
+        self.client.force_authenticate(self.hr)
+        self.client.delete(f"/leaves/{dropped}/")
+
+        # Within the grace period nothing goes
+        call_command("gc_leave_attachments", stdout=StringIO())
+        self.assertEqual(AttachmentBlob.objects.count(), 2)
+
+        out = StringIO()
+        call_command("gc_leave_attachments", grace_seconds=0, stdout=out)
+        self.assertIn("Deleted 1 unreferenced attachments", out.getvalue())
+        blob = AttachmentBlob.objects.get()
+        self.assertEqual(blob.name, Leave.objects.get(pk=kept).attachment.name)
+        self.assertEqual(self.stored_files(), [posixpath.basename(blob.name)])
+
+        # --recount repairs drifted counts before collecting
+        AttachmentBlob.objects.update(ref_count=0)
+        call_command("gc_leave_attachments", grace_seconds=0, recount=True, stdout=StringIO())
+        self.assertEqual(AttachmentBlob.objects.get().ref_count, 1)
+
+
+class LeaveInboxTests(QueryPlanMixin, LeaveTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.start = date.today() + timedelta(days=10)
+        sales = User.objects.create_user(email="sales@acme.com", username="sales", password="pass", organization=self.org)
+        self.sales = Employee.objects.create(
+            user=sales, organization=self.org, employee_code="E002",
+            department="Sales", designation="Account Manager", date_of_joining=date(2021, 1, 1),
+        )
+
+    def apply_many(self, count, user=None):
+        ids = []
+        for offset in range(count):
+            start = self.start + timedelta(days=3 * offset)
+            self.client.force_authenticate(user or self.user)
+            response = self.client.post("/leaves/", {
+                "policy": str(self.policy.id), "start_date": start, "end_date": start, "reason": "Trip",
+            })
+            ids.append(response.data["id"])
+        return ids
+
+    def counts(self):
+        return dict(PendingCount.objects.filter(pending__gt=0).values_list("department", "pending"))
+
+    def test_queue_and_counters_follow_status_changes(self):
+        ids = self.apply_many(4)
+        self.apply_many(1, user=self.sales.user)
+        self.assertEqual(self.counts(), {"": 5, "Engineering": 4, "Sales": 1})
+
+        self.review(ids[0], "approve")
+        self.client.post("/leaves/bulk-review/", {"items": [
+            {"id": ids[1], "action": "reject"}, {"id": ids[2], "action": "cancel"},
+        ]}, format="json")
+        self.client.delete(f"/leaves/{ids[3]}/")
+        self.assertEqual(self.counts(), {"": 1, "Sales": 1})
+        self.assertEqual(
+            list(PendingLeave.objects.values_list("leave_id", flat=True)),
+            list(Leave.objects.filter(status="Pending").values_list("pk", flat=True)),
+        )
+
+        PendingCount.objects.update(pending=7)
+        call_command("rebuild_leave_inbox", stdout=StringIO())
+        self.assertEqual(self.counts(), {"": 1, "Sales": 1})
+
+    def test_transfer_keeps_pending_leaves_under_the_applied_department(self):
+        ids = self.apply_many(2)
+        self.employee.department = "Sales"
+        self.employee.save()
+        self.assertEqual(self.counts(), {"": 2, "Engineering": 2})
+
+        # The rebuild agrees with the live counters, and the next status change leaves no residue
+        call_command("rebuild_leave_inbox", stdout=StringIO())
+        self.assertEqual(self.counts(), {"": 2, "Engineering": 2})
+        self.assertEqual(set(PendingLeave.objects.values_list("department", flat=True)), {"Engineering"})
+        self.review(ids[0], "approve")
+        self.assertEqual(self.counts(), {"": 1, "Engineering": 1})
+
+    def test_badge_count_is_a_single_row_read(self):
+        self.apply_many(2)
+        self.apply_many(1, user=self.sales.user)
+        self.client.force_authenticate(self.hr)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/leaves/inbox/count/").data, {"pending": 3})
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/leaves/inbox/count/?department=Sales").data, {"pending": 1})
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get("/leaves/inbox/count/").status_code, 403)
+
+    def test_inbox_pages_oldest_first(self):
+        ids = self.apply_many(5)
+        self.client.force_authenticate(self.hr)
+        seen = []
+        url = "/leaves/inbox/?page_size=2"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.data["pending"], 5)
+            seen += [row["id"] for row in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(seen, ids)
+        self.assertEqual(set(response.data["results"][0]), {
+            "id", "employee", "employee_name", "policy", "policy_name", "start_date", "end_date", "status", "created_at",
+        })
+        self.assertNoFullTableScan("/leaves/inbox/?department=Engineering&older_than_days=1")
+
+    def test_aging_report(self):
+        ids = self.apply_many(4)
+        now = timezone.now()
+        for leave_id, age in zip(ids, (10, 5, 2)):
+            PendingLeave.objects.filter(leave_id=leave_id).update(created_at=now - timedelta(days=age))
+
+        self.client.force_authenticate(self.hr)
+        report = self.client.get("/leaves/inbox/aging/?days=4").data
+        self.assertEqual((report["pending"], report["threshold_days"], report["overdue"]), (4, 4, 2))
+        self.assertEqual(report["older_than_days"], {1: 3, 3: 2, 4: 2, 7: 1, 14: 0})
+        self.assertEqual(report["oldest_age_days"], 10)
+
+        overdue = self.client.get("/leaves/inbox/?older_than_days=4").data["results"]
+        self.assertEqual([row["id"] for row in overdue], ids[:2])
+        self.assertEqual(self.client.get("/leaves/inbox/aging/?days=soon").status_code, 400)
+        self.assertNoFullTableScan("/leaves/inbox/aging/")
+
+
+@quiet_slow_requests
+class LeaveBalanceConcurrencyTests(APITransactionTestCase):
+    # Committed rows: the writers are threads with their own connections,
+    # and their safe requests may be routed to the (mirrored) replica alias
+    databases = {"default", "replica"}
+
+    def test_concurrent_writers_never_overspend(self):
+        out = StringIO()
+        call_command("stress_leave_balances", writers=[1, 6], requests=3, allowed_days=5, reviewers=2, stdout=out)
+
+        report = json.loads(out.getvalue())
+        for result in report["rounds"]:
+            with self.subTest(writers=result["writers"]):
+                self.assertTrue(result["consistent"])
+                self.assertEqual(result["granted"], min(3 * result["writers"], 5))
+                self.assertEqual(result["ledger"], {"used_days": result["granted"], "pending_days": 0})
+                self.assertEqual((result["apply"]["errors"], result["approve"]["errors"]), (0, 0))
+                self.assertEqual(result["approve"]["statuses"], {"200": result["granted"], "409": result["granted"]})
+        # The scratch organization is gone
+        self.assertFalse(Organization.objects.filter(code__startswith="STRESS-").exists())
@@ -1,8 +1,34 @@
 from django.urls import path
-from .views import LeaveListCreateView, LeaveDetailView, LeaveMeView
+from .views import (
+    LeaveListCreateView,
+    LeaveDetailView,
+    LeaveAttachmentView,
+    LeaveMeView,
+    LeaveBulkReviewView,
+    LeaveInboxView,
+    LeaveInboxCountView,
+    LeaveInboxAgingView,
+    LeaveExportView,
+    LeaveCalendarView,
+    LeaveConflictsView,
+    LeaveYearEndView,
+    AsyncLeaveMeView,
+)
 
 urlpatterns = [
     path("leaves/", LeaveListCreateView.as_view(), name="leave-list-create"),
     path("leaves/<uuid:pk>/", LeaveDetailView.as_view(), name="leave-detail"),
+    path("leaves/<uuid:pk>/attachment/", LeaveAttachmentView.as_view(), name="leave-attachment"),
     path("leaves/me/", LeaveMeView.as_view(), name="leave-me"),
+    path("leaves/inbox/", LeaveInboxView.as_view(), name="leave-inbox"),
+    path("leaves/inbox/count/", LeaveInboxCountView.as_view(), name="leave-inbox-count"),
+    path("leaves/inbox/aging/", LeaveInboxAgingView.as_view(), name="leave-inbox-aging"),
+    path("leaves/bulk-review/", LeaveBulkReviewView.as_view(), name="leave-bulk-review"),
+    path("leaves/export/", LeaveExportView.as_view(), name="leave-export"),
+    path("leaves/calendar/", LeaveCalendarView.as_view(), name="leave-calendar"),
+    path("leaves/conflicts/", LeaveConflictsView.as_view(), name="leave-conflicts"),
+    path("leaves/year-end/", LeaveYearEndView.as_view(), name="leave-year-end"),
+
+    # Async twin of leaves/me/ for ASGI deployments
+    path("async/leaves/me/", AsyncLeaveMeView.as_view(), name="leave-me-async"),
 ]
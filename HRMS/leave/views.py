@@ -1,13 +1,64 @@
-from datetime import date
+import csv
+import json
+import time
+import uuid
+from collections import defaultdict
+from itertools import islice
+from datetime import date, timedelta
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.views import APIView
+from rest_framework.exceptions import APIException, PermissionDenied, ValidationError
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from .models import Leave
-from .serializers import LeaveSerializer
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from .models import Leave, PendingLeave, YearEndRun
+from .serializers import (
+    LeaveSerializer,
+    LeaveListSerializer,
+    LeaveBulkReviewSerializer,
+    YearEndRequestSerializer,
+    YearEndRunSerializer,
+)
+from .attachments import AttachmentUploadHandler, serve_attachment
+from .balances import (
+    BalanceConflict,
+    InsufficientBalance,
+    apply_status_change,
+    apply_status_changes,
+    atomic_with_retry,
+    booked_days,
+    count_leave_days,
+)
+from .inbox import ALL_DEPARTMENTS, pending_count, sync_inbox
+from .overlaps import (
+    BLOCKING_STATUSES,
+    IntervalSet,
+    approved_interval_sets,
+    find_overlapping_leave,
+    find_overlapping_pairs,
+    lock_employees,
+)
+from .calendar import (
+    CALENDAR_STATUSES,
+    build_day_occupancy,
+    calendar_cache_key,
+    calendar_cache_timeout,
+    invalidate_calendar,
+    month_bounds,
+)
+from .year_end import YearEndClose
+from analytics.rollups import record_leave_changes
+from notifications.outbox import enqueue_leave_events
 from employee.models import Employee
-from django.db.models import F, Sum, ExpressionWrapper, DurationField
-from datetime import date, timedelta
+from organization.models import Organization
+from organization.workdays import organization_today
+from HRMS.async_views import AsyncAPIView
+from HRMS.fieldsets import SparseFieldsetMixin, ordering_columns, restrict_queryset, sparse_serializer
+from HRMS.pagination import CreatedAtCursorPagination, InboxCursorPagination
 
 
 class LeavePermission(permissions.BasePermission):
@@ -35,26 +86,65 @@ class LeavePermission(permissions.BasePermission):
 
         if user.role == "SUPERADMIN":
             return True
-        if user.role == "HR" and obj.organization == user.organization:
+        if user.role == "HR" and obj.organization_id == user.organization_id:
             return True
-        if user.role == "EMPLOYEE" and obj.user == user:
+        if user.role == "EMPLOYEE" and obj.user_id == user.id:
             return request.method in ["GET", "POST"]
         return False
 
 
+class StaleLeave(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The leave has been changed by another request since it was loaded; reload it and review again."
+    default_code = "stale_version"
+
+
+class LeaveConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Too many concurrent changes to this leave balance; try again."
+    default_code = "conflict"
+
+
+REVIEW_ACTIONS = {
+    "approve": "Approved",
+    "reject": "Rejected",
+    "cancel": "Cancelled",
+}
+
+
+def parse_uuid_param(params, name):
+    try:
+        return uuid.UUID(params[name])
+    except ValueError:
+        raise ValidationError({name: "Must be a valid UUID."})
+
+
+def leave_queryset():
+    """Leave queryset with every relation LeaveSerializer reads joined in."""
+    return Leave.objects.select_related(
+        "organization", "employee__user", "policy", "reviewed_by"
+    )
+
 
 # List + Create Leaves
-class LeaveListCreateView(generics.ListCreateAPIView):
+class LeaveListCreateView(SparseFieldsetMixin, generics.ListCreateAPIView):
     serializer_class = LeaveSerializer
+    compact_serializer_class = LeaveListSerializer
     permission_classes = [permissions.IsAuthenticated, LeavePermission]
+    pagination_class = CreatedAtCursorPagination
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Attachments are streamed to disk, hashed and checked while the body is read
+        request.upload_handlers = [AttachmentUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
 
     def get_queryset(self):
         user = self.request.user
 
         if user.role == "SUPERADMIN":
-            return Leave.objects.all()
+            return leave_queryset()
         elif user.role == "HR":
-            return Leave.objects.filter(organization=user.organization)
+            return leave_queryset().filter(organization_id=user.organization_id)
         elif user.role == "EMPLOYEE":
             # Employees can only see their own leaves in /leaves/me/
             return Leave.objects.none()
@@ -62,7 +152,7 @@ class LeaveListCreateView(generics.ListCreateAPIView):
     
     def perform_create(self, serializer):
         user = self.request.user
-        employee = get_object_or_404(Employee, user=user)
+        employee = get_object_or_404(Employee.objects.select_related("organization", "user"), user=user)
         policy = serializer.validated_data.get("policy")
 
         if not policy:
@@ -74,10 +164,12 @@ class LeaveListCreateView(generics.ListCreateAPIView):
 
         start_date = serializer.validated_data.get("start_date")
         end_date = serializer.validated_data.get("end_date")
-        days_requested = (end_date - start_date).days + 1
+        days_requested = count_leave_days(start_date, end_date, employee.organization)
+        if days_requested == 0:
+            raise PermissionDenied("The selected dates contain no working days.")
 
-        # 2️Notice period validation
-        today = date.today()
+        # 2️Notice period validation (in the organization's time zone)
+        today = organization_today(employee.organization)
         if (start_date - today).days < policy.notice_period_days:
             raise PermissionDenied(
                 f"Leave must be applied at least {policy.notice_period_days} days in advance."
@@ -90,60 +182,89 @@ class LeaveListCreateView(generics.ListCreateAPIView):
                 f"This leave type requires a supporting document for more than {policy.max_days_without_doc} days."
             )
 
-        # 4️Max days per year validation
-        year_start = date(today.year, 1, 1)
-        year_end = date(today.year, 12, 31)
-
-        # Calculate total approved leave days for that employee and policy in the year
-        total_taken = (
-            Leave.objects.filter(
-                employee=employee,
-                policy=policy,
-                status="Approved",
-                start_date__gte=year_start,
-                end_date__lte=year_end
+        # Stored before the transaction, which may run more than once
+        if attachment:
+            attachment_field = Leave._meta.get_field("attachment")
+            serializer.validated_data["attachment"] = attachment_field.storage.save(
+                attachment_field.generate_filename(None, attachment.name), attachment
             )
-            .annotate(days=ExpressionWrapper(F('end_date') - F('start_date') + timedelta(days=1), output_field=DurationField()))
-            .aggregate(total=Sum('days'))
-            .get('total')
-        )
 
-        total_taken_days = total_taken.days if total_taken else 0
+        def create_leave():
+            # 4️No overlap with the employee's pending or approved leaves (in the transaction, with the
+            # employee locked, so two overlapping applications sent at once cannot both pass)
+            lock_employees([employee.id])
+            clash = find_overlapping_leave(employee.id, start_date, end_date)
+            if clash:
+                raise PermissionDenied(
+                    f"This leave overlaps your {clash.status.lower()} leave from {clash.start_date} to {clash.end_date}."
+                )
+            leave = serializer.create({
+                **serializer.validated_data,
+                "organization": employee.organization,
+                "employee": employee,
+                "user": user,
+                "status": "Pending",
+                "days": days_requested,
+                "applied_department": employee.department,
+            })
+            # 5️Max days per year, checked and reserved as pending in the same transaction
+            # (on the ledger row, locked or version-checked: see leave/balances.py)
+            apply_status_change(leave, None, leave.status, check_limit=True)
+            enqueue_leave_events([leave])
+            return leave
 
-        if total_taken_days + days_requested > policy.max_days_per_year:
+        try:
+            serializer.instance = atomic_with_retry(create_leave)
+        except InsufficientBalance as exc:
+            balance = exc.balance
+            pending = f" and {balance.pending_days} are pending review" if balance.pending_days else ""
             raise PermissionDenied(
-                f"Cannot apply {days_requested} days. You have already used {total_taken_days}/{policy.max_days_per_year} days this year."
+                f"Cannot apply {days_requested} days. You have already used "
+                f"{balance.used_days}/{exc.allowed_days} days this year{pending}."
             )
-
-        # If all validations pass → save leave
-        serializer.save(
-            organization=employee.organization,
-            employee=employee,
-            user=user,
-            status="Pending"
-        )
+        except BalanceConflict:
+            raise LeaveConflict()
 
 # Employee’s Own Leave History (/leaves/me/)
-class LeaveMeView(generics.ListAPIView):
+class LeaveMeView(SparseFieldsetMixin, generics.ListAPIView):
     serializer_class = LeaveSerializer
+    compact_serializer_class = LeaveListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         user = self.request.user
-        return Leave.objects.filter(user=user).order_by("-created_at")
+        return leave_queryset().filter(user=user)
+
+
+class AsyncLeaveMeView(AsyncAPIView):
+    """Async twin of LeaveMeView for ASGI deployments (/async/leaves/me/)."""
+
+    async def get(self, request):
+        paginator = CreatedAtCursorPagination()
+        template = sparse_serializer(request, LeaveSerializer, LeaveListSerializer)
+        leaves = restrict_queryset(
+            leave_queryset().filter(user_id=request.user.pk), template, ordering_columns(CreatedAtCursorPagination)
+        )
+        leaves = await paginator.apaginate_queryset(leaves, request)
+        data = sparse_serializer(
+            request, LeaveSerializer, LeaveListSerializer, leaves, many=True, context={"request": request}
+        ).data
+        return self.render(paginator.get_paginated_data(data))
 
 
 # Retrieve, Update (Approve/Reject/Cancel), Delete (for HR & SUPERADMIN)
-class LeaveDetailView(generics.RetrieveUpdateDestroyAPIView):
+class LeaveDetailView(SparseFieldsetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = LeaveSerializer
     permission_classes = [permissions.IsAuthenticated, LeavePermission]
     queryset = Leave.objects.all()
+    sparse_always_load = ("organization",)
 
     def get_object(self):
         user = self.request.user
         pk = self.kwargs.get("pk")
 
-        leave = get_object_or_404(Leave, pk=pk)
+        leave = get_object_or_404(self.sparse_queryset(leave_queryset()), pk=pk)
 
         # EMPLOYEE cannot access /leaves/<uuid>/ directly
         if user.role == "EMPLOYEE":
@@ -152,16 +273,17 @@ class LeaveDetailView(generics.RetrieveUpdateDestroyAPIView):
         # HR and SUPERADMIN access
         if user.role == "SUPERADMIN":
             return leave
-        if user.role == "HR" and leave.organization == user.organization:
+        if user.role == "HR" and leave.organization_id == user.organization_id:
             return leave
 
         raise PermissionDenied({"detail": "Not authorized to view this record."})
 
     def update(self, request, *args, **kwargs):
         user = request.user
-        leave = self.get_object()
 
         if user.role not in ["SUPERADMIN", "HR"]:
+            # The lookup answers first (404, or 403 outside their scope), as it does for reads
+            self.get_object()
             raise PermissionDenied("You cannot approve or reject leave requests.")
 
         action = request.data.get("action")
@@ -173,17 +295,570 @@ class LeaveDetailView(generics.RetrieveUpdateDestroyAPIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Update leave status
-        if action == "approve":
-            leave.status = "Approved"
-        elif action == "reject":
-            leave.status = "Rejected"
-        elif action == "cancel":
-            leave.status = "Cancelled"
-
-        leave.reviewed_by = user
-        leave.remarks = remarks
-        leave.save()
+        version = request.data.get("version")
+        if version not in (None, ""):
+            try:
+                version = int(version)
+            except (TypeError, ValueError):
+                raise ValidationError({"version": "Must be an integer."})
+
+        new_status = REVIEW_ACTIONS[action]
+
+        def review():
+            # Read, checked and written in one transaction, run again if it loses a race
+            leave = self.get_object()
+            if action == "approve":
+                lock_employees([leave.employee_id])
+                clash = find_overlapping_leave(
+                    leave.employee_id, leave.start_date, leave.end_date, statuses=["Approved"], exclude_id=leave.pk
+                )
+                if clash:
+                    return leave, clash
+
+            # Only the request holding the current version moves the leave on; a concurrent or stale review gets 409
+            expected = leave.version if version in (None, "") else version
+            if not Leave.objects.filter(pk=leave.pk, version=expected).update(version=F("version") + 1):
+                raise StaleLeave()
+            old_status = leave.status
+            leave.status = new_status
+            leave.reviewed_by = user
+            leave.reviewed_at = timezone.now()
+            leave.remarks = remarks
+            leave.version = expected + 1
+            leave.save()
+            # Re-approving a rejected or cancelled leave takes days again: it must still fit
+            apply_status_change(leave, old_status, new_status, check_limit=True)
+            enqueue_leave_events([leave])
+            return leave, None
+
+        try:
+            leave, clash = atomic_with_retry(review)
+        except InsufficientBalance as exc:
+            raise PermissionDenied(f"Not enough leave balance: {exc}")
+        except BalanceConflict:
+            raise LeaveConflict()
+        if clash:
+            return Response(
+                {"detail": f"Leave overlaps an approved leave ({clash.start_date} to {clash.end_date})."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         serializer = self.get_serializer(leave)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def perform_destroy(self, instance):
+        def destroy():
+            # The row as it is now (a retry must not reuse the instance a rolled-back delete() emptied)
+            leave = Leave.objects.select_related("organization").filter(pk=instance.pk).first()
+            if leave is None:
+                return
+            # Release whatever the leave was holding on the balance ledger
+            apply_status_change(leave, leave.status, None)
+            leave.delete()
+
+        try:
+            atomic_with_retry(destroy)
+        except BalanceConflict:
+            raise LeaveConflict()
+
+
+# Download the supporting document (/leaves/<uuid>/attachment/)
+class LeaveAttachmentView(APIView):
+    """
+    The leave's attachment, for HR/SUPERADMIN in scope and the employee who
+    applied. Supports single byte ranges (Range / If-Range) and If-None-Match.
+    """
+    permission_classes = [permissions.IsAuthenticated, LeavePermission]
+
+    def get(self, request, pk):
+        leave = get_object_or_404(
+            Leave.objects.only("id", "organization_id", "user_id", "attachment"), pk=pk
+        )
+        self.check_object_permissions(request, leave)
+        if not leave.attachment:
+            raise Http404("This leave has no attachment.")
+        return serve_attachment(request, leave.attachment.name, f"leave-{leave.pk}")
+
+
+# Pending-approvals inbox (/leaves/inbox/, /leaves/inbox/count/, /leaves/inbox/aging/)
+def parse_days_param(params, name, default=None):
+    if not params.get(name):
+        return default
+    try:
+        days = int(params[name])
+    except ValueError:
+        days = -1
+    if days < 0:
+        raise ValidationError({name: "Must be a whole number of days (0 or more)."})
+    return days
+
+
+class LeaveInboxMixin:
+    """
+    Scope of the inbox views: HR see their organization, SUPERADMIN every
+    organization or the one passed as ?organization=. ?department= narrows
+    it to one department.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_scope(self, request):
+        user = request.user
+        params = request.query_params
+        if user.role == "HR":
+            organization_id = user.organization_id
+        elif user.role == "SUPERADMIN":
+            organization_id = parse_uuid_param(params, "organization") if params.get("organization") else None
+        else:
+            raise PermissionDenied("Only HR and SUPERADMIN have an approvals inbox.")
+        return organization_id, params.get("department") or ALL_DEPARTMENTS
+
+    def get_queue(self, organization_id, department):
+        queue = PendingLeave.objects.all()
+        if organization_id is not None:
+            queue = queue.filter(organization_id=organization_id)
+        if department:
+            queue = queue.filter(department=department)
+        return queue
+
+
+class LeaveInboxView(LeaveInboxMixin, APIView):
+    """
+    Pending leaves, oldest first, read from the inbox queue.
+
+    Query params:
+      - department: only this department's leaves
+      - older_than_days: only leaves pending for longer than this
+      - fields / exclude, page_size, cursor: as on /leaves/
+    The response carries the live pending count next to the page.
+    """
+
+    def get(self, request):
+        organization_id, department = self.get_scope(request)
+        queue = self.get_queue(organization_id, department).select_related(
+            "leave__organization", "leave__employee__user", "leave__policy", "leave__reviewed_by"
+        )
+        older_than = parse_days_param(request.query_params, "older_than_days")
+        if older_than is not None:
+            queue = queue.filter(created_at__lt=timezone.now() - timedelta(days=older_than))
+
+        paginator = InboxCursorPagination()
+        entries = paginator.paginate_queryset(queue, request, view=self)
+        data = sparse_serializer(
+            request, LeaveSerializer, LeaveListSerializer,
+            [entry.leave for entry in entries], many=True, context={"request": request},
+        ).data
+        return Response({"pending": pending_count(organization_id, department), **paginator.get_paginated_data(data)})
+
+
+class LeaveInboxCountView(LeaveInboxMixin, APIView):
+    """Badge count: {"pending": N}, one counter row for an organization (or department)."""
+
+    def get(self, request):
+        return Response({"pending": pending_count(*self.get_scope(request))})
+
+
+class LeaveInboxAgingView(LeaveInboxMixin, APIView):
+    """
+    How long pending leaves have been waiting.
+
+    Query params:
+      - days: the SLA in days (default LEAVE_INBOX_SLA_DAYS); "overdue" counts the leaves pending longer
+      - department, organization: as on /leaves/inbox/
+    "older_than_days" counts the leaves pending longer than each of LEAVE_INBOX_AGING_BUCKETS.
+    Only queue entries older than the smallest threshold are read.
+    """
+
+    def get(self, request):
+        organization_id, department = self.get_scope(request)
+        days = parse_days_param(request.query_params, "days", settings.LEAVE_INBOX_SLA_DAYS)
+        thresholds = sorted({*settings.LEAVE_INBOX_AGING_BUCKETS, days})
+        now = timezone.now()
+        cutoffs = {threshold: now - timedelta(days=threshold) for threshold in thresholds}
+
+        queue = self.get_queue(organization_id, department)
+        counts = queue.filter(created_at__lt=cutoffs[thresholds[0]]).aggregate(**{
+            str(threshold): Count("pk", filter=Q(created_at__lt=cutoff)) for threshold, cutoff in cutoffs.items()
+        })
+        oldest = queue.order_by("created_at").values_list("created_at", flat=True).first()
+        return Response({
+            "pending": pending_count(organization_id, department),
+            "threshold_days": days,
+            "overdue": counts[str(days)],
+            "older_than_days": {threshold: counts[str(threshold)] for threshold in thresholds},
+            "oldest_created_at": oldest,
+            "oldest_age_days": (now - oldest).days if oldest else None,
+        })
+
+
+# Bulk Approve/Reject/Cancel (/leaves/bulk-review/) for HR & SUPERADMIN
+class LeaveBulkReviewView(APIView):
+    """
+    Review many leaves in one request:
+        {"items": [{"id": "<uuid>", "action": "approve", "remarks": "...", "version": 1}, ...]}
+    Scope is checked for the whole batch in one query, changes are written with
+    one UPDATE per (status, remarks) in a single transaction and a result is
+    returned per item.
+    """
+    permission_classes = [permissions.IsAuthenticated, LeavePermission]
+
+    def post(self, request):
+        user = request.user
+        if user.role not in ["SUPERADMIN", "HR"]:
+            raise PermissionDenied("You cannot approve or reject leave requests.")
+
+        serializer = LeaveBulkReviewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data["items"]
+
+        leaves = Leave.objects.select_related("organization", "policy", "employee__user").filter(
+            pk__in={item["id"] for item in items}
+        )
+        if user.role == "HR":
+            leaves = leaves.filter(organization_id=user.organization_id)
+
+        try:
+            results, changed = atomic_with_retry(self.review, user, items, leaves)
+        except InsufficientBalance as exc:
+            raise PermissionDenied(f"Not enough leave balance for this batch: {exc}")
+        except BalanceConflict:
+            raise LeaveConflict()
+
+        return Response(
+            {"updated": len(changed), "failed": len(results) - len(changed), "results": results},
+            status=status.HTTP_200_OK,
+        )
+
+    def review(self, user, items, leaves):
+        """The batch's transaction (run again from scratch if it loses a race): (results, changed leaves)."""
+        results = []
+        changed = []
+        transitions = []
+        now = timezone.now()
+        found = {leave.pk: leave for leave in leaves.select_for_update()}
+        seen = set()
+
+        # Approved leaves of everyone being approved, fetched once and probed by binary search
+        approving = [
+            found[item["id"]] for item in items if item["action"] == "approve" and item["id"] in found
+        ]
+        approved = defaultdict(IntervalSet)
+        if approving:
+            lock_employees({leave.employee_id for leave in approving})
+            approved = approved_interval_sets(
+                {leave.employee_id for leave in approving},
+                min(leave.start_date for leave in approving),
+                max(leave.end_date for leave in approving),
+                exclude_ids=found.keys(),
+            )
+
+        for item in items:
+            leave_id = item["id"]
+            leave = found.get(leave_id)
+            if leave is None:
+                results.append({"id": leave_id, "success": False, "detail": "Leave not found."})
+                continue
+            if leave_id in seen:
+                results.append({"id": leave_id, "success": False, "detail": "Duplicate leave in batch."})
+                continue
+            seen.add(leave_id)
+            if item.get("version", leave.version) != leave.version:
+                results.append({"id": leave_id, "success": False, "detail": "Changed since it was loaded (stale version)."})
+                continue
+
+            if item["action"] == "approve":
+                if approved[leave.employee_id].overlaps(leave.start_date, leave.end_date):
+                    results.append({"id": leave_id, "success": False, "detail": "Overlaps an approved leave."})
+                    continue
+                approved[leave.employee_id].add(leave.start_date, leave.end_date)
+
+            old_status = leave.status
+            leave.status = REVIEW_ACTIONS[item["action"]]
+            leave.reviewed_by = user
+            leave.reviewed_at = now
+            leave.remarks = item["remarks"]
+            leave.updated_at = now
+            leave.version += 1
+            changed.append(leave)
+            transitions.append((leave, old_status, leave.status))
+            results.append({"id": leave_id, "success": True, "status": leave.status, "version": leave.version})
+
+        # The rows were read under select_for_update (or, on SQLite, in a transaction that fails
+        # rather than overwrite a concurrent write). Rows sharing status and remarks get one
+        # plain UPDATE: cheaper to build than a CASE per column and row
+        groups = defaultdict(list)
+        for leave in changed:
+            groups[(leave.status, leave.remarks)].append(leave.pk)
+        for (new_status, remarks), ids in groups.items():
+            for start in range(0, len(ids), 500):
+                Leave.objects.filter(pk__in=ids[start:start + 500]).update(
+                    status=new_status, remarks=remarks, reviewed_by=user, reviewed_at=now, updated_at=now,
+                    version=F("version") + 1,
+                )
+        apply_status_changes(transitions, check_limit=True)
+        enqueue_leave_events(changed)
+
+        # update() sends no post_save, so update the inbox, the rollups and the calendars ourselves
+        sync_inbox(changed)
+        record_leave_changes(changed)
+        windows = {(leave.organization_id, leave.start_date, leave.end_date) for leave in changed}
+        for window in windows:
+            invalidate_calendar(*window)
+        return results, changed
+
+
+# Streaming export for payroll (/leaves/export/)
+class _Echo:
+    """File-like object that hands back what csv.writer writes, for streaming."""
+
+    def write(self, value):
+        return value
+
+
+class LeaveExportView(APIView):
+    """
+    Stream leaves as CSV (default) or NDJSON without materializing the result set.
+
+    Query params:
+      - output: csv | ndjson
+      - from, to: only leaves overlapping this date range (YYYY-MM-DD)
+      - status: Pending | Approved | Rejected | Cancelled
+      - policy: policy UUID
+      - organization: organization UUID (SUPERADMIN only)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    EXPORT_COLUMNS = [
+        ("id", "id"),
+        ("organization", "organization__code"),
+        ("employee_code", "employee__employee_code"),
+        ("employee_email", "employee__user__email"),
+        ("department", "employee__department"),
+        ("policy", "policy__name"),
+        ("policy_type", "policy__policy_type"),
+        ("start_date", "start_date"),
+        ("end_date", "end_date"),
+        ("status", "status"),
+        ("reviewed_by", "reviewed_by__email"),
+        ("created_at", "created_at"),
+        ("updated_at", "updated_at"),
+    ]
+    CHUNK_SIZE = 2000
+
+    def get_queryset(self, request):
+        user = request.user
+        params = request.query_params
+
+        if user.role == "SUPERADMIN":
+            leaves = Leave.objects.all()
+            if params.get("organization"):
+                leaves = leaves.filter(organization_id=parse_uuid_param(params, "organization"))
+        elif user.role == "HR":
+            leaves = Leave.objects.filter(organization_id=user.organization_id)
+        else:
+            raise PermissionDenied("Only HR and SUPERADMIN can export leaves.")
+
+        try:
+            if params.get("from"):
+                leaves = leaves.filter(end_date__gte=date.fromisoformat(params["from"]))
+            if params.get("to"):
+                leaves = leaves.filter(start_date__lte=date.fromisoformat(params["to"]))
+        except ValueError:
+            raise ValidationError({"detail": "Dates must use the YYYY-MM-DD format."})
+
+        if params.get("status"):
+            if params["status"] not in dict(Leave.STATUS_CHOICES):
+                raise ValidationError({"status": "Invalid status."})
+            leaves = leaves.filter(status=params["status"])
+        if params.get("policy"):
+            leaves = leaves.filter(policy_id=parse_uuid_param(params, "policy"))
+
+        return leaves.order_by("-created_at", "-id")
+
+
+    def iter_rows(self, leaves):
+        fields = [field for _, field in self.EXPORT_COLUMNS] + ["organization_id", "days"]
+        start_index = fields.index("start_date")
+        end_index = fields.index("end_date")
+        rows = leaves.values_list(*fields).iterator(chunk_size=self.CHUNK_SIZE)
+        organizations = {}
+        # The booked days; unstored ones are computed a chunk at a time, vectorized per organization
+        while chunk := list(islice(rows, self.CHUNK_SIZE)):
+            leave_days = booked_days(
+                [(row[-2], row[start_index], row[end_index], row[-1]) for row in chunk], organizations
+            )
+            for row, days in zip(chunk, leave_days):
+                yield row[:-2] + (days,)
+
+    def stream_csv(self, leaves):
+        writer = csv.writer(_Echo())
+        yield writer.writerow([name for name, _ in self.EXPORT_COLUMNS] + ["days"])
+        for row in self.iter_rows(leaves):
+            yield writer.writerow(row)
+
+    def stream_ndjson(self, leaves):
+        names = [name for name, _ in self.EXPORT_COLUMNS] + ["days"]
+        for row in self.iter_rows(leaves):
+            yield json.dumps(dict(zip(names, row)), default=str) + "\n"
+
+    def get(self, request):
+        output = request.query_params.get("output", "csv")
+        if output not in ("csv", "ndjson"):
+            raise ValidationError({"output": "Use 'csv' or 'ndjson'."})
+
+        leaves = self.get_queryset(request)
+        if output == "csv":
+            response = StreamingHttpResponse(self.stream_csv(leaves), content_type="text/csv")
+        else:
+            response = StreamingHttpResponse(self.stream_ndjson(leaves), content_type="application/x-ndjson")
+        response["Content-Disposition"] = f'attachment; filename="leaves.{output}"'
+        return response
+
+
+# Team availability calendar (/leaves/calendar/?month=YYYY-MM&department=)
+class LeaveCalendarView(APIView):
+    """
+    Per-day headcount on leave (approved + pending) for one month, optionally
+    for one department. Cached per (organization, month, department) under the
+    month's LeaveCalendarVersion, which every change to a leave in it bumps.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        if user.role == "HR":
+            organization_id = user.organization_id
+        elif user.role == "SUPERADMIN":
+            if not request.query_params.get("organization"):
+                raise ValidationError({"organization": "SUPERADMIN must pass an organization UUID."})
+            organization_id = parse_uuid_param(request.query_params, "organization")
+        else:
+            raise PermissionDenied("Only HR and SUPERADMIN can view the team calendar.")
+
+        try:
+            year, month = map(int, request.query_params.get("month", "").split("-"))
+            window_start, window_end = month_bounds(year, month)
+        except ValueError:
+            raise ValidationError({"month": "Use the YYYY-MM format."})
+        department = request.query_params.get("department") or None
+
+        cache_key = calendar_cache_key(organization_id, year, month, department)
+        data = cache.get(cache_key)
+        if data is None:
+            leaves = Leave.objects.filter(
+                organization_id=organization_id,
+                status__in=CALENDAR_STATUSES,
+                end_date__gte=window_start,
+                start_date__lte=window_end,
+            )
+            if department:
+                leaves = leaves.filter(employee__department=department)
+            rows = leaves.values(
+                "id", "employee_id", "status", "start_date", "end_date",
+                employee_name=F("employee__user__username"),
+                department=F("employee__department"),
+            )
+            data = {
+                "organization": organization_id,
+                "month": f"{year}-{month:02d}",
+                "department": department,
+                "days": build_day_occupancy(window_start, window_end, rows),
+            }
+            cache.set(cache_key, data, calendar_cache_timeout())
+
+        return Response(data, status=status.HTTP_200_OK)
+
+
+# Organization-wide overlap report (/leaves/conflicts/)
+class LeaveConflictsView(APIView):
+    """
+    Every pair of overlapping pending/approved leaves of the same employee.
+    One ordered query plus a sorted sweep, instead of comparing all pairs.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        if user.role == "HR":
+            leaves = Leave.objects.filter(organization_id=user.organization_id)
+        elif user.role == "SUPERADMIN":
+            leaves = Leave.objects.all()
+            if request.query_params.get("organization"):
+                leaves = leaves.filter(organization_id=parse_uuid_param(request.query_params, "organization"))
+        else:
+            raise PermissionDenied("Only HR and SUPERADMIN can view leave conflicts.")
+
+        rows = (
+            leaves.filter(status__in=BLOCKING_STATUSES)
+            .order_by("employee_id", "start_date")
+            .values(
+                "id", "employee_id", "start_date", "end_date", "status",
+                employee_code=F("employee__employee_code"),
+            )
+        )
+        pairs = find_overlapping_pairs(rows.iterator(chunk_size=2000))
+
+        def describe(row):
+            return {key: row[key] for key in ("id", "start_date", "end_date", "status")}
+
+        conflicts = [
+            {
+                "employee_id": first["employee_id"],
+                "employee_code": first["employee_code"],
+                "first": describe(first),
+                "second": describe(second),
+            }
+            for first, second in pairs
+        ]
+        return Response({"count": len(conflicts), "conflicts": conflicts}, status=status.HTTP_200_OK)
+
+
+# Year-end carry-forward / encashment (/leaves/year-end/)
+class LeaveYearEndView(APIView):
+    """
+    GET  ?year= → progress of the organization's year-end close.
+    POST {"year", "restart"} → start or resume the close. Each request works for at
+    most YEAR_END_REQUEST_TIME_BUDGET seconds and answers 202 while the run is
+    unfinished; repeat the POST to continue. Large organizations should use the
+    close_leave_year management command.
+    HR closes their own organization; SUPERADMIN must pass "organization".
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_organization_id(self, request, params):
+        user = request.user
+        if user.role == "HR":
+            return user.organization_id
+        if user.role == "SUPERADMIN":
+            if not params.get("organization"):
+                raise ValidationError({"organization": "This field is required."})
+            return parse_uuid_param(params, "organization")
+        raise PermissionDenied("Only HR and SUPERADMIN can close a leave year.")
+
+    def get(self, request):
+        organization_id = self.get_organization_id(request, request.query_params)
+        try:
+            year = int(request.query_params.get("year", ""))
+        except ValueError:
+            raise ValidationError({"year": "A valid year is required."})
+        run = get_object_or_404(YearEndRun, organization_id=organization_id, year=year)
+        return Response(YearEndRunSerializer(run).data, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        organization_id = self.get_organization_id(request, request.data)
+        organization = get_object_or_404(Organization, pk=organization_id)
+        serializer = YearEndRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        close = YearEndClose(
+            organization,
+            serializer.validated_data["year"],
+            chunk_size=getattr(settings, "YEAR_END_CHUNK_SIZE", 1000),
+            # workers=1: no process pool forked inside a web worker; close_leave_year has --workers
+            workers=1,
+            started_by=request.user,
+        )
+        deadline = time.monotonic() + getattr(settings, "YEAR_END_REQUEST_TIME_BUDGET", 20)
+        run = close.run(restart=serializer.validated_data["restart"], deadline=deadline)
+
+        response_status = status.HTTP_200_OK if run.status == "Completed" else status.HTTP_202_ACCEPTED
+        return Response(YearEndRunSerializer(run).data, status=response_status)
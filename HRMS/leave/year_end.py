@@ -0,0 +1,232 @@
+# leave/year_end.py
+"""
+Year-end close: carry-forward and encashment.
+
+For every active employee and policy of the organization the closing balance
+of the year is entitled + carried forward - used - pending days. Up to the
+policy's carry_forward_days move to next year's ledger row, up to its
+encashment_limit of the remainder is encashed (when the policy allows it) and
+the rest lapses. The policy rules in force on 31 December are used.
+
+Employees are processed in keyset-ordered chunks (by id), optionally across a
+process pool. Results are written with upserts that *set* the ledger columns
+rather than add to them, so re-running a chunk or the whole close is
+idempotent. After each chunk commits in order, the run's checkpoint
+(last_employee_id) advances; a crashed or interrupted run resumes from there.
+"""
+import os
+import time as time_module
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time
+
+import django
+from django.db import connections, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from employee.models import Employee
+from policy.models import LeavePolicy
+from policy.versioning import policy_as_of
+from .models import LeaveBalance, LeaveClosing, YearEndRun
+
+
+RULE_FIELDS = ["max_days_per_year", "carry_forward_days", "allow_encashment", "encashment_limit"]
+
+
+def closing_rules(organization, year):
+    """{policy_id: rules} for the organization's active policies, as in force at the end of the year."""
+    year_end = timezone.make_aware(datetime.combine(datetime(year, 12, 31), time.max))
+    rules = {}
+    for policy in LeavePolicy.objects.filter(organization=organization, is_active=True):
+        historical = policy_as_of(policy.pk, year_end)
+        state = historical["state"] if historical else {}
+        rules[policy.pk] = {field: state.get(field, getattr(policy, field)) for field in RULE_FIELDS}
+        # New rows of next year's ledger start from today's entitlement
+        rules[policy.pk]["next_entitled_days"] = policy.max_days_per_year
+    return rules
+
+
+def split_closing(closing_days, rules):
+    """Return (carried_forward, encashed, lapsed) for a closing balance."""
+    closing_days = max(0, closing_days)
+    carried = min(closing_days, rules["carry_forward_days"])
+    encashed = min(closing_days - carried, rules["encashment_limit"]) if rules["allow_encashment"] else 0
+    return carried, encashed, closing_days - carried - encashed
+
+
+def close_chunk(run_id, year, employee_ids, rules):
+    """
+    Close one chunk of employees in a single transaction. Runs in a pool
+    worker, so it only receives plain values. Returns the number of closings written.
+    """
+    balances = {
+        (b.employee_id, b.policy_id, b.year): b
+        for b in LeaveBalance.objects.filter(
+            employee_id__in=employee_ids, policy_id__in=list(rules), year__in=[year, year + 1]
+        )
+    }
+
+    closings = []
+    encashments = []
+    carry_forwards = []
+    for employee_id in employee_ids:
+        for policy_id, policy_rules in rules.items():
+            current = balances.get((employee_id, policy_id, year))
+            if current is None:
+                closing = policy_rules["max_days_per_year"]
+            else:
+                # Encashment is excluded so that a re-run sees the same closing balance
+                closing = (
+                    current.entitled_days + current.carried_forward_days
+                    - current.used_days - current.pending_days
+                )
+            carried, encashed, lapsed = split_closing(closing, policy_rules)
+
+            closings.append(LeaveClosing(
+                run_id=run_id, employee_id=employee_id, policy_id=policy_id, year=year,
+                closing_days=max(0, closing), carried_forward_days=carried,
+                encashed_days=encashed, lapsed_days=lapsed,
+            ))
+            if (current.encashed_days if current else 0) != encashed:
+                encashments.append(LeaveBalance(
+                    employee_id=employee_id, policy_id=policy_id, year=year,
+                    entitled_days=policy_rules["max_days_per_year"], encashed_days=encashed,
+                ))
+            following = balances.get((employee_id, policy_id, year + 1))
+            if (following.carried_forward_days if following else 0) != carried:
+                carry_forwards.append(LeaveBalance(
+                    employee_id=employee_id, policy_id=policy_id, year=year + 1,
+                    entitled_days=policy_rules["next_entitled_days"], carried_forward_days=carried,
+                ))
+
+    ledger_key = ["employee", "policy", "year"]
+    with transaction.atomic():
+        LeaveClosing.objects.bulk_create(
+            closings, batch_size=1000, update_conflicts=True, unique_fields=ledger_key,
+            update_fields=["run", "closing_days", "carried_forward_days", "encashed_days", "lapsed_days"],
+        )
+        LeaveBalance.objects.bulk_create(
+            encashments, batch_size=1000, update_conflicts=True, unique_fields=ledger_key,
+            update_fields=["encashed_days"],
+        )
+        LeaveBalance.objects.bulk_create(
+            carry_forwards, batch_size=1000, update_conflicts=True, unique_fields=ledger_key,
+            update_fields=["carried_forward_days"],
+        )
+    return len(closings)
+
+
+class YearEndClose:
+    """
+    Drives one organization's close for a year: fetches employee ids in keyset
+    chunks, closes them in-process (workers=1) or in a process pool, and
+    checkpoints the run after every chunk that committed in order. At most
+    2 × workers chunks are in flight, which bounds memory whatever the size
+    of the organization.
+    """
+
+    def __init__(self, organization, year, chunk_size=1000, workers=1, started_by=None):
+        self.organization = organization
+        self.year = year
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.started_by = started_by
+
+    def get_run(self, restart=False):
+        run, created = YearEndRun.objects.get_or_create(
+            organization=self.organization, year=self.year, defaults={"started_by": self.started_by}
+        )
+        if restart or (not created and run.status == "Failed"):
+            if restart:
+                run.last_employee_id = None
+                run.employees_processed = 0
+            run.status = "Running"
+            run.error = ""
+            run.finished_at = None
+            run.save()
+        return run
+
+    def employee_chunks(self, after):
+        employees = Employee.objects.filter(organization=self.organization, is_active=True).order_by("id")
+        while True:
+            page = employees.filter(id__gt=after) if after is not None else employees
+            chunk = list(page.values_list("id", flat=True)[:self.chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            after = chunk[-1]
+
+    def run(self, restart=False, deadline=None):
+        """
+        Close the year, resuming from the last checkpoint. With a deadline
+        (time.monotonic() value) no new chunk is started after it passes and
+        the run is returned still "Running"; call again to continue.
+        """
+        run = self.get_run(restart=restart)
+        if run.status == "Completed":
+            return run
+
+        rules = closing_rules(self.organization, self.year)
+        pool = None
+        if self.workers is None or self.workers > 1:
+            # Forked workers must not share the parent's database connections
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=self.workers, initializer=django.setup)
+        try:
+            finished = self._process(run, rules, pool, deadline)
+        except Exception as exc:
+            YearEndRun.objects.filter(pk=run.pk).update(status="Failed", error=str(exc))
+            raise
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        if finished:
+            self._complete(run)
+        return run
+
+    def _process(self, run, rules, pool, deadline):
+        """Returns False when the deadline stopped the run before the last chunk."""
+        chunks = self.employee_chunks(run.last_employee_id)
+        if pool is None:
+            for chunk in chunks:
+                close_chunk(run.pk, self.year, chunk, rules)
+                self._checkpoint(run, chunk)
+                if deadline is not None and time_module.monotonic() >= deadline:
+                    return False
+            return True
+
+        in_flight = deque()
+        max_in_flight = 2 * (self.workers or os.cpu_count() or 1)
+        interrupted = False
+        while True:
+            while not interrupted and len(in_flight) < max_in_flight:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                in_flight.append((chunk, pool.submit(close_chunk, run.pk, self.year, chunk, rules)))
+            if not in_flight:
+                return not interrupted
+            # Checkpoint strictly in order: a later chunk that finished first waits for the earlier ones
+            chunk, future = in_flight.popleft()
+            future.result()
+            self._checkpoint(run, chunk)
+            if deadline is not None and time_module.monotonic() >= deadline:
+                interrupted = True
+
+    def _checkpoint(self, run, chunk):
+        run.last_employee_id = chunk[-1]
+        run.employees_processed += len(chunk)
+        run.save(update_fields=["last_employee_id", "employees_processed", "updated_at"])
+
+    def _complete(self, run):
+        totals = LeaveClosing.objects.filter(run=run).aggregate(
+            carried_forward_days=Sum("carried_forward_days"),
+            encashed_days=Sum("encashed_days"),
+            lapsed_days=Sum("lapsed_days"),
+        )
+        for field, value in totals.items():
+            setattr(run, field, value or 0)
+        run.status = "Completed"
+        run.finished_at = timezone.now()
+        run.save()
@@ -0,0 +1,17 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import OutboxEvent
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ("id", "event_type", "organization", "status", "attempts", "available_at", "sent_at")
+    list_filter = ("status", "event_type")
+    readonly_fields = ("payload", "lease_token", "leased_until", "last_error", "created_at", "sent_at")
+    actions = ["retry_now"]
+
+    @admin.action(description="Retry now")
+    def retry_now(self, request, queryset):
+        queryset.exclude(status="Sent").update(
+            status="Pending", available_at=timezone.now(), lease_token=None, leased_until=None
+        )
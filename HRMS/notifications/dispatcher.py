@@ -0,0 +1,173 @@
+"""
+Outbox dispatcher behind the dispatch_notifications command.
+
+Workers claim due events in batches by writing a lease (a random token and an
+expiry) on them: the claim re-checks that each row is still unclaimed in the
+UPDATE itself, so any number of workers can run side by side on any database,
+and PostgreSQL additionally skips rows another worker is claiming
+(SELECT ... FOR UPDATE SKIP LOCKED). The events of a batch are rendered to
+emails and sent through one connection of the configured email backend
+(EMAIL_BACKEND: SMTP in production, the file or in-memory backends locally),
+one email per event (each event announces one leave).
+
+A failed event is retried with exponential backoff (NOTIFICATION_RETRY_BASE_SECONDS
+doubled per attempt, capped at NOTIFICATION_RETRY_MAX_SECONDS, with jitter) and
+marked Failed after NOTIFICATION_MAX_ATTEMPTS. A worker that dies mid-batch
+leaves its lease to expire, after which the events are claimed again; delivery
+is therefore at least once.
+"""
+import random
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from auth_app.models import User
+from .models import OutboxEvent
+
+
+SUBJECTS = {
+    "leave.created": "Leave request from {employee_name}: {start_date} to {end_date}",
+    "leave.approved": "Your leave from {start_date} to {end_date} was approved",
+    "leave.rejected": "Your leave from {start_date} to {end_date} was rejected",
+    "leave.cancelled": "Your leave from {start_date} to {end_date} was cancelled",
+}
+
+
+def render_body(payload):
+    lines = [
+        f"Employee: {payload['employee_name']} <{payload['employee_email']}>",
+        f"Policy: {payload['policy_name'] or '-'}",
+        f"Dates: {payload['start_date']} to {payload['end_date']}",
+        f"Status: {payload['status']}",
+    ]
+    if payload.get("reviewed_by"):
+        lines.append(f"Reviewed by: {payload['reviewed_by']}")
+    if payload.get("remarks"):
+        lines.append(f"Remarks: {payload['remarks']}")
+    return "\n".join(lines) + "\n"
+
+
+class Dispatcher:
+    def __init__(self, batch_size=None, lease_seconds=None, max_attempts=None, connection=None):
+        self.batch_size = batch_size or getattr(settings, "NOTIFICATION_BATCH_SIZE", 100)
+        self.lease = timedelta(seconds=lease_seconds or getattr(settings, "NOTIFICATION_LEASE_SECONDS", 60))
+        self.max_attempts = max_attempts or getattr(settings, "NOTIFICATION_MAX_ATTEMPTS", 8)
+        self.retry_base = getattr(settings, "NOTIFICATION_RETRY_BASE_SECONDS", 30)
+        self.retry_max = getattr(settings, "NOTIFICATION_RETRY_MAX_SECONDS", 3600)
+        self.connection = connection
+        self.counts = {"sent": 0, "retried": 0, "failed": 0}
+
+    def claimable(self, now):
+        return OutboxEvent.objects.filter(status="Pending", available_at__lte=now).filter(
+            Q(leased_until__isnull=True) | Q(leased_until__lt=now)
+        )
+
+    def claim(self):
+        """Lease up to batch_size due events; returns them with the lease token."""
+        now = timezone.now()
+        token = uuid.uuid4()
+        with transaction.atomic():
+            due = list(
+                self.claimable(now).select_for_update(skip_locked=True)
+                .order_by("available_at", "id").values_list("pk", flat=True)[:self.batch_size]
+            )
+            if not due:
+                return token, []
+            self.claimable(now).filter(pk__in=due).update(lease_token=token, leased_until=now + self.lease)
+        return token, list(OutboxEvent.objects.filter(lease_token=token).order_by("available_at", "id"))
+
+    def approvers(self, events):
+        """{organization_id: [HR emails]} for the organizations of the batch, in one query."""
+        organization_ids = {event.organization_id for event in events if event.event_type == "leave.created"}
+        approvers = {}
+        if organization_ids:
+            rows = User.objects.filter(
+                organization_id__in=organization_ids, role="HR", is_active=True
+            ).order_by("email").values_list("organization_id", "email")
+            for organization_id, email in rows:
+                approvers.setdefault(organization_id, []).append(email)
+        return approvers
+
+    def render(self, event, approvers):
+        """The event's email."""
+        payload = event.payload
+        to, cc = [payload["employee_email"]], []
+        if event.event_type == "leave.created" and approvers.get(event.organization_id):
+            # Approvers are asked to review; the employee gets a copy as confirmation
+            to, cc = approvers[event.organization_id], to
+        return EmailMessage(
+            subject=SUBJECTS[event.event_type].format(**payload),
+            body=render_body(payload),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=to,
+            cc=cc,
+            headers={"X-HRMS-Event": f"{event.event_type}:{event.pk}:{payload['leave_id']}"},
+        )
+
+    def retry_delay(self, attempts):
+        delay = min(self.retry_base * 2 ** (attempts - 1), self.retry_max)
+        return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+    def deliver(self, token, events):
+        # Skip what another worker took over after our lease ran out (e.g. a stalled worker)
+        held = set(
+            OutboxEvent.objects.filter(lease_token=token, leased_until__gt=timezone.now())
+            .values_list("pk", flat=True)
+        )
+        events = [event for event in events if event.pk in held]
+        if not events:
+            return
+        approvers = self.approvers(events)
+        connection = self.connection or get_connection(fail_silently=False)
+        sent, failures = [], []
+        try:
+            connection.open()
+        except Exception as exc:
+            failures = [(event, exc) for event in events]
+        else:
+            try:
+                for event in events:
+                    try:
+                        connection.send_messages([self.render(event, approvers)])
+                    except Exception as exc:
+                        failures.append((event, exc))
+                    else:
+                        sent.append(event.pk)
+            finally:
+                connection.close()
+
+        now = timezone.now()
+        # Only while the lease is still ours: after it expired the event belongs to another worker
+        self.counts["sent"] += OutboxEvent.objects.filter(pk__in=sent, lease_token=token).update(
+            status="Sent", sent_at=now, lease_token=None, leased_until=None, last_error=""
+        )
+        for event, exc in failures:
+            attempts = event.attempts + 1
+            gave_up = attempts >= self.max_attempts
+            updated = OutboxEvent.objects.filter(pk=event.pk, lease_token=token).update(
+                status="Failed" if gave_up else "Pending",
+                attempts=attempts,
+                available_at=now if gave_up else now + self.retry_delay(attempts),
+                lease_token=None,
+                leased_until=None,
+                last_error=f"{type(exc).__name__}: {exc}"[:2000],
+            )
+            self.counts["failed" if gave_up else "retried"] += updated
+
+    def run_batch(self):
+        """Claim and deliver one batch; returns the number of events processed."""
+        token, events = self.claim()
+        if events:
+            self.deliver(token, events)
+        return len(events)
+
+    def run(self, max_batches=None):
+        """Deliver batches until nothing is due (or max_batches were processed)."""
+        batches = 0
+        while (max_batches is None or batches < max_batches) and self.run_batch():
+            batches += 1
+        return self.counts
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from notifications.dispatcher import Dispatcher
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued leave notifications from the outbox. Runs until stopped, "
+        "polling for due events; several workers may run at once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Events claimed per batch (default: NOTIFICATION_BATCH_SIZE).")
+        parser.add_argument("--poll-interval", type=float, default=5.0, help="Seconds to wait when nothing is due.")
+        parser.add_argument("--once", action="store_true", help="Deliver what is due now, then exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            dispatcher = Dispatcher(batch_size=options["batch_size"])
+            counts = dispatcher.run()
+            if any(counts.values()) or options["once"]:
+                self.stdout.write(
+                    f"Sent {counts['sent']}, retrying {counts['retried']}, failed {counts['failed']}."
+                )
+            if options["once"]:
+                return
+            time.sleep(options["poll_interval"])
@@ -0,0 +1,47 @@
+from django.db import models
+from organization.models import Organization
+
+
+class OutboxEvent(models.Model):
+    """
+    Notifications to send, written in the transaction of the change they
+    announce and delivered later by the dispatch_notifications worker
+    (notifications/dispatcher.py). The payload is a snapshot of what the
+    message needs (one event per leave), so rendering does not depend on the
+    rows still existing.
+    """
+    STATUS_CHOICES = [
+        ("Pending", "Pending"),
+        ("Sent", "Sent"),
+        ("Failed", "Failed"),  # gave up after NOTIFICATION_MAX_ATTEMPTS
+    ]
+
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="outbox_events")
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Pending")
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField()  # not sent before; pushed back on every failure
+    # Lease of the worker processing the event; an expired lease makes it claimable again
+    lease_token = models.UUIDField(null=True, blank=True)
+    leased_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "notification_outbox"
+        verbose_name = "Outbox Event"
+        verbose_name_plural = "Outbox Events"
+        indexes = [
+            # Claim query: due pending events, oldest first
+            models.Index(
+                fields=["available_at", "id"], name="outbox_pending_idx",
+                condition=models.Q(status="Pending"),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.pk} ({self.status})"
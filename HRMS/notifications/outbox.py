@@ -0,0 +1,52 @@
+"""
+Writing leave lifecycle events to the outbox.
+
+Callers add the events inside the transaction that changes the leaves, so an
+event exists if and only if the change was committed; nothing is sent on the
+request path. Every value the messages need is copied into the payload from
+the already loaded leaves (employee user, policy and reviewer joined in).
+
+An event announces one leave, so a failed email is retried on its own and
+never resends the others of its batch; a bulk review of thousands of leaves
+is still a single bulk INSERT.
+"""
+from django.utils import timezone
+from .models import OutboxEvent
+
+
+# Leave status after the change → event announcing it
+LEAVE_EVENTS = {
+    "Pending": "leave.created",
+    "Approved": "leave.approved",
+    "Rejected": "leave.rejected",
+    "Cancelled": "leave.cancelled",
+}
+
+
+def leave_payload(leave):
+    user = leave.employee.user
+    return {
+        "leave_id": str(leave.pk),
+        "employee_email": user.email,
+        "employee_name": user.username,
+        "policy_name": leave.policy.name if leave.policy else None,
+        "start_date": leave.start_date.isoformat(),
+        "end_date": leave.end_date.isoformat(),
+        "status": leave.status,
+        "remarks": leave.remarks or "",
+        "reviewed_by": leave.reviewed_by.username if leave.reviewed_by else None,
+    }
+
+
+def enqueue_leave_events(leaves):
+    """Queue the events announcing the leaves' current status. Call inside the saving transaction."""
+    now = timezone.now()
+    return OutboxEvent.objects.bulk_create([
+        OutboxEvent(
+            organization_id=leave.organization_id,
+            event_type=LEAVE_EVENTS[leave.status],
+            payload=leave_payload(leave),
+            available_at=now,
+        )
+        for leave in leaves
+    ], batch_size=1000)
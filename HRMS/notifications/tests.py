@@ -0,0 +1,124 @@
+from datetime import date, timedelta
+from io import StringIO
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from leave.models import Leave
+from leave.tests import LeaveTestMixin
+from .dispatcher import Dispatcher
+from .models import OutboxEvent
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError("SMTP server unavailable")
+
+
+class OutboxTests(LeaveTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.start = date.today() + timedelta(days=10)
+
+    def test_leave_changes_are_queued_not_sent(self):
+        leave_id = self.apply(self.start, self.start + timedelta(days=1)).data["id"]
+        self.review(leave_id, "approve", remarks="Enjoy")
+
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(
+            list(OutboxEvent.objects.order_by("id").values_list("event_type", "status")),
+            [("leave.created", "Pending"), ("leave.approved", "Pending")],
+        )
+
+        counts = Dispatcher().run()
+        self.assertEqual(counts, {"sent": 2, "retried": 0, "failed": 0})
+        created, approved = mail.outbox
+        self.assertEqual((created.to, created.cc), (["hr@acme.com"], ["emp@acme.com"]))
+        self.assertEqual(approved.to, ["emp@acme.com"])
+        self.assertIn("Remarks: Enjoy", approved.body)
+        self.assertFalse(OutboxEvent.objects.exclude(status="Sent").exists())
+
+    def test_rejected_application_queues_nothing(self):
+        # Beyond the annual entitlement: the leave is never written, neither is the event
+        self.assertEqual(self.apply(self.start, self.start + timedelta(days=30)).status_code, 403)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_bulk_review_queues_one_event_per_leave(self):
+        leaves = Leave.objects.bulk_create([
+            Leave(
+                organization=self.org, employee=self.employee, user=self.user, policy=self.policy,
+                start_date=self.start + timedelta(days=i), end_date=self.start + timedelta(days=i), reason="Trip",
+            )
+            for i in range(120)
+        ])
+        self.client.force_authenticate(self.hr)
+        self.client.post("/leaves/bulk-review/", {"items": [
+            {"id": str(leave.id), "action": "reject"} for leave in leaves
+        ]}, format="json")
+
+        self.assertEqual(OutboxEvent.objects.filter(event_type="leave.rejected").count(), 120)
+        Dispatcher(batch_size=50).run()
+        self.assertEqual(len(mail.outbox), 120)
+
+    def test_failed_email_is_retried_alone(self):
+        for offset in range(3):
+            self.apply(self.start + timedelta(days=offset * 2), self.start + timedelta(days=offset * 2))
+        failing = OutboxEvent.objects.order_by("id")[1]
+
+        class FlakyBackend(BaseEmailBackend):
+            def send_messages(self, messages):
+                if failing.pk in {int(m.extra_headers["X-HRMS-Event"].split(":")[1]) for m in messages}:
+                    raise ConnectionError("Mailbox unavailable")
+                mail.outbox.extend(messages)
+                return len(messages)
+
+        self.assertEqual(Dispatcher(connection=FlakyBackend()).run(), {"sent": 2, "retried": 1, "failed": 0})
+        OutboxEvent.objects.update(available_at=timezone.now())
+        self.assertEqual(Dispatcher().run(), {"sent": 1, "retried": 0, "failed": 0})
+        # Three emails in total: the retry did not resend the two that went out
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failed_delivery_backs_off_then_gives_up(self):
+        self.apply(self.start, self.start)
+        dispatcher = Dispatcher(max_attempts=2, connection=FailingBackend())
+
+        self.assertEqual(dispatcher.run(), {"sent": 0, "retried": 1, "failed": 0})
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.status, event.attempts), ("Pending", 1))
+        self.assertGreater(event.available_at, timezone.now())
+        self.assertIn("SMTP server unavailable", event.last_error)
+        # Not due yet
+        self.assertEqual(dispatcher.run_batch(), 0)
+
+        OutboxEvent.objects.update(available_at=timezone.now())
+        dispatcher.run()
+        self.assertEqual(OutboxEvent.objects.get().status, "Failed")
+        self.assertEqual(mail.outbox, [])
+
+    def test_leases_keep_workers_apart(self):
+        for offset in range(3):
+            self.apply(self.start + timedelta(days=offset * 2), self.start + timedelta(days=offset * 2))
+        first, second = Dispatcher(batch_size=2), Dispatcher(batch_size=2)
+
+        token, claimed = first.claim()
+        self.assertEqual(len(claimed), 2)
+        _, rest = second.claim()
+        self.assertEqual([event.pk for event in rest], [OutboxEvent.objects.order_by("id").last().pk])
+
+        # The first worker stalls past its lease; the events go to the second one
+        OutboxEvent.objects.filter(lease_token=token).update(leased_until=timezone.now() - timedelta(seconds=1))
+        second_token, reclaimed = second.claim()
+        self.assertEqual({event.pk for event in reclaimed}, {event.pk for event in claimed})
+        second.deliver(second_token, reclaimed)
+        # The late first worker must not touch events it no longer holds
+        first.deliver(token, claimed)
+        self.assertEqual(first.counts["sent"], 0)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_command_delivers_due_events(self):
+        self.apply(self.start, self.start)
+        out = StringIO()
+        call_command("dispatch_notifications", once=True, stdout=out)
+        self.assertIn("Sent 1", out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
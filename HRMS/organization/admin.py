@@ -1,7 +1,14 @@
 from django.contrib import admin
-from .models import Organization
+from .models import Holiday, Organization
 
 @admin.register(Organization)
 class OrganizationAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'code', 'timezone', 'created_at')
+    list_display = ('id', 'name', 'code', 'timezone', 'working_week', 'created_at')
     search_fields = ('name', 'code')
+
+
+@admin.register(Holiday)
+class HolidayAdmin(admin.ModelAdmin):
+    list_display = ('date', 'name', 'organization')
+    list_filter = ('organization',)
+    search_fields = ('name',)
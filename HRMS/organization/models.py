@@ -1,4 +1,5 @@
 import uuid
+from django.core.validators import RegexValidator
 from django.db import models
 
 class Organization(models.Model):
@@ -6,14 +7,73 @@ class Organization(models.Model):
     name = models.CharField(max_length=255, unique=True)
     code = models.CharField(max_length=20, unique=True)
     timezone = models.CharField(max_length=50, default="UTC")
+    # Monday first, "1" = working day (numpy weekmask format)
+    working_week = models.CharField(
+        max_length=7,
+        default="1111100",
+        validators=[RegexValidator(r"^[01]{7}$", "Use seven 0/1 flags, Monday first.")],
+    )
     is_active = models.BooleanField(default=True)
+    # Bumped on every LeavePolicy save/delete so per-process policy caches can detect changes
+    policy_version = models.PositiveIntegerField(default=0, editable=False)
+    # Bumped on every Holiday save/delete so compiled working-day calendars can detect changes
+    calendar_version = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Only ever moved with F() updates (policy/cache.py, workdays.py)
+    COUNTER_FIELDS = ("policy_version", "calendar_version")
+
     class Meta:
         db_table = "organization"
         verbose_name = "Organization"
         verbose_name_plural = "Organizations"
 
+    def save(self, *args, **kwargs):
+        # Saving an instance loaded before a bump must not roll the counters back
+        if not self._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.name} ({self.code})"
+
+
+class Holiday(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="holidays")
+    date = models.DateField()
+    name = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "organization_holiday"
+        verbose_name = "Holiday"
+        verbose_name_plural = "Holidays"
+        unique_together = ("organization", "date")
+        ordering = ["date"]
+
+    def __str__(self):
+        return f"{self.organization_id} | {self.date} {self.name}"
+
+
+class CollectionVersion(models.Model):
+    """
+    Version counter behind the ETags of a collection ("policies", "employees",
+    "organizations") for one organization, or for every organization at once
+    (scope "generation"). See HRMS/conditional.py.
+    """
+    collection = models.CharField(max_length=50)
+    scope = models.CharField(max_length=50)
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "collection_version"
+        unique_together = ("collection", "scope")
+
+    def __str__(self):
+        return f"{self.collection}:{self.scope} v{self.version}"
@@ -1,8 +1,23 @@
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from rest_framework import serializers
-from .models import Organization
+from .models import Holiday, Organization
 
 class OrganizationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Organization
-        fields = "__all__"
+        exclude = ["policy_version", "calendar_version"]
         read_only_fields = ["id", "created_at", "updated_at"]
+
+    def validate_timezone(self, value):
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise serializers.ValidationError("Unknown time zone.")
+        return value
+
+
+class HolidaySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Holiday
+        fields = ["id", "organization", "date", "name", "created_at"]
+        read_only_fields = ["id", "organization", "created_at"]
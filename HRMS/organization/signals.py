@@ -0,0 +1,20 @@
+# organization/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from HRMS.conditional import bump_collection_version
+from .models import Holiday, Organization
+from .workdays import bump_calendar_version
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def invalidate_working_calendar(sender, instance, **kwargs):
+    bump_calendar_version(instance.organization_id)
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def invalidate_organization_etags(sender, instance, **kwargs):
+    # Policies render the organization's name
+    bump_collection_version("organizations", instance.pk)
+    bump_collection_version("policies", instance.pk)
@@ -1,3 +1,104 @@
-from django.test import TestCase
+import random
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipIf
+from rest_framework.test import APITestCase
+from auth_app.models import User
+from .models import Holiday, Organization
+from . import workdays
+from .workdays import organization_today, working_days, working_days_many
 
-# Create your tests here.
+
+class WorkingCalendarTests(APITestCase):
+    def setUp(self):
+        # Sunday to Thursday week
+        self.org = Organization.objects.create(name="Acme", code="ACME", working_week="1111001")
+        self.holidays = {date(2025, 3, 31), date(2025, 12, 31), date(2026, 1, 1)}
+        for day in self.holidays:
+            Holiday.objects.create(organization=self.org, date=day, name="Holiday")
+        self.hr = User.objects.create_user(
+            email="hr@acme.com", username="hr", password="pass", role="HR", organization=self.org
+        )
+        self.user = User.objects.create_user(
+            email="emp@acme.com", username="emp", password="pass", organization=self.org
+        )
+
+    def brute_force(self, start, end):
+        days = (start + timedelta(days=offset) for offset in range((end - start).days + 1))
+        return sum(1 for day in days if day.weekday() not in (4, 5) and day not in self.holidays)
+
+    def random_ranges(self, total):
+        rng = random.Random(3)
+        ranges = []
+        for _ in range(total):
+            start = date(2025, 1, 1) + timedelta(days=rng.randrange(700))
+            ranges.append((start, start + timedelta(days=rng.randrange(60))))
+        return ranges
+
+    def test_prefix_sums_match_day_by_day_count(self):
+        self.org.refresh_from_db()
+        for start, end in self.random_ranges(300):
+            self.assertEqual(working_days(self.org, start, end), self.brute_force(start, end), (start, end))
+
+    def test_fallback_batch_matches_single_lookups(self):
+        starts, ends = zip(*self.random_ranges(300))
+        with mock.patch.object(workdays, "numpy", None):
+            counts = working_days_many(self.org.pk, list(starts), list(ends))
+        self.assertEqual(counts, [self.brute_force(start, end) for start, end in zip(starts, ends)])
+
+    @skipIf(workdays.numpy is None, "numpy is not installed")
+    def test_vectorized_batch_matches_single_lookups(self):
+        starts, ends = zip(*self.random_ranges(300))
+        counts = working_days_many(self.org.pk, list(starts), list(ends))
+        self.assertEqual(counts, [self.brute_force(start, end) for start, end in zip(starts, ends)])
+
+    def test_holiday_changes_invalidate_compiled_calendar(self):
+        week = (date(2025, 6, 1), date(2025, 6, 7))
+        self.assertEqual(working_days(self.org.pk, *week), 5)
+        holiday = Holiday.objects.create(organization=self.org, date=date(2025, 6, 2), name="Eid")
+        self.assertEqual(working_days(self.org.pk, *week), 4)
+        holiday.delete()
+        self.assertEqual(working_days(self.org.pk, *week), 5)
+
+    def test_today_follows_organization_time_zone(self):
+        self.org.timezone = "Asia/Tokyo"
+        evening_utc = datetime(2025, 1, 1, 20, 0, tzinfo=dt_timezone.utc)
+        with mock.patch("django.utils.timezone.now", return_value=evening_utc):
+            self.assertEqual(organization_today(self.org), date(2025, 1, 2))
+
+    def test_holiday_api(self):
+        url = f"/organization/{self.org.pk}/holidays/"
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.post(url, {"date": "2025-06-02", "name": "Eid"}).status_code, 403)
+        self.assertEqual(len(self.client.get(f"{url}?year=2025").data), 2)
+
+        self.client.force_authenticate(self.hr)
+        self.assertEqual(self.client.post(url, {"date": "2025-06-02", "name": "Eid"}).status_code, 201)
+        self.assertEqual(self.client.post(url, {"date": "2025-06-02", "name": "Eid"}).status_code, 400)
+
+        response = self.client.get(f"/organization/{self.org.pk}/working-days/?from=2025-06-01&to=2025-06-07")
+        self.assertEqual(response.data["working_days"], 4)
+
+        other = Organization.objects.create(name="Other", code="OTHER")
+        self.assertEqual(self.client.get(f"/organization/{other.pk}/holidays/").status_code, 403)
+
+
+class OrganizationConditionalRequestTests(APITestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Acme", code="ACME")
+        self.user = User.objects.create_user(
+            email="emp@acme.com", username="emp", password="pass", organization=self.org
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_and_detail_revalidation(self):
+        for url in ("/organization/", f"/organization/{self.org.pk}/"):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                etag = response["ETag"]
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+                self.assertEqual(
+                    self.client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code, 304
+                )
+
+                Organization.objects.get(pk=self.org.pk).save()
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -1,7 +1,16 @@
 from django.urls import path
-from .views import OrganizationListCreateView, OrganizationDetailView
+from .views import (
+    OrganizationListCreateView,
+    OrganizationDetailView,
+    HolidayListCreateView,
+    HolidayDetailView,
+    WorkingDaysView,
+)
 
 urlpatterns = [
     path('', OrganizationListCreateView.as_view(), name='organization-list-create'),
     path('<uuid:pk>/', OrganizationDetailView.as_view(), name='organization-detail'),
+    path('<uuid:pk>/holidays/', HolidayListCreateView.as_view(), name='organization-holidays'),
+    path('<uuid:pk>/holidays/<uuid:holiday_pk>/', HolidayDetailView.as_view(), name='organization-holiday-detail'),
+    path('<uuid:pk>/working-days/', WorkingDaysView.as_view(), name='organization-working-days'),
 ]
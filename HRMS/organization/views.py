@@ -1,6 +1,13 @@
-from rest_framework import generics, permissions
-from .models import Organization
-from .serializers import OrganizationSerializer
+from datetime import date
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from HRMS.conditional import ConditionalGetMixin
+from .models import Holiday, Organization
+from .serializers import HolidaySerializer, OrganizationSerializer
+from .workdays import working_days
 
 
 class OrganizationPermission(permissions.BasePermission):
@@ -22,10 +29,11 @@ class OrganizationPermission(permissions.BasePermission):
         return request.user.role == "SUPERADMIN"
 
 
-class OrganizationListCreateView(generics.ListCreateAPIView):
+class OrganizationListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = Organization.objects.all()
     serializer_class = OrganizationSerializer
     permission_classes = [permissions.IsAuthenticated, OrganizationPermission]
+    conditional_collection = "organizations"
 
     def get_queryset(self):
         user = self.request.user
@@ -33,16 +41,94 @@ class OrganizationListCreateView(generics.ListCreateAPIView):
         if user.role == "SUPERADMIN":
             return Organization.objects.all()
         # HR & Employee see only their own
-        return Organization.objects.filter(id=user.organization.id)
+        return Organization.objects.filter(id=user.organization_id)
 
 
-class OrganizationDetailView(generics.RetrieveUpdateDestroyAPIView):
+class OrganizationDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Organization.objects.all()
     serializer_class = OrganizationSerializer
     permission_classes = [permissions.IsAuthenticated, OrganizationPermission]
+    conditional_collection = "organizations"
 
     def get_queryset(self):
         user = self.request.user
         if user.role == "SUPERADMIN":
             return Organization.objects.all()
-        return Organization.objects.filter(id=user.organization.id)
+        return Organization.objects.filter(id=user.organization_id)
+
+
+def get_member_organization(request, pk):
+    """The organization in the URL, if the user belongs to it (SUPERADMIN: any)."""
+    user = request.user
+    if user.role != "SUPERADMIN" and user.organization_id != pk:
+        raise PermissionDenied("You can only access your own organization.")
+    return get_object_or_404(Organization, pk=pk)
+
+
+class HolidayPermission(permissions.BasePermission):
+    """
+    Holidays of an organization:
+    - SUPERADMIN → full access
+    - HR → manage their own organization's holidays
+    - EMPLOYEE → read only
+    """
+
+    def has_permission(self, request, view):
+        if not request.user.is_authenticated:
+            return False
+        if request.method in permissions.SAFE_METHODS:
+            return True
+        return request.user.role in ["SUPERADMIN", "HR"]
+
+
+class HolidayListCreateView(generics.ListCreateAPIView):
+    """Holidays of an organization, optionally for one ?year=."""
+    serializer_class = HolidaySerializer
+    permission_classes = [permissions.IsAuthenticated, HolidayPermission]
+
+    def get_queryset(self):
+        organization = get_member_organization(self.request, self.kwargs["pk"])
+        holidays = Holiday.objects.filter(organization=organization)
+        year = self.request.query_params.get("year")
+        if year:
+            if not year.isdigit():
+                raise ValidationError({"year": "A valid year is required."})
+            holidays = holidays.filter(date__year=int(year))
+        return holidays
+
+    def perform_create(self, serializer):
+        organization = get_member_organization(self.request, self.kwargs["pk"])
+        if Holiday.objects.filter(organization=organization, date=serializer.validated_data["date"]).exists():
+            raise ValidationError({"date": "This date is already a holiday."})
+        serializer.save(organization=organization)
+
+
+class HolidayDetailView(generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = HolidaySerializer
+    permission_classes = [permissions.IsAuthenticated, HolidayPermission]
+    lookup_url_kwarg = "holiday_pk"
+
+    def get_queryset(self):
+        organization = get_member_organization(self.request, self.kwargs["pk"])
+        return Holiday.objects.filter(organization=organization)
+
+
+class WorkingDaysView(APIView):
+    """Working days of the organization between ?from= and ?to= (inclusive)."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        organization = get_member_organization(request, pk)
+        try:
+            start_date = date.fromisoformat(request.query_params.get("from", ""))
+            end_date = date.fromisoformat(request.query_params.get("to", ""))
+        except ValueError:
+            raise ValidationError({"detail": "'from' and 'to' must use the YYYY-MM-DD format."})
+        if end_date < start_date:
+            raise ValidationError({"to": "Must not be before 'from'."})
+
+        return Response({
+            "from": start_date,
+            "to": end_date,
+            "working_days": working_days(organization, start_date, end_date),
+        }, status=status.HTTP_200_OK)
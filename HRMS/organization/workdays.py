@@ -0,0 +1,201 @@
+# organization/workdays.py
+"""
+Working-day calendars.
+
+Every organization has a working week (Organization.working_week, Monday
+first, "1" = working day) and a list of Holiday dates. Each (organization,
+year) is compiled into a cumulative count array: prefix[i] is the number of
+working days in the year before day i, so the working days between two dates
+cost prefix[end + 1] - prefix[start] per year touched.
+
+Compiled years live in a per-process LRU tagged with the organization's
+calendar_version (bumped whenever a holiday changes) and working week. Passing
+an Organization instance that is already loaded makes a cached lookup free;
+passing an id costs one primary-key read of those two columns.
+
+Batch consumers (balance rebuilds, exports) use working_days_many(), which
+hands whole columns of dates to numpy.busday_count when numpy is installed
+and falls back to the prefix sums otherwise.
+"""
+import threading
+import time
+from array import array
+from collections import OrderedDict, defaultdict
+from datetime import date, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from .models import Holiday, Organization
+
+try:
+    import numpy
+except ImportError:  # optional: only speeds up working_days_many()
+    numpy = None
+
+
+class YearCalendar:
+    """Working days of one organization for one calendar year."""
+
+    __slots__ = ("year", "first_day", "holidays", "prefix")
+
+    def __init__(self, year, working_week, holidays):
+        self.year = year
+        self.first_day = date(year, 1, 1)
+        self.holidays = tuple(sorted(holidays))
+        holiday_set = set(holidays)
+
+        total_days = (date(year + 1, 1, 1) - self.first_day).days
+        prefix = array("H", [0])
+        count = 0
+        for offset in range(total_days):
+            day = self.first_day + timedelta(days=offset)
+            if working_week[day.weekday()] == "1" and day not in holiday_set:
+                count += 1
+            prefix.append(count)
+        self.prefix = prefix
+
+    def count(self, start_date, end_date):
+        """Working days in [start_date, end_date]; both dates must fall in this year."""
+        return (
+            self.prefix[(end_date - self.first_day).days + 1]
+            - self.prefix[(start_date - self.first_day).days]
+        )
+
+    def is_working_day(self, day):
+        return self.count(day, day) == 1
+
+
+def calendar_state(organization):
+    """(organization_id, calendar_version, working_week) of an Organization instance or id."""
+    if isinstance(organization, Organization):
+        return organization.pk, organization.calendar_version, organization.working_week
+    row = (
+        Organization.objects.filter(pk=organization)
+        .values_list("calendar_version", "working_week")
+        .first()
+    )
+    if row is None:
+        raise Organization.DoesNotExist(f"No organization {organization}.")
+    return (organization, *row)
+
+
+class WorkingCalendarCache:
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or getattr(settings, "WORKING_CALENDAR_CACHE_SIZE", 1024)
+        self.ttl = ttl if ttl is not None else getattr(settings, "WORKING_CALENDAR_CACHE_TTL", 300)
+        self._entries = OrderedDict()  # (organization_id, year) → (state, loaded_at, YearCalendar)
+        self._lock = threading.Lock()
+
+    def get(self, state, year):
+        organization_id, version, working_week = state
+        key = (organization_id, year)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == (version, working_week) and now - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                return entry[2]
+
+        holidays = Holiday.objects.filter(
+            organization_id=organization_id, date__year=year
+        ).values_list("date", flat=True)
+        calendar = YearCalendar(year, working_week, list(holidays))
+        with self._lock:
+            self._entries[key] = ((version, working_week), now, calendar)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return calendar
+
+    def forget(self, organization_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == organization_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+working_calendar_cache = WorkingCalendarCache()
+
+
+def _count(state, start_date, end_date):
+    total = 0
+    for year in range(start_date.year, end_date.year + 1):
+        calendar = working_calendar_cache.get(state, year)
+        total += calendar.count(max(start_date, calendar.first_day), min(end_date, date(year, 12, 31)))
+    return total
+
+
+def working_days(organization, start_date, end_date):
+    """Working days in [start_date, end_date] (inclusive) for an Organization or its id."""
+    if end_date < start_date:
+        return 0
+    return _count(calendar_state(organization), start_date, end_date)
+
+
+def working_days_many(organization, start_dates, end_dates):
+    """working_days() for whole columns of dates of one organization; returns a list."""
+    if not start_dates:
+        return []
+    state = calendar_state(organization)
+    if numpy is None:
+        return [
+            _count(state, start, end) if end >= start else 0
+            for start, end in zip(start_dates, end_dates)
+        ]
+
+    first_year, last_year = min(start_dates).year, max(end_dates).year
+    holidays = [
+        day
+        for year in range(first_year, last_year + 1)
+        for day in working_calendar_cache.get(state, year).holidays
+    ]
+    begins = numpy.array(start_dates, dtype="datetime64[D]")
+    ends = numpy.array(end_dates, dtype="datetime64[D]") + 1  # busday_count excludes the end
+    counts = numpy.busday_count(begins, ends, weekmask=state[2], holidays=holidays)
+    return numpy.maximum(counts, 0).tolist()
+
+
+def working_days_by_organization(rows, organizations=None):
+    """
+    rows: sequence of (organization, start_date, end_date), possibly mixing organizations;
+    organization is an Organization instance (no lookup needed) or an id.
+    Returns the working days of every row, in order, with one working_days_many() call per
+    organization. organizations: optional {id: Organization} memo shared across calls.
+    """
+    groups = defaultdict(list)
+    for index, (organization, _, _) in enumerate(rows):
+        groups[getattr(organization, "pk", organization)].append(index)
+
+    counts = [0] * len(rows)
+    for organization_id, indexes in groups.items():
+        organization = rows[indexes[0]][0]
+        if organizations is not None and not isinstance(organization, Organization):
+            if organization_id not in organizations:
+                organizations[organization_id] = Organization.objects.get(pk=organization_id)
+            organization = organizations[organization_id]
+        results = working_days_many(
+            organization, [rows[i][1] for i in indexes], [rows[i][2] for i in indexes]
+        )
+        for index, result in zip(indexes, results):
+            counts[index] = result
+    return counts
+
+
+def bump_calendar_version(organization_id):
+    """Invalidate every worker's compiled calendars for the organization."""
+    Organization.objects.filter(pk=organization_id).update(calendar_version=F("calendar_version") + 1)
+    working_calendar_cache.forget(organization_id)
+
+
+def organization_today(organization):
+    """Today's date in the organization's time zone."""
+    try:
+        zone = ZoneInfo(organization.timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        zone = ZoneInfo("UTC")
+    return timezone.localtime(timezone.now(), zone).date()
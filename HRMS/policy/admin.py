@@ -25,11 +25,12 @@ class LeavePolicyAdmin(admin.ModelAdmin):
 class LeavePolicyHistoryAdmin(admin.ModelAdmin):
     """
     Admin interface for tracking changes to Leave Policies.
-    Displays who changed what and when, and stores full text snapshots.
+    Displays who changed what and when, with field-level diffs and periodic full snapshots.
     """
     list_display = (
         "policy",
         "version_number",
+        "is_checkpoint",
         "changed_by",
         "changed_at",
     )
@@ -38,7 +39,9 @@ class LeavePolicyHistoryAdmin(admin.ModelAdmin):
     readonly_fields = (
         "policy",
         "version_number",
-        "policy_snapshot",
+        "changes",
+        "snapshot",
+        "is_checkpoint",
         "changed_by",
         "changed_at",
     )
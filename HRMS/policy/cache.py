@@ -0,0 +1,118 @@
+# policy/cache.py
+"""
+Process-local cache of each organization's leave policies.
+
+Policies change a few times a year but are read on every leave application
+and every /policies/myorg/ page load. Each worker keeps an LRU of
+{organization → policies}; entries are tagged with Organization.policy_version,
+which is bumped in the database whenever a policy is saved or deleted, or the
+organization or a policy's creator (whose names the policies carry) is saved. A
+lookup costs one primary-key read of that counter, and only a changed version
+(or an entry older than the TTL) triggers a reload, so every gunicorn worker
+and node converges on the next request after a change.
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.db.models import F
+from organization.models import Organization
+from HRMS.conditional import bump_collection_version
+from .models import LeavePolicy
+
+
+class PolicyCache:
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or getattr(settings, "POLICY_CACHE_MAX_ORGANIZATIONS", 256)
+        self.ttl = ttl if ttl is not None else getattr(settings, "POLICY_CACHE_TTL", 300)
+        self._entries = OrderedDict()  # organization_id → (version, loaded_at, {policy_id: policy})
+        self._lock = threading.Lock()
+
+    def get_policies(self, organization_id):
+        """All policies of the organization as {policy_id: LeavePolicy}. Do not mutate the instances."""
+        version = current_version(organization_id)
+        if version is None:
+            return {}
+        now = time.monotonic()
+        policies = self._lookup(organization_id, version, now)
+        if policies is None:
+            policies = {policy.pk: policy for policy in self._queryset(organization_id)}
+            self._store(organization_id, version, now, policies)
+        return policies
+
+    async def aget_policies(self, organization_id):
+        """get_policies() for async views, using the async ORM."""
+        version = await acurrent_version(organization_id)
+        if version is None:
+            return {}
+        now = time.monotonic()
+        policies = self._lookup(organization_id, version, now)
+        if policies is None:
+            policies = {policy.pk: policy async for policy in self._queryset(organization_id)}
+            self._store(organization_id, version, now, policies)
+        return policies
+
+    def _queryset(self, organization_id):
+        return (
+            LeavePolicy.objects.select_related("organization", "created_by")
+            .filter(organization_id=organization_id)
+            .order_by("name")
+        )
+
+    def _lookup(self, organization_id, version, now):
+        with self._lock:
+            entry = self._entries.get(organization_id)
+            if entry and entry[0] == version and now - entry[1] < self.ttl:
+                self._entries.move_to_end(organization_id)
+                return entry[2]
+        return None
+
+    def _store(self, organization_id, version, now, policies):
+        with self._lock:
+            self._entries[organization_id] = (version, now, policies)
+            self._entries.move_to_end(organization_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_policy(self, organization_id, policy_id):
+        return self.get_policies(organization_id).get(policy_id)
+
+    def active_policies(self, organization_id):
+        return [policy for policy in self.get_policies(organization_id).values() if policy.is_active]
+
+    async def aactive_policies(self, organization_id):
+        return [policy for policy in (await self.aget_policies(organization_id)).values() if policy.is_active]
+
+    def forget(self, organization_id):
+        with self._lock:
+            self._entries.pop(organization_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def current_version(organization_id):
+    return (
+        Organization.objects.filter(pk=organization_id)
+        .values_list("policy_version", flat=True)
+        .first()
+    )
+
+
+async def acurrent_version(organization_id):
+    return await (
+        Organization.objects.filter(pk=organization_id)
+        .values_list("policy_version", flat=True)
+        .afirst()
+    )
+
+
+def bump_policy_version(organization_id):
+    """Invalidate every worker's cached policies (and the policy ETags) for the organization."""
+    Organization.objects.filter(pk=organization_id).update(policy_version=F("policy_version") + 1)
+    policy_cache.forget(organization_id)
+    bump_collection_version("policies", organization_id)
+
+
+policy_cache = PolicyCache()
@@ -41,6 +41,8 @@ class LeavePolicy(models.Model):
     )
 
     is_active = models.BooleanField(default=True)
+    # Monotonic, bumped atomically on every update (see policy/versioning.py)
+    version = models.PositiveIntegerField(default=1, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -49,6 +51,9 @@ class LeavePolicy(models.Model):
         verbose_name = "Leave Policy"
         verbose_name_plural = "Leave Policies"
         unique_together = ("organization", "name", "policy_type")
+        indexes = [
+            models.Index(fields=["organization", "is_active"], name="policy_org_active_idx"),
+        ]
 
     def __str__(self):
         return f"{self.organization.name} - {self.name} ({self.policy_type})"
@@ -58,14 +63,24 @@ class LeavePolicyHistory(models.Model):
     policy = models.ForeignKey('LeavePolicy', on_delete=models.CASCADE, related_name='history')
     version_number = models.PositiveIntegerField(default=1)
 
-    # Store readable snapshot instead of JSON (no serialization issues)
-    policy_snapshot = models.TextField()  
+    # Field-level diff against the previous version: {"field": [old, new]}
+    changes = models.JSONField(default=dict)
+    # Full state of the versioned fields, stored on checkpoint versions only
+    snapshot = models.JSONField(null=True, blank=True)
+    is_checkpoint = models.BooleanField(default=False)
 
     changed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     changed_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-changed_at']
+        indexes = [
+            models.Index(fields=["-changed_at", "-id"], name="policy_history_changed_idx"),
+            models.Index(fields=["policy", "-changed_at"], name="policy_history_policy_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["policy", "version_number"], name="policy_history_unique_version"),
+        ]
 
     def __str__(self):
         return f"{self.policy.name} (v{self.version_number})"
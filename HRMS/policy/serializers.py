@@ -18,11 +18,11 @@ class LeavePolicySerializer(serializers.ModelSerializer):
             'max_days_per_year', 'carry_forward_days',
             'requires_document', 'max_days_without_doc',
             'notice_period_days', 'allow_encashment',
-            'encashment_limit', 'is_active',
+            'encashment_limit', 'is_active', 'version',
             'created_by', 'created_by_username', 'created_by_email', 'created_by_role',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'created_by']
+        read_only_fields = ['id', 'version', 'created_at', 'updated_at', 'created_by']
 
     def validate(self, data):
         policy_type = data.get("policy_type")
@@ -89,6 +89,24 @@ class LeavePolicySerializer(serializers.ModelSerializer):
 
         return data
 
+    def update(self, instance, validated_data):
+        # Write only the fields sent: version is bumped separately (policy/versioning.py)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=[*validated_data, "updated_at"])
+        return instance
+
+
+class LeavePolicyListSerializer(LeavePolicySerializer):
+    """Default shape of policy list responses; ?fields= can ask for any LeavePolicySerializer field."""
+
+    class Meta(LeavePolicySerializer.Meta):
+        fields = [
+            'id', 'organization', 'name', 'policy_type', 'max_days_per_year',
+            'notice_period_days', 'requires_document', 'is_active', 'version',
+        ]
+
+
 class LeavePolicyHistorySerializer(serializers.ModelSerializer):
     changed_by_email = serializers.EmailField(source="changed_by.email", read_only=True)
     policy_name = serializers.CharField(source="policy.name", read_only=True)
@@ -102,7 +120,9 @@ class LeavePolicyHistorySerializer(serializers.ModelSerializer):
             "policy_name",
             "policy_type",
             "version_number",
-            "policy_snapshot",
+            "changes",
+            "snapshot",
+            "is_checkpoint",
             "changed_by",
             "changed_by_email",
             "changed_at",
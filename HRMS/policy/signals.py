@@ -0,0 +1,32 @@
+# policy/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from auth_app.models import User
+from organization.models import Organization
+from .cache import bump_policy_version
+from .models import LeavePolicy
+
+
+@receiver(post_save, sender=LeavePolicy)
+@receiver(post_delete, sender=LeavePolicy)
+def invalidate_policy_cache(sender, instance, **kwargs):
+    bump_policy_version(instance.organization_id)
+
+
+@receiver(post_save, sender=Organization)
+def invalidate_organization_name(sender, instance, created, **kwargs):
+    # Cached policies carry their organization's name
+    if not created:
+        bump_policy_version(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def invalidate_creator_names(sender, instance, created, update_fields=None, **kwargs):
+    # Cached policies carry their creator's username, email and role; logins only touch last_login
+    if created or (update_fields is not None and set(update_fields) <= {"last_login"}):
+        return
+    organization_ids = (
+        LeavePolicy.objects.filter(created_by=instance).values_list("organization_id", flat=True).distinct()
+    )
+    for organization_id in organization_ids:
+        bump_policy_version(organization_id)
@@ -1,3 +1,260 @@
-from django.test import TestCase
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+from django.db.models import F
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from organization.models import Organization
+from auth_app.models import User
+from HRMS.testing import QueryPlanMixin
+from .cache import bump_policy_version, policy_cache
+from .models import LeavePolicy, LeavePolicyHistory
+from .serializers import LeavePolicySerializer
+from .views import LeavePolicyDetailView
 
-# Create your tests here.
+
+class PolicyTestMixin:
+    def setUp(self):
+        self.org = Organization.objects.create(name="Acme", code="ACME")
+        self.hr = User.objects.create_user(
+            email="hr@acme.com", username="hr", password="pass", role="HR", organization=self.org
+        )
+        self.user = User.objects.create_user(
+            email="emp@acme.com", username="emp", password="pass", organization=self.org
+        )
+
+    def seed_policies(self, total):
+        existing = LeavePolicy.objects.count()
+        policies = LeavePolicy.objects.bulk_create([
+            LeavePolicy(
+                organization=self.org, name=f"Sick {i}", policy_type="SICK",
+                max_days_per_year=10, created_by=self.hr,
+            )
+            for i in range(existing, total)
+        ])
+        LeavePolicyHistory.objects.bulk_create([
+            LeavePolicyHistory(
+                policy=policy, changes={}, snapshot={}, is_checkpoint=True, changed_by=self.hr
+            )
+            for policy in policies
+        ])
+        # bulk_create sends no post_save, so invalidate the policy cache explicitly
+        bump_policy_version(self.org.id)
+
+
+class PolicyQueryBudgetTests(PolicyTestMixin, APITestCase):
+    """Policy endpoints must cost a constant number of queries, however many rows they return."""
+
+    ROW_COUNTS = (10, 100, 1000)
+
+    def assertQueryBudget(self, viewer, url, budget):
+        self.client.force_authenticate(viewer)
+        for total in self.ROW_COUNTS:
+            self.seed_policies(total)
+            with self.subTest(rows=total), self.assertNumQueries(budget):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_policy_list(self):
+        # Rows + the collection's ETag version
+        self.assertQueryBudget(self.hr, "/policies/", 2)
+
+    def test_policy_myorg(self):
+        # Version read + cache refill (seeding bumps the version every round) + ETag version
+        self.assertQueryBudget(self.user, "/policies/myorg/", 3)
+
+    def test_policy_detail(self):
+        self.seed_policies(1)
+        self.assertQueryBudget(self.hr, f"/policies/{LeavePolicy.objects.first().id}/", 2)
+
+    def test_policy_history(self):
+        self.assertQueryBudget(self.hr, "/policies/history/", 1)
+
+
+class PolicyQueryPlanTests(QueryPlanMixin, PolicyTestMixin, APITestCase):
+    """The queries behind each policy endpoint must be served from an index."""
+
+    def setUp(self):
+        super().setUp()
+        self.seed_policies(300)
+
+    def test_policy_list(self):
+        self.client.force_authenticate(self.hr)
+        self.assertNoFullTableScan("/policies/")
+
+    def test_policy_myorg(self):
+        self.client.force_authenticate(self.user)
+        self.assertNoFullTableScan("/policies/myorg/")
+
+    def test_policy_history(self):
+        self.client.force_authenticate(self.hr)
+        self.assertNoFullTableScan("/policies/history/")
+
+
+class PolicyCacheTests(PolicyTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        policy_cache.clear()
+        self.policy = LeavePolicy.objects.create(
+            organization=self.org, name="Casual", policy_type="CASUAL", max_days_per_year=5,
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_warm_cache_costs_one_version_read(self):
+        self.client.get("/policies/myorg/")
+        # policy_version, plus the ETag version
+        with self.assertNumQueries(2):
+            response = self.client.get("/policies/myorg/")
+        self.assertEqual([row["name"] for row in response.data], ["Casual"])
+
+    def test_policy_change_bumps_version_and_refreshes(self):
+        self.client.get("/policies/myorg/")
+        version = Organization.objects.get(pk=self.org.pk).policy_version
+
+        self.policy.is_active = False
+        self.policy.save()
+
+        self.assertEqual(Organization.objects.get(pk=self.org.pk).policy_version, version + 1)
+        self.assertEqual(self.client.get("/policies/myorg/").data, [])
+
+    def test_renames_of_related_rows_refresh_cached_policies(self):
+        LeavePolicy.objects.filter(pk=self.policy.pk).update(created_by=self.hr)
+        bump_policy_version(self.org.id)
+        policy_cache.get_policies(self.org.id)
+        version = Organization.objects.get(pk=self.org.pk).policy_version
+
+        # self.org was loaded before the bumps; saving it must not roll policy_version back,
+        # or other workers would keep serving the entry cached under the old version
+        self.org.name = "Acme Corp"
+        self.org.save()
+        self.assertGreater(Organization.objects.get(pk=self.org.pk).policy_version, version)
+        self.assertEqual(policy_cache.get_policy(self.org.id, self.policy.pk).organization.name, "Acme Corp")
+
+        self.hr.username = "people"
+        self.hr.save()
+        self.assertEqual(policy_cache.get_policy(self.org.id, self.policy.pk).created_by.username, "people")
+
+    def test_other_worker_detects_bump(self):
+        cached = policy_cache.get_policies(self.org.id)
+        # Simulate another process: bump the counter without touching this process' LRU
+        Organization.objects.filter(pk=self.org.pk).update(policy_version=F("policy_version") + 1)
+        self.assertIsNot(policy_cache.get_policies(self.org.id), cached)
+
+
+class PolicyConditionalRequestTests(PolicyTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.policy = LeavePolicy.objects.create(
+            organization=self.org, name="Casual", policy_type="CASUAL", max_days_per_year=5,
+        )
+        self.url = f"/policies/{self.policy.id}/"
+
+    def test_unchanged_list_answers_304_with_one_query(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get("/policies/myorg/")
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        # Only the collection's version counters are read
+        with self.assertNumQueries(1):
+            response = self.client.get("/policies/myorg/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        self.policy.max_days_per_year = 6
+        self.policy.save()
+        response = self.client.get("/policies/myorg/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_unchanged_detail_skips_serializer(self):
+        self.client.force_authenticate(self.hr)
+        etag = self.client.get(self.url)["ETag"]
+        with mock.patch.object(LeavePolicySerializer, "to_representation", side_effect=AssertionError):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # The organization's name is part of the representation
+        self.org.name = "Acme Corp"
+        self.org.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_match_prevents_lost_updates(self):
+        self.client.force_authenticate(self.hr)
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.patch(self.url, {"max_days_per_year": 6}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(self.client.get(self.url)["ETag"], response["ETag"])
+
+        # A second writer still holding the first ETag
+        response = self.client.patch(self.url, {"max_days_per_year": 7}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(LeavePolicy.objects.get(pk=self.policy.pk).max_days_per_year, 6)
+        self.assertEqual(self.client.patch(self.url, {"max_days_per_year": 7}).status_code, 200)
+
+
+@override_settings(POLICY_HISTORY_CHECKPOINT_INTERVAL=3)
+class PolicyVersioningTests(PolicyTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.hr)
+        response = self.client.post("/policies/", {
+            "name": "Sick", "policy_type": "SICK", "max_days_per_year": 5, "max_days_without_doc": 2,
+            "organization": self.org.id,
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+        self.policy_id = response.data["id"]
+
+    def update(self, **changes):
+        response = self.client.patch(f"/policies/{self.policy_id}/", changes)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_versions_store_field_diffs_and_checkpoints(self):
+        for days in (6, 7, 8):
+            self.update(max_days_per_year=days)
+
+        history = list(LeavePolicyHistory.objects.filter(policy_id=self.policy_id).order_by("version_number"))
+        self.assertEqual([h.version_number for h in history], [1, 2, 3, 4])
+        self.assertEqual([h.is_checkpoint for h in history], [True, False, False, True])
+        self.assertEqual(history[2].changes, {"max_days_per_year": [6, 7]})
+        self.assertIsNone(history[2].snapshot)
+        self.assertEqual(history[3].snapshot["max_days_per_year"], 8)
+        self.assertEqual(LeavePolicy.objects.get(pk=self.policy_id).version, 4)
+
+    def test_interleaved_patches_keep_both_changes(self):
+        # The second writer loaded the row before the first one committed
+        stale = LeavePolicy.objects.get(pk=self.policy_id)
+        self.update(max_days_per_year=6)
+        with mock.patch.object(LeavePolicyDetailView, "get_object", return_value=stale):
+            data = self.update(notice_period_days=3)
+
+        self.assertEqual(data["version"], 3)
+        policy = LeavePolicy.objects.get(pk=self.policy_id)
+        self.assertEqual((policy.version, policy.max_days_per_year, policy.notice_period_days), (3, 6, 3))
+        history = LeavePolicyHistory.objects.filter(policy_id=self.policy_id).order_by("version_number")
+        self.assertEqual(
+            [(h.version_number, h.changes) for h in history][1:],
+            [(2, {"max_days_per_year": [5, 6]}), (3, {"notice_period_days": [0, 3]})],
+        )
+
+    def test_as_of_rebuilds_past_rules(self):
+        self.update(max_days_per_year=6)
+        self.update(notice_period_days=3)
+        # Spread the versions over three days
+        for version, day in ((1, 1), (2, 5), (3, 9)):
+            LeavePolicyHistory.objects.filter(policy_id=self.policy_id, version_number=version).update(
+                changed_at=datetime(2025, 1, day, 12, tzinfo=dt_timezone.utc)
+            )
+
+        response = self.client.get(f"/policies/{self.policy_id}/as-of/?date=2025-01-06")
+        self.assertEqual(response.data["version"], 2)
+        self.assertEqual(response.data["state"]["max_days_per_year"], 6)
+        self.assertEqual(response.data["state"]["notice_period_days"], 0)
+
+        response = self.client.get(f"/policies/{self.policy_id}/as-of/?date=2025-01-01T11:00:00Z")
+        self.assertEqual(response.status_code, 404)
+
+    def test_as_of_requires_a_date(self):
+        self.assertEqual(self.client.get(f"/policies/{self.policy_id}/as-of/?date=soon").status_code, 400)
@@ -4,7 +4,9 @@ from .views import (
     LeavePolicyDetailView,
     LeavePolicyMeView,
     LeavePolicySafeLookupView,
-    LeavePolicyHistoryView  
+    LeavePolicyHistoryView,
+    LeavePolicyAsOfView,
+    AsyncLeavePolicyMeView,
 )
 
 urlpatterns = [
@@ -22,4 +24,10 @@ urlpatterns = [
 
     path("policies/history/", LeavePolicyHistoryView.as_view(), name="policy-history"),
 
+    # Policy rules in force at a point in time
+    path("policies/<uuid:pk>/as-of/", LeavePolicyAsOfView.as_view(), name="policy-as-of"),
+
+    # Async twin of policies/myorg/ for ASGI deployments
+    path("async/policies/myorg/", AsyncLeavePolicyMeView.as_view(), name="policy-myorg-async"),
+
 ]
@@ -0,0 +1,101 @@
+# policy/versioning.py
+"""
+Structured policy history.
+
+Every save of a LeavePolicy bumps LeavePolicy.version with an atomic F()
+update and records a LeavePolicyHistory row holding only the fields that
+changed ({field: [old, new]}). Every POLICY_HISTORY_CHECKPOINT_INTERVAL
+versions (and at version 1) the row also stores the full state, so the
+policy in force at any moment is rebuilt from the nearest checkpoint plus at
+most interval - 1 diffs.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from .models import LeavePolicy, LeavePolicyHistory
+
+
+VERSIONED_FIELDS = [
+    "name",
+    "policy_type",
+    "description",
+    "max_days_per_year",
+    "carry_forward_days",
+    "requires_document",
+    "max_days_without_doc",
+    "notice_period_days",
+    "allow_encashment",
+    "encashment_limit",
+    "is_active",
+]
+
+
+def checkpoint_interval():
+    return max(1, getattr(settings, "POLICY_HISTORY_CHECKPOINT_INTERVAL", 10))
+
+
+def policy_state(policy):
+    return {field: getattr(policy, field) for field in VERSIONED_FIELDS}
+
+
+def diff_states(old_state, new_state):
+    return {
+        field: [old_state.get(field), value]
+        for field, value in new_state.items()
+        if old_state.get(field) != value
+    }
+
+
+def record_policy_version(policy, changed_by, previous_state=None):
+    """
+    Write the history row for a policy that was just created (previous_state=None)
+    or updated. Must run in the transaction that saved the policy.
+    """
+    with transaction.atomic():
+        if previous_state is None:
+            version = policy.version
+        else:
+            LeavePolicy.objects.filter(pk=policy.pk).update(version=F("version") + 1)
+            version = LeavePolicy.objects.filter(pk=policy.pk).values_list("version", flat=True).get()
+            policy.version = version
+
+        state = policy_state(policy)
+        is_checkpoint = (version - 1) % checkpoint_interval() == 0
+        return LeavePolicyHistory.objects.create(
+            policy=policy,
+            version_number=version,
+            changes=diff_states(previous_state or {}, state),
+            snapshot=state if is_checkpoint else None,
+            is_checkpoint=is_checkpoint,
+            changed_by=changed_by,
+        )
+
+
+def policy_as_of(policy_id, moment):
+    """
+    The policy's versioned fields as they were at `moment`, or None if the
+    policy did not exist yet. Returns {"version", "changed_at", "state"}.
+    """
+    history = LeavePolicyHistory.objects.filter(policy_id=policy_id)
+    target = history.filter(changed_at__lte=moment).order_by("-changed_at", "-version_number").first()
+    if target is None:
+        return None
+
+    checkpoint = (
+        history.filter(is_checkpoint=True, version_number__lte=target.version_number)
+        .order_by("-version_number")
+        .first()
+    )
+    if checkpoint is None:
+        return None
+
+    state = dict(checkpoint.snapshot)
+    diffs = history.filter(
+        version_number__gt=checkpoint.version_number,
+        version_number__lte=target.version_number,
+    ).order_by("version_number").values_list("changes", flat=True)
+    for changes in diffs:
+        for field, (_, new_value) in changes.items():
+            state[field] = new_value
+
+    return {"version": target.version_number, "changed_at": target.changed_at, "state": state}
@@ -1,9 +1,21 @@
 # policy/views.py
-from rest_framework import generics, permissions
-from rest_framework.exceptions import PermissionDenied, NotFound
+from datetime import datetime, time
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import PermissionDenied, NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.db import transaction
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .cache import policy_cache
 from .models import LeavePolicy, LeavePolicyHistory
-from .serializers import LeavePolicySerializer, LeavePolicyHistorySerializer
+from .serializers import LeavePolicySerializer, LeavePolicyListSerializer, LeavePolicyHistorySerializer
+from .versioning import policy_as_of, policy_state, record_policy_version
+from HRMS.async_views import AsyncAPIView
+from HRMS.conditional import ConditionalGetMixin
+from HRMS.fieldsets import SparseFieldsetMixin, restrict_queryset, sparse_serializer
+from HRMS.pagination import ChangedAtCursorPagination
 
 # PERMISSIONS
 class LeavePolicyPermission(permissions.BasePermission):
@@ -28,50 +40,33 @@ class LeavePolicyPermission(permissions.BasePermission):
         user = request.user
         if user.role == "SUPERADMIN":
             return True
-        if user.role == "HR" and obj.organization == user.organization:
+        if user.role == "HR" and obj.organization_id == user.organization_id:
             return True
-        if user.role == "EMPLOYEE" and obj.organization == user.organization and request.method in permissions.SAFE_METHODS:
+        if user.role == "EMPLOYEE" and obj.organization_id == user.organization_id and request.method in permissions.SAFE_METHODS:
             return True
         return False
 
 
 # Helpers
-def build_policy_snapshot_text(policy_instance, changed_by_user=None):
-    """
-    Build a readable text snapshot for the policy_instance.
-    This ensures we don't store model objects in DB and avoid serialization errors.
-    """
-    return (
-        f"Name: {policy_instance.name}\n"
-        f"Type: {policy_instance.policy_type}\n"
-        f"Description: {policy_instance.description or ''}\n"
-        f"Organization: {policy_instance.organization.name if policy_instance.organization else 'N/A'}\n"
-        f"Max Days/Year: {policy_instance.max_days_per_year}\n"
-        f"Carry Forward Days: {policy_instance.carry_forward_days}\n"
-        f"Requires Document: {policy_instance.requires_document}\n"
-        f"Max Days Without Doc: {policy_instance.max_days_without_doc}\n"
-        f"Notice Period Days: {policy_instance.notice_period_days}\n"
-        f"Allow Encashment: {policy_instance.allow_encashment}\n"
-        f"Encashment Limit: {policy_instance.encashment_limit}\n"
-        f"Is Active: {policy_instance.is_active}\n"
-        f"Updated At: {policy_instance.updated_at}\n"
-        f"Changed By: {changed_by_user.email if changed_by_user else 'N/A'}\n"
-    )
-
+def policy_queryset():
+    """LeavePolicy queryset with the relations LeavePolicySerializer reads joined in."""
+    return LeavePolicy.objects.select_related("organization", "created_by")
 
 
 # LIST + CREATE
 
-class LeavePolicyListCreateView(generics.ListCreateAPIView):
+class LeavePolicyListCreateView(ConditionalGetMixin, SparseFieldsetMixin, generics.ListCreateAPIView):
     serializer_class = LeavePolicySerializer
+    compact_serializer_class = LeavePolicyListSerializer
+    conditional_collection = "policies"
     permission_classes = [permissions.IsAuthenticated, LeavePolicyPermission]
 
     def get_queryset(self):
         user = self.request.user
         if user.role == "SUPERADMIN":
-            return LeavePolicy.objects.all()
+            return policy_queryset()
         elif user.role in ["HR", "EMPLOYEE"]:
-            return LeavePolicy.objects.filter(organization=user.organization)
+            return policy_queryset().filter(organization_id=user.organization_id)
         return LeavePolicy.objects.none()
 
     def perform_create(self, serializer):
@@ -80,76 +75,97 @@ class LeavePolicyListCreateView(generics.ListCreateAPIView):
         """
         user = self.request.user
 
-        if user.role == "HR":
-            instance = serializer.save(organization=user.organization, created_by=user)
-        elif user.role == "SUPERADMIN":
-            instance = serializer.save(created_by=user)
-        else:
+        if user.role not in ["HR", "SUPERADMIN"]:
             raise PermissionDenied("You do not have permission to create leave policies.")
 
-        # create initial snapshot as text
-        snapshot_text = build_policy_snapshot_text(instance, changed_by_user=user)
+        with transaction.atomic():
+            if user.role == "HR":
+                instance = serializer.save(organization=user.organization, created_by=user)
+            else:
+                instance = serializer.save(created_by=user)
 
-        LeavePolicyHistory.objects.create(
-            policy=instance,
-            version_number=1,
-            policy_snapshot=snapshot_text,
-            changed_by=user
-        )
+            # version 1 is always a full checkpoint
+            record_policy_version(instance, changed_by=user)
 
 
 # DETAIL (UUID-based) with safe 404 + history tracking
-class LeavePolicyDetailView(generics.RetrieveUpdateDestroyAPIView):
+class LeavePolicyDetailView(ConditionalGetMixin, SparseFieldsetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = LeavePolicySerializer
     permission_classes = [permissions.IsAuthenticated, LeavePolicyPermission]
     queryset = LeavePolicy.objects.all()
+    sparse_always_load = ("organization", "updated_at", "version")
+    conditional_collection = "policies"
 
     def get_object(self):
         user = self.request.user
         policy_id = self.kwargs.get("pk")
 
         try:
-            policy = LeavePolicy.objects.get(pk=policy_id)
+            policy = self.sparse_queryset(policy_queryset()).get(pk=policy_id)
         except LeavePolicy.DoesNotExist:
             raise NotFound({"detail": f"No matching Leave Policy found for UID: {policy_id}"})
 
         if user.role == "SUPERADMIN":
             return policy
-        if user.role == "HR" and policy.organization == user.organization:
+        if user.role == "HR" and policy.organization_id == user.organization_id:
             return policy
 
         raise PermissionDenied("You are not authorized to access this policy.")
 
     def perform_update(self, serializer):
         """
-        Save update and create a history entry with a readable snapshot.
+        Save update, bump the policy version atomically and record a field-level diff.
+        Rejected with 412 when If-Match names another version.
+
+        The diff, the If-Match check and the save all use the row re-read under
+        select_for_update, so a concurrent PATCH that committed after get_object
+        is neither overwritten nor diffed against (the serializer only writes
+        the fields it was sent, never version).
         """
         user = self.request.user
-        instance = serializer.save()
 
-        snapshot_text = build_policy_snapshot_text(instance, changed_by_user=user)
-        LeavePolicyHistory.objects.create(
-            policy=instance,
-            version_number=instance.history.count() + 1,
-            policy_snapshot=snapshot_text,
-            changed_by=user
-        )
+        with transaction.atomic():
+            serializer.instance = policy_queryset().select_for_update(of=("self",)).get(pk=serializer.instance.pk)
+            self.check_if_match(serializer.instance)
+            previous_state = policy_state(serializer.instance)
+            instance = serializer.save()
+            record_policy_version(instance, changed_by=user, previous_state=previous_state)
 
 
 # EMPLOYEE / HR view for their org’s active policies (/policies/myorg/)
-class LeavePolicyMeView(generics.ListAPIView):
+class LeavePolicyMeView(ConditionalGetMixin, SparseFieldsetMixin, generics.ListAPIView):
     serializer_class = LeavePolicySerializer
+    compact_serializer_class = LeavePolicyListSerializer
+    conditional_collection = "policies"
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
         if user.role in ["EMPLOYEE", "HR"]:
-            return LeavePolicy.objects.filter(organization=user.organization, is_active=True)
+            # Served from the per-process policy cache (one version read per request)
+            return policy_cache.active_policies(user.organization_id)
         elif user.role == "SUPERADMIN":
-            return LeavePolicy.objects.filter(is_active=True)
+            return policy_queryset().filter(is_active=True)
         return LeavePolicy.objects.none()
 
 
+class AsyncLeavePolicyMeView(AsyncAPIView):
+    """Async twin of LeavePolicyMeView for ASGI deployments (/async/policies/myorg/)."""
+
+    async def get(self, request):
+        user = request.user
+        template = sparse_serializer(request, LeavePolicySerializer, LeavePolicyListSerializer)
+        if user.role in ["EMPLOYEE", "HR"]:
+            policies = await policy_cache.aactive_policies(user.organization_id)
+        elif user.role == "SUPERADMIN":
+            active = restrict_queryset(policy_queryset().filter(is_active=True), template)
+            policies = [policy async for policy in active]
+        else:
+            policies = []
+        data = sparse_serializer(request, LeavePolicySerializer, LeavePolicyListSerializer, policies, many=True).data
+        return self.render(data)
+
+
 # SAFE UID LOOKUP VIEW
 class LeavePolicySafeLookupView(generics.RetrieveAPIView):
     """
@@ -164,12 +180,12 @@ class LeavePolicySafeLookupView(generics.RetrieveAPIView):
         policy_id = self.kwargs.get("pk")
 
         try:
-            policy = LeavePolicy.objects.get(pk=policy_id)
+            policy = policy_queryset().get(pk=policy_id)
         except LeavePolicy.DoesNotExist:
             raise NotFound({"detail": f"No Leave Policy found with UID: {policy_id}"})
 
         if user.role in ["SUPERADMIN", "HR"] and (
-            user.role == "SUPERADMIN" or policy.organization == user.organization
+            user.role == "SUPERADMIN" or policy.organization_id == user.organization_id
         ):
             return policy
 
@@ -185,6 +201,7 @@ class LeavePolicyHistoryView(generics.ListAPIView):
     """
     serializer_class = LeavePolicyHistorySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ChangedAtCursorPagination
 
     def get_queryset(self):
         user = self.request.user
@@ -194,7 +211,35 @@ class LeavePolicyHistoryView(generics.ListAPIView):
 
         elif user.role in ["HR", "EMPLOYEE"]:
             return LeavePolicyHistory.objects.filter(
-                policy__organization=user.organization
+                policy__organization_id=user.organization_id
             ).select_related("policy", "changed_by")
 
         return LeavePolicyHistory.objects.none()
+
+
+# POINT-IN-TIME VIEW (/policies/<uuid>/as-of/?date=)
+class LeavePolicyAsOfView(APIView):
+    """
+    The policy rules in force at a given date (end of that day) or ISO datetime,
+    rebuilt from the nearest checkpoint in the history.
+    """
+    permission_classes = [permissions.IsAuthenticated, LeavePolicyPermission]
+
+    def get(self, request, pk):
+        policy = get_object_or_404(LeavePolicy.objects.only("id", "organization_id"), pk=pk)
+        self.check_object_permissions(request, policy)
+
+        raw = request.query_params.get("date", "")
+        moment = parse_datetime(raw)
+        if moment is None:
+            day = parse_date(raw)
+            if day is None:
+                raise ValidationError({"date": "Use YYYY-MM-DD or an ISO 8601 datetime."})
+            moment = datetime.combine(day, time.max)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+
+        result = policy_as_of(policy.pk, moment)
+        if result is None:
+            raise NotFound({"detail": f"Policy {pk} did not exist at {raw}."})
+        return Response({"policy": policy.pk, **result}, status=status.HTTP_200_OK)